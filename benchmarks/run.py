@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+扫描流程性能基准
+
+使用合成期权链和离线 DataLoader 测量期权链标准化、预筛选、Delta选行权价、
+多策略评估、希腊值、胜率计算以及完整 scan_all 周期的耗时、吞吐量和峰值内存，
+并与保存的基线比较，超出容忍度时以非零状态码退出。
+
+用法:
+    python -m benchmarks.run                   # 运行并与基线比较
+    python -m benchmarks.run --save-baseline   # 运行并覆盖基线
+
+耗时与机器相关：基线须在执行比较的同一台机器上用 --save-baseline 重新生成。
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic import FakeDataLoader, FakeWatchlistLoader, FakeYahoo, make_bars
+from src.data_loader import load_config, _normalize_option_chain
+from src.signal_generator import SignalGenerator
+from src.utils.cache import SnapshotCache
+from src.utils.greeks import calculate_greeks, calculate_greeks_batch
+from src.utils.iv_surface import VolSurface
+from src.utils.bar_buffer import BarBuffer
+from src.utils.risk_book import RiskBook
+from src.utils.strategies import LegTable, StrategyEngine
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline.json')
+
+
+def _config(tickers, max_workers):
+    config = load_config()
+    config['watchlist'] = list(tickers)
+    config['scanner'] = {'max_workers': max_workers, 'ticker_timeout': 60}
+    config['metrics'] = {'path': None}
+    config['recorder'] = {'enabled': False}
+    # 每轮都计时完整分析，不因输入未变化而跳过
+    config['incremental'] = {'enabled': False}
+    return config
+
+
+def _tickers(count):
+    return [f"SYN{i:03d}" for i in range(count)]
+
+
+def _loader(yahoo, config):
+    """新建不共享缓存的 DataLoader，每次调用都重新标准化"""
+    ticker = yahoo.symbols[0]
+    return FakeDataLoader(ticker, yahoo=yahoo, cache=SnapshotCache(), config=config)
+
+
+def case_normalize_chain(params, config):
+    yahoo = FakeYahoo(['SYN000'], n_strikes=params['strikes'], n_expirations=params['expirations'])
+    raw = yahoo.option_chain
+    return lambda: _normalize_option_chain(raw), len(raw)
+
+
+def case_fetch_option_chain(params, config):
+    yahoo = FakeYahoo(['SYN000'], n_strikes=params['strikes'], n_expirations=params['expirations'])
+    items = len(yahoo.option_chain)
+    return lambda: _loader(yahoo, config).fetch_option_chain(), items
+
+
+def _signal_generator(params, config):
+    yahoo = FakeYahoo(['SYN000'], n_strikes=params['strikes'], n_expirations=params['expirations'])
+    loader = _loader(yahoo, config)
+    sg = SignalGenerator(loader)
+    sg.spot_price = loader.get_real_time_data()['Close'].iloc[-1]
+    return sg, loader.fetch_option_chain()
+
+
+def case_select_strike_by_delta(params, config):
+    sg, _ = _signal_generator(params, config)
+    chain = sg.dl.fetch_chain()
+    return lambda: sg._select_strike_by_delta('call', 0.3, chain), len(chain)
+
+
+def case_prefilter_chain(params, config):
+    sg, _ = _signal_generator(params, config)
+    chain = sg.dl.fetch_chain()
+    return lambda: sg._prefilter(chain), len(chain)
+
+
+def case_contract_lookup(params, config):
+    sg, _ = _signal_generator(params, config)
+    chain = sg.dl.fetch_chain()
+    strikes = chain['strike'][slice(*chain.group('call'))].tolist()
+
+    def run():
+        # 逐个行权价二分查找合约，取代布尔掩码扫描整条链
+        for strike in strikes:
+            chain.contract(strike, 'call')
+    return run, len(strikes)
+
+
+def case_strategy_engine(params, config):
+    sg, chain = _signal_generator(params, config)
+    chain = sg._prefilter(sg._fill_implied_volatility(chain))
+    engine = StrategyEngine.from_config(config.get('strategies'), min_probability=0)
+
+    def run():
+        table = LegTable(chain, sg.spot_price, sigma=0.25)
+        engine.signals(table, 'SYN000', limit=3)
+    return run, len(engine.strategies)
+
+
+def case_strategy_engine_pool(params, config):
+    from src.utils.compute_pool import ComputePool
+    from src.utils.strategies import evaluate_chain
+
+    sg, chain = _signal_generator(params, config)
+    chain = sg._fill_implied_volatility(chain)
+    pool = ComputePool(max_workers=params['max_workers'], min_rows=0)
+    kwargs = dict(spot=sg.spot_price, settings=config.get('strategies'), ticker='SYN000',
+                  sigma=0.25, limit=3, min_probability=0)
+    # 预先启动全部进程，计时只包含共享内存传递和计算
+    for future in [pool.submit(evaluate_chain, chain=chain, **kwargs) for _ in range(pool.max_workers)]:
+        future.result()
+
+    def run():
+        # 每个标的一个任务，同时提交
+        futures = [pool.submit(evaluate_chain, chain=chain, **kwargs) for _ in range(params['tickers'])]
+        for future in futures:
+            future.result()
+    return run, params['tickers']
+
+
+def _greeks_inputs(params, config):
+    sg, chain = _signal_generator(params, config)
+    chain = chain[chain['impliedVolatility'] > 0]
+    return sg.spot_price, chain
+
+
+def case_calculate_greeks(params, config):
+    spot, chain = _greeks_inputs(params, config)
+    rows = list(zip(chain['type'], chain['strike'], np.maximum(1, chain['days_to_expire']),
+                    chain['impliedVolatility']))
+
+    def run():
+        for option_type, strike, t, iv in rows:
+            calculate_greeks(option_type, strike, spot, t, iv)
+    return run, len(rows)
+
+
+def case_calculate_greeks_batch(params, config):
+    spot, chain = _greeks_inputs(params, config)
+    arrays = (chain['type'].to_numpy(), chain['strike'].to_numpy(),
+              np.maximum(1, chain['days_to_expire'].to_numpy()), chain['impliedVolatility'].to_numpy())
+    return lambda: calculate_greeks_batch(arrays[0], arrays[1], spot, arrays[2], arrays[3]), len(chain)
+
+
+def case_calculate_probability(params, config):
+    sg, chain = _signal_generator(params, config)
+    sigma = sg._historical_sigma()
+    strikes = np.sort(chain['strike'].unique())
+    pairs = list(zip(strikes[:-1], strikes[1:]))
+
+    def run():
+        for long_strike, short_strike in pairs:
+            sg._calculate_probability(long_strike, short_strike, sigma)
+    return run, len(pairs)
+
+
+def case_bar_buffer_append(params, config):
+    bars = make_bars('SYN000', 100.0, n_bars=params['strikes'] * params['expirations'])
+    values = bars[['open', 'high', 'low', 'close', 'volume']].to_numpy()
+    times = bars.index.get_level_values('date').asi8
+
+    def run():
+        # 逐根追加并读取 O(1) 维护的现价和波动率
+        buffer = BarBuffer(capacity=78)
+        for timestamp, row in zip(times, values):
+            buffer.append(timestamp, *row)
+            buffer.spot, buffer.sigma
+    return run, len(bars)
+
+
+def _risk_book(params):
+    """每个标的放入若干价差持仓的风险账本"""
+    book = RiskBook()
+    expiration = pd.Timestamp.now().normalize() + pd.Timedelta(days=30)
+    for i, ticker in enumerate(_tickers(params['tickers'])):
+        for j in range(params['expirations']):
+            strike = 100.0 + j
+            legs = [{'type': 'call', 'strike': strike, 'quantity': 1, 'expiration': expiration, 'iv': 0.3},
+                    {'type': 'call', 'strike': strike + 5, 'quantity': -1, 'expiration': expiration, 'iv': 0.3}]
+            book.add((ticker, j), ticker, legs, 100.0)
+    return book
+
+
+def case_risk_check(params, config):
+    book = _risk_book(params)
+    greeks = {'delta': 0.2, 'gamma': 0.01, 'theta': -0.01, 'vega': 0.02}
+    return lambda: book.check('SYN000', greeks), 1
+
+
+def case_scenario_grid(params, config):
+    book = _risk_book(params)
+    spot_shocks = np.linspace(-0.2, 0.2, 21)
+    vol_shocks = np.linspace(-0.1, 0.1, 11)
+    return lambda: book.scenario_grid(spot_shocks, vol_shocks), len(spot_shocks) * len(vol_shocks)
+
+
+def case_fit_vol_surface(params, config):
+    sg, _ = _signal_generator(params, config)
+    chains = sg.dl._normalized_chains()
+    return lambda: VolSurface.fit(chains, sg.spot_price), len(chains)
+
+
+def case_scan_all(params, config):
+    from src.daemon import OptionsScanner
+
+    tickers = _tickers(params['tickers'])
+    scan_config = _config(tickers, params['max_workers'])
+
+    class BenchScanner(OptionsScanner):
+        def _load_config(self):
+            return scan_config
+
+        def _notify(self, message):
+            pass
+
+    factory = lambda watchlist, **kwargs: FakeWatchlistLoader(
+        watchlist, scan_config, params['strikes'], params['expirations']
+    )
+    with mock.patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': ''}), \
+            mock.patch('src.daemon.WatchlistLoader', factory):
+        scanner = BenchScanner()
+    # 预先生成合成数据，计时只包含扫描本身
+    scanner.watchlist_loader.yahoo.option_chain
+
+    def run():
+        # 每轮清空缓存，模拟快照过期后的完整周期
+        scanner.watchlist_loader.cache.invalidate()
+        results = scanner.scan_all()
+        assert len(results) == len(tickers), "scan_all 被跳过"
+    return run, len(tickers)
+
+
+CASES = {
+    'normalize_chain': case_normalize_chain,
+    'fetch_option_chain': case_fetch_option_chain,
+    'select_strike_by_delta': case_select_strike_by_delta,
+    'prefilter_chain': case_prefilter_chain,
+    'contract_lookup': case_contract_lookup,
+    'calculate_greeks': case_calculate_greeks,
+    'calculate_greeks_batch': case_calculate_greeks_batch,
+    'calculate_probability': case_calculate_probability,
+    'bar_buffer_append': case_bar_buffer_append,
+    'risk_check': case_risk_check,
+    'scenario_grid': case_scenario_grid,
+    'fit_vol_surface': case_fit_vol_surface,
+    'strategy_engine': case_strategy_engine,
+    'strategy_engine_pool': case_strategy_engine_pool,
+    'scan_all': case_scan_all,
+}
+
+
+# 受线程/进程调度影响较大的用例使用更宽的耗时容忍度（比例）
+CASE_TOLERANCES = {
+    'strategy_engine_pool': 1.0,
+    'scan_all': 1.0,
+}
+
+
+def measure(func, items, repeat=5, min_time=0.2):
+    """
+    测量单次调用耗时及峰值内存
+
+    每轮重复调用直到累计耗时超过 min_time。seconds 为各轮平均耗时中的最优值（用于吞吐量），
+    min_seconds 为所有调用中最快的一次，受调度和频率波动的影响最小，用于回归比较。
+    峰值内存在计时结束后单独用 tracemalloc 测量一次，避免跟踪开销影响计时。
+    """
+    func()  # 预热
+    best = fastest = float('inf')
+    for _ in range(repeat):
+        calls = 0
+        elapsed = 0.0
+        while elapsed < min_time:
+            start = time.perf_counter()
+            func()
+            took = time.perf_counter() - start
+            fastest = min(fastest, took)
+            elapsed += took
+            calls += 1
+        best = min(best, elapsed / calls)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'seconds': best,
+        'min_seconds': fastest,
+        'items': items,
+        'throughput': items / best if best > 0 else float('inf'),
+        'peak_kib': peak / 1024,
+    }
+
+
+def run_benchmarks(params, names=None, repeat=5, min_time=0.2):
+    config = _config(_tickers(params['tickers']), params['max_workers'])
+    results = {}
+    for name in names or CASES:
+        func, items = CASES[name](params, config)
+        results[name] = measure(func, items, repeat, min_time)
+    return results
+
+
+def compare(results, baseline, time_tolerance=0.5, memory_tolerance=0.25, min_delta=5e-5,
+            tolerances=CASE_TOLERANCES):
+    """
+    与基线比较，返回回归描述列表（为空表示无回归）
+
+    耗时比较最快单次调用（基线中没有时退回平均耗时）；超过该用例的容忍度
+    （tolerances 中未列出的用例为 time_tolerance）且绝对差值超过 min_delta 秒才算回归。
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        key = 'min_seconds' if 'min_seconds' in reference and 'min_seconds' in current else 'seconds'
+        tolerance = (tolerances or {}).get(name, time_tolerance)
+        if current[key] > reference[key] * (1 + tolerance) and current[key] - reference[key] > min_delta:
+            regressions.append(
+                f"{name}: 耗时 {current[key]*1e3:.3f}ms，基线 {reference[key]*1e3:.3f}ms"
+            )
+        if current['peak_kib'] > reference['peak_kib'] * (1 + memory_tolerance):
+            regressions.append(
+                f"{name}: 峰值内存 {current['peak_kib']:.0f}KiB，基线 {reference['peak_kib']:.0f}KiB"
+            )
+    return regressions
+
+
+def format_results(results, baseline=None):
+    baseline = baseline or {}
+    lines = [f"{'用例':<24}{'耗时(ms)':>12}{'吞吐(项/s)':>14}{'峰值(KiB)':>12}{'对比基线':>10}"]
+    for name, r in results.items():
+        reference = baseline.get(name)
+        ratio = f"{r['seconds'] / reference['seconds']:.2f}x" if reference else '-'
+        lines.append(
+            f"{name:<24}{r['seconds']*1e3:>12.3f}{r['throughput']:>14.0f}{r['peak_kib']:>12.0f}{ratio:>10}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='期权扫描性能基准')
+    parser.add_argument('--strikes', type=int, default=80, help='每个到期日的行权价数量')
+    parser.add_argument('--expirations', type=int, default=8, help='到期日数量')
+    parser.add_argument('--tickers', type=int, default=10, help='scan_all 的标的数量')
+    parser.add_argument('--max-workers', type=int, default=4, help='scan_all 的并发数')
+    parser.add_argument('--case', action='append', choices=list(CASES), help='只运行指定用例，可多次指定')
+    parser.add_argument('--repeat', type=int, default=5, help='计时轮数')
+    parser.add_argument('--min-time', type=float, default=0.2, help='每轮最短计时（秒）')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help='基线文件')
+    parser.add_argument('--save-baseline', action='store_true', help='将本次结果保存为基线')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='耗时回归容忍度（比例），CASE_TOLERANCES 中的用例除外')
+    parser.add_argument('--min-delta', type=float, default=5e-5, help='耗时回归的最小绝对差值（秒）')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='内存回归容忍度（比例）')
+    args = parser.parse_args(argv)
+
+    params = {'strikes': args.strikes, 'expirations': args.expirations,
+              'tickers': args.tickers, 'max_workers': args.max_workers}
+    results = run_benchmarks(params, args.case, args.repeat, args.min_time)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps({'params': params, 'results': results}, indent=2) + '\n')
+        print(format_results(results))
+        print(f"基线已保存到 {baseline_path}")
+        return 0
+
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    if baseline is None:
+        print(format_results(results))
+        print(f"未找到基线 {baseline_path}，使用 --save-baseline 创建")
+        return 0
+    if baseline['params'] != params:
+        print(format_results(results))
+        print(f"基准参数与基线不一致（基线: {baseline['params']}），跳过比较")
+        return 0
+
+    print(format_results(results, baseline['results']))
+    regressions = compare(results, baseline['results'], args.tolerance, args.memory_tolerance, args.min_delta)
+    if regressions:
+        print("\n性能回归:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\n未发现性能回归")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import threading
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from src.data_loader import DataLoader, WatchlistLoader
+from src.utils.cache import SnapshotCache
+from src.utils.bar_buffer import BarBuffers
+from src.utils.earnings_calendar import EarningsCalendar
+
+
+def _bs_price(is_call, spot, strike, t, r, sigma):
+    vol = sigma * np.sqrt(t)
+    d1 = (np.log(spot / strike) + (r + 0.5 * sigma ** 2) * t) / vol
+    d2 = d1 - vol
+    call = spot * ndtr(d1) - strike * np.exp(-r * t) * ndtr(d2)
+    put = strike * np.exp(-r * t) * ndtr(-d2) - spot * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def make_raw_chain(symbol, spot, n_strikes=80, n_expirations=8, atm_iv=0.3, seed=0, now=None):
+    """
+    生成与 yahooquery option_chain 结构一致的合成期权链
+
+    行权价以现价为中心按约1%间距分布，隐含波动率带偏斜和微笑，
+    买卖价差随虚值程度扩大，远端合约成交稀少，少量合约的隐含波动率为0。
+    """
+    rng = np.random.default_rng(seed)
+    now = pd.Timestamp(now or pd.Timestamp.now()).normalize()
+    step = max(0.5, round(spot * 0.01 * 2) / 2)
+    strikes = np.round(spot + step * (np.arange(n_strikes) - n_strikes // 2), 2)
+    strikes = strikes[strikes > 0]
+    expirations = [now + pd.Timedelta(days=int(d)) for d in 7 * np.arange(1, n_expirations + 1) + 2]
+
+    frames = []
+    for expiration in expirations:
+        t = (expiration - now).days / 365
+        moneyness = np.log(strikes / spot)
+        iv = np.clip(atm_iv - 0.15 * moneyness + 0.8 * moneyness ** 2, 0.05, 3.0)
+        for option_type in ('calls', 'puts'):
+            is_call = option_type == 'calls'
+            price = _bs_price(is_call, spot, strikes, t, 0.01, iv)
+            half_spread = np.maximum(0.01, price * (0.02 + 0.2 * np.abs(moneyness)))
+            volume = rng.poisson(2000 * np.exp(-30 * moneyness ** 2))
+            quoted_iv = np.where(rng.random(len(strikes)) < 0.03, 0.0, iv)
+            frames.append(pd.DataFrame({
+                'symbol': symbol,
+                'expiration': expiration,
+                'optionType': option_type,
+                'contractSymbol': [f"{symbol}{expiration:%y%m%d}{option_type[0].upper()}{k:08.0f}" for k in strikes * 1000],
+                'strike': strikes,
+                'currency': 'USD',
+                'lastPrice': np.round(price, 2),
+                'change': 0.0,
+                'percentChange': 0.0,
+                'volume': volume,
+                'openInterest': volume * 5,
+                'bid': np.round(np.maximum(price - half_spread, 0), 2),
+                'ask': np.round(price + half_spread, 2),
+                'contractSize': 'REGULAR',
+                'lastTradeDate': now,
+                'impliedVolatility': quoted_iv,
+                'inTheMoney': (strikes < spot) if is_call else (strikes > spot),
+            }))
+    df = pd.concat(frames, ignore_index=True)
+    return df.set_index(['symbol', 'expiration', 'optionType']).sort_index()
+
+
+def make_bars(symbol, spot, n_bars=78, sigma=0.3, seed=0, end=None):
+    """生成与 yahooquery history 结构一致的5分钟K线"""
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end or pd.Timestamp.now()).floor('5min')
+    dates = pd.date_range(end=end, periods=n_bars, freq='5min')
+    step_vol = sigma / np.sqrt(252 * 78)
+    close = spot * np.exp(np.cumsum(rng.normal(0, step_vol, n_bars)))
+    close *= spot / close[-1]
+    index = pd.MultiIndex.from_product([[symbol], dates], names=['symbol', 'date'])
+    return pd.DataFrame({'open': close, 'high': close * 1.001, 'low': close * 0.999,
+                         'close': close, 'volume': rng.integers(1e4, 1e5, n_bars)}, index=index)
+
+
+class FakeYahoo:
+    """离线替代 yahooquery.Ticker，支持多标的批量调用"""
+
+    def __init__(self, symbols, spots=None, n_strikes=80, n_expirations=8):
+        self.symbols = list(symbols) if isinstance(symbols, (list, tuple)) else [symbols]
+        self.session = None
+        self.spots = spots or {}
+        self._chains = {}
+        self._bars = {}
+        self.n_strikes = n_strikes
+        self.n_expirations = n_expirations
+
+    def for_symbols(self, symbols):
+        """共享已生成数据的另一个客户端，用于单标的 DataLoader"""
+        client = FakeYahoo(symbols, self.spots, self.n_strikes, self.n_expirations)
+        client._chains = self._chains
+        client._bars = self._bars
+        return client
+
+    def _spot(self, symbol):
+        return self.spots.get(symbol, 100.0 + 10 * (sum(map(ord, symbol)) % 40))
+
+    def _chain(self, symbol):
+        if symbol not in self._chains:
+            self._chains[symbol] = make_raw_chain(
+                symbol, self._spot(symbol), self.n_strikes, self.n_expirations,
+                seed=sum(map(ord, symbol))
+            )
+        return self._chains[symbol]
+
+    def history(self, period='ytd', interval='5m', start=None, adj_timezone=True):
+        frames = []
+        for symbol in self.symbols:
+            if symbol not in self._bars:
+                self._bars[symbol] = make_bars(symbol, self._spot(symbol), seed=sum(map(ord, symbol)))
+            bars = self._bars[symbol]
+            if start is not None:
+                bars = bars[bars.index.get_level_values('date') >= pd.Timestamp(start)]
+            frames.append(bars)
+        return pd.concat(frames)
+
+    @property
+    def option_chain(self):
+        return pd.concat([self._chain(s) for s in self.symbols])
+
+    @property
+    def quote_type(self):
+        return {s: {'quoteType': 'EQUITY'} for s in self.symbols}
+
+    @property
+    def calendar_events(self):
+        return {s: {'earnings': {'earningsDate': []}} for s in self.symbols}
+
+
+class FakeDataLoader(DataLoader):
+    """使用合成数据的 DataLoader，不访问网络，IV排名固定"""
+
+    __slots__ = ('_iv_rank',)
+
+    def __init__(self, ticker, yahoo=None, cache=None, config=None, iv_rank=10.0, buffers=None, calendar=None):
+        self.ticker = ticker
+        self.config = config if config is not None else self._load_config()
+        self.cache = cache if cache is not None else SnapshotCache()
+        self.buffers = buffers if buffers is not None else BarBuffers()
+        self._calendar = calendar if calendar is not None else EarningsCalendar(':memory:')
+        self._session = None
+        self._yahoo = yahoo or FakeYahoo([ticker])
+        self._iv_rank = iv_rank
+
+    def get_iv_rank(self, current_iv=None):
+        return self._iv_rank
+
+
+class FakeWatchlistLoader(WatchlistLoader):
+    """使用合成数据的批量加载器"""
+
+    def __init__(self, tickers, config, n_strikes=80, n_expirations=8):
+        self.config = config
+        self.cache = SnapshotCache()
+        self.buffers = BarBuffers()
+        self._calendar = EarningsCalendar(':memory:')
+        self._loaders = {}
+        self._loaders_lock = threading.Lock()
+        self.tickers = list(tickers)
+        self.yahoo = FakeYahoo(self.tickers, n_strikes=n_strikes, n_expirations=n_expirations)
+
+    def _new_loader(self, ticker):
+        return FakeDataLoader(
+            ticker, yahoo=self.yahoo.for_symbols([ticker]), cache=self.cache,
+            config=self.config, buffers=self.buffers, calendar=self.calendar
+        )
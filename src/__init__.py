@@ -1,5 +1,18 @@
-from .data_loader import DataLoader
-from .signal_generator import SignalGenerator
-from .risk_manager import RiskManager
+import importlib
 
-__all__ = ['DataLoader', 'SignalGenerator', 'RiskManager']
\ No newline at end of file
+# 按需导入，避免导入 src.utils 等子模块时加载整个数据与信号层
+_LAZY = {
+    'DataLoader': '.data_loader',
+    'SignalGenerator': '.signal_generator',
+    'RiskManager': '.risk_manager',
+}
+
+__all__ = ['DataLoader', 'SignalGenerator', 'RiskManager']
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,21 +1,48 @@
-from src.data_loader import DataLoader
-from src.signal_generator import SignalGenerator
-from src.risk_manager import RiskManager
+from src.utils.metrics import metrics, summary_line, profile_call
 import click
 
+
+def _print_import_time(ctx, param, value):
+    """打印各依赖的导入耗时后退出"""
+    if not value or ctx.resilient_parsing:
+        return
+    from src.utils.startup import import_report
+    
+    click.echo(import_report('src.cli'))
+    click.echo()
+    click.echo(import_report('src.signal_generator'))
+    ctx.exit()
+
 @click.command()
+@click.option('--import-time', is_flag=True, is_eager=True, expose_value=False,
+              callback=_print_import_time, help='测量启动时各依赖的导入耗时')
 @click.option('--ticker', prompt='请输入标的代码', help='例如：QQQ, NVDA')
-def main(ticker):
+@click.option('--profile', 'profile_path', default=None,
+              help='使用cProfile记录本次分析并保存到指定文件')
+def main(ticker, profile_path):
     """期权交易决策命令行接口"""
+    if profile_path:
+        profile_call(analyze, profile_path, ticker)
+        print(f"\n⏱ {summary_line(metrics.snapshot())}")
+        print(f"性能分析结果已保存到 {profile_path}")
+    else:
+        analyze(ticker)
+
+def analyze(ticker):
+    """分析单个标的并输出交易信号"""
+    # 数据与信号层依赖 pandas/yahooquery，解析完参数后再导入
+    from src.data_loader import DataLoader
+    from src.signal_generator import SignalGenerator
+    from src.risk_manager import RiskManager
+    
     dl = DataLoader(ticker)
     sg = SignalGenerator(dl)
-    rm = RiskManager(dl.config['strategy'])
+    rm = RiskManager(dl.config.strategy)
     
     print(f"\n🔍 正在分析 {ticker}...")
     
     # 获取必要数据
     earnings_dates = dl.get_earnings_dates()
-    option_chain = dl.fetch_option_chain()
     
     # 风险检查
     if rm.check_event_risk(earnings_dates):
@@ -23,14 +50,14 @@ def main(ticker):
         return
         
     # 生成信号
-    signal = sg.generate_vertical_spread_signal()
+    signals = [s for s in sg.generate_signals() if rm.check_greeks(s['greeks'])]
     
-    if signal and rm.check_greeks(signal['greeks']):
+    for signal in signals:
         print("\n🎯 交易信号生成成功")
         print(f"策略类型: {signal['strategy_type']}")
         print(f"建议行权价: {signal['strikes']}")
         print(f"预期胜率: {signal['probability']}%")
-    else:
+    if not signals:
         print("\n❌ 未找到有效交易机会")
 
 if __name__ == '__main__':
@@ -1,13 +1,26 @@
 #!/usr/bin/env python3
+import sys
 import time
-import schedule
+import math
+import argparse
+import threading
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import logging
 from pathlib import Path
-import telegram
-from src.data_loader import DataLoader
+from src.settings import as_settings, get_settings
+from src.data_loader import WatchlistLoader, get_snapshot_cache
+from src.utils.history_store import get_history_store
+from src.utils.metrics import metrics, summary_line, write_metrics, profile_call
+from src.utils.snapshots import SnapshotRecorder
+from src.utils.risk_book import get_risk_book
+from src.utils.compute_pool import get_compute_pool
+from src.utils.change_detection import ChangeGate, SignalDeduplicator
+from src.utils.market_hours import MarketHours
+from src.utils.poll_scheduler import PollScheduler
+from src.utils.memory import MemoryMonitor
 from src.signal_generator import SignalGenerator
 from src.risk_manager import RiskManager
-import yaml
 import os
 
 # 配置日志
@@ -27,76 +40,454 @@ logger = logging.getLogger(__name__)
 
 class OptionsScanner:
     def __init__(self):
-        self.config = self._load_config()
-        self.bot = self._setup_telegram()
+        self.config = as_settings(self._load_config())
+        # 行情与通知请求共享的连接池、重试预算和熔断器
+        from src.utils.http_transport import get_transport
+        self.transport = get_transport(self.config)
+        self.notifier = self._setup_telegram()
+        
+        # 并发扫描设置
+        self.max_workers = max(1, self.config.scanner.max_workers)
+        self.ticker_timeout = self.config.scanner.ticker_timeout
+        self.executor = (
+            ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scan')
+            if self.max_workers > 1 else None
+        )
+        self._cycle_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._inflight = set()
+        self._started = {}
+        self._observations = {}
+        # 各标的最近一次完整分析的信号接近度，输入未变化而跳过分析时沿用
+        self._proximity = {}
+        
+        # 周期指标输出；调度循环按批扫描，周期按时间划分（默认为基准轮询间隔）
+        metrics_config = self.config.get('metrics') or {}
+        self.metrics_path = metrics_config.get('path')
+        self.summary_every = max(1, int(metrics_config.get('summary_every', 1)))
+        self.cycle_interval = (
+            self.config.scanner.cycle_interval or self.config.strategy.polling_interval * 60
+        )
+        self._cycles = 0
+        self._cycle_started = time.monotonic()
+        self._history_day = None
+        
+        # 快照录制，供离线回放和回测使用
+        recorder_config = self.config.get('recorder') or {}
+        self.recorder = (
+            SnapshotRecorder(recorder_config.get('path', 'data/snapshots'))
+            if recorder_config.get('enabled') else None
+        )
+        
+        # 组合风险账本：跨标的汇总已发出信号的希腊值敞口
+        portfolio_config = self.config.get('portfolio') or {}
+        self.risk_book = get_risk_book(self.config) if portfolio_config.get('enabled') else None
+        self.position_quantity = float(portfolio_config.get('quantity', 1))
+        self.scenario = portfolio_config.get('scenario') or {}
+        
+        # 定价与策略评估提交到常驻进程池，扫描线程只负责I/O
+        self.compute = get_compute_pool(self.config)
+        
+        # 增量分析：输入未变化的标的跳过重新计算，同一信号在去重窗口内只发送一次
+        incremental = self.config.get('incremental') or {}
+        self.gate = ChangeGate.from_config(incremental) if incremental.get('enabled') else None
+        self.deduplicator = SignalDeduplicator(float(incremental.get('dedup_window', 0)))
+        
+        # 按标的自适应轮询：基准间隔为 strategy.polling_interval，全局请求预算均匀摊开
+        self.scheduler = PollScheduler.from_config(
+            self.config.get('polling'), self.config.strategy.polling_interval
+        )
+        
+        # 交易时段：休市期间每个标的的间隔不短于 closed_interval
+        market_config = self.config.get('market_hours') or {}
+        self.market_hours = MarketHours.from_config(market_config)
+        self.closed_interval = float(market_config.get('closed_interval', 0))
+        
+        # 整个观察列表共享一个批量加载器及其HTTP会话，每个标的的 DataLoader/SignalGenerator 跨周期复用
+        self.watchlist_loader = WatchlistLoader(self.config['watchlist'], config=self.config)
+        self._generators = {}
+        
+        # 内存：扫描后立即释放标的的行情快照，定期报告RSS/分配位置并检查软上限
+        memory_config = self.config.get('memory') or {}
+        self.release_frames = bool(memory_config.get('release_frames', True))
+        self.restart_on_limit = bool(memory_config.get('restart_on_limit', False))
+        self.over_memory_limit = False
+        self.memory = MemoryMonitor.from_config(memory_config)
+        self.memory.add_releaser(self._release_caches)
+        self.memory.start()
         
     def _load_config(self):
-        with open('config/config.yaml') as f:
-            return yaml.safe_load(f)
+        return get_settings()
             
     def _setup_telegram(self):
         token = os.getenv('TELEGRAM_BOT_TOKEN')
         if not token:
             logger.warning("Telegram bot token not found")
             return None
-        return telegram.Bot(token)
+        from src.notification import NotificationManager
+        
+        return NotificationManager(
+            token=token, config=self.config.get('notification'), session=self.transport.session()
+        )
     
     def scan_ticker(self, ticker):
         """扫描单个股票"""
+        message = self._analyze_ticker(ticker)
+        if message:
+            self._notify(message)
+    
+    def _analyze_ticker(self, ticker):
+        """分析单个股票，返回待发送的信号消息，无信号时返回 None；同时记录供调度使用的观测"""
+        started = time.monotonic()
+        observation = {}
         try:
-            dl = DataLoader(ticker)
-            sg = SignalGenerator(dl)
-            rm = RiskManager(dl.config['strategy'])
-            
-            # 获取必要数据
-            earnings_dates = dl.get_earnings_dates()
-            option_chain = dl.fetch_option_chain()
+            return self._evaluate_ticker(ticker, observation)
+        except Exception as e:
+            logger.error(f"扫描 {ticker} 时发生错误: {str(e)}", exc_info=True)
+            return None
+        finally:
+            observation['latency'] = time.monotonic() - started
+            with self._state_lock:
+                self._observations[ticker] = observation
+            if self.release_frames:
+                self.watchlist_loader.release(ticker)
+    
+    def _generator(self, ticker, dl):
+        """标的的 SignalGenerator，跨周期复用（同一标的不会被并发扫描）"""
+        with self._state_lock:
+            sg = self._generators.get(ticker)
+            if sg is None or sg.dl is not dl:
+                sg = self._generators[ticker] = SignalGenerator(dl, compute=self.compute)
+        sg.reset()
+        return sg
+    
+    def _retain(self, watchlist):
+        """释放已移出观察列表的标的的加载器和信号生成器"""
+        self.watchlist_loader.retain(watchlist)
+        wanted = set(watchlist)
+        with self._state_lock:
+            for ticker in [t for t in self._generators if t not in wanted]:
+                del self._generators[ticker]
+            for ticker in [t for t in self._proximity if t not in wanted]:
+                del self._proximity[ticker]
+    
+    def _release_caches(self):
+        """超过内存软上限时清空行情快照和复用的对象"""
+        self.watchlist_loader.cache.invalidate()
+        self.watchlist_loader.retain([])
+        with self._state_lock:
+            self._generators.clear()
+    
+    def _evaluate_ticker(self, ticker, observation):
+        """
+        单个标的的分析流程
+        
+        参数:
+            observation (dict): 写入最近波动率（volatility）和信号接近度（proximity）
+        """
+        dl = self.watchlist_loader.loader(ticker)
+        sg = self._generator(ticker, dl)
+        rm = RiskManager(self.config.strategy, book=self.risk_book)
+        
+        # 获取必要数据
+        earnings_dates = dl.get_earnings_dates()
+        
+        # 风险检查
+        if rm.check_event_risk(earnings_dates):
+            return None
+        observation['volatility'] = dl.bar_buffer().sigma
+        
+        # 现价、报价和财报日期与上次分析相同时不重新计算
+        fingerprint = self._fingerprint(dl, sg, earnings_dates)
+        if self.gate is not None and self.gate.unchanged(ticker, fingerprint):
+            with self._state_lock:
+                observation['proximity'] = self._proximity.get(ticker, 0.0)
+            metrics.incr('gate.unchanged')
+            logger.debug("%s 输入未变化，跳过分析", ticker)
+            return None
             
-            # 风险检查
-            if rm.check_event_risk(earnings_dates):
-                return
-                
-            # 生成信号
-            signal = sg.generate_vertical_spread_signal()
+        # 生成信号（全部已启用策略共享同一份期权链）
+        signals = sg.generate_signals()
+        observation['proximity'] = 1.0 if signals else 0.0
+        with self._state_lock:
+            self._proximity[ticker] = observation['proximity']
+        if self.gate is not None:
+            self.gate.update(ticker, fingerprint)
+        if self.recorder:
+            self.recorder.record_cached(ticker, dl.cache)
+        if self.risk_book is not None and sg.spot_price:
+            self.risk_book.update_spot(ticker, sg.spot_price)
+        
+        accepted = [
+            signal for signal in signals
+            if rm.check_greeks(signal['greeks']) and
+            rm.check_portfolio(signal, self.position_quantity)
+        ]
+        fresh = self.deduplicator.filter(accepted)
+        if len(fresh) < len(accepted):
+            metrics.incr('signals.deduplicated', len(accepted) - len(fresh))
+        accepted = fresh
+        if accepted:
+            return "\n\n".join(
+                f"🎯 交易信号生成成功\n"
+                f"策略类型: {signal['strategy_type']}\n"
+                f"建议行权价: {signal['strikes']}\n"
+                f"预期胜率: {signal['probability']}%"
+                for signal in accepted
+            )
+        return None
+    
+    def _fingerprint(self, dl, sg, earnings_dates):
+        """本次分析的输入指纹，未启用增量分析或缺少数据时返回 None"""
+        if self.gate is None:
+            return None
+        spot = sg.current_spot()
+        if spot is None:
+            return None
+        return self.gate.fingerprint(spot, sg.fetch_chain(), earnings_dates)
+    
+    def _notify(self, message):
+        """发送到Telegram（异步入队，不阻塞扫描）"""
+        if self.notifier:
+            self.notifier.notify(message)
+        else:
+            print(message)
+    
+    def _notify_cycle(self, messages):
+        """将一个周期内的信号合并为一条消息发送"""
+        if self.notifier:
+            self.notifier.notify_batch(messages)
+        else:
+            for message in messages:
+                self._notify(message)
+    
+    def warm_up(self):
+        """启动时批量同步整个观察列表的本地历史数据，之后由 tick() 每天同步一次"""
+        self._history_day = date.today()
+        try:
+            written = get_history_store(self.config).sync(self.config['watchlist'])
+            logger.info(f"历史数据预热完成，写入 {written} 条收盘价")
+        except Exception as e:
+            logger.error(f"历史数据预热失败: {str(e)}", exc_info=True)
+    
+    def scan_all(self, tickers=None):
+        """
+        扫描一批标的，返回按传入顺序排列的 (标的, 消息) 列表
+        
+        未传入标的时扫描整个观察列表，作为一个完整周期（清理、指标输出）；
+        调度循环传入的批次不划分周期，由 tick() 按时间处理。
+        
+        参数:
+            tickers (list): 本轮扫描的标的，默认整个观察列表
+        """
+        full_cycle = tickers is None
+        tickers = list(self.config['watchlist'] if tickers is None else tickers)
+        # 上一轮尚未结束时跳过本轮，避免周期重叠
+        if not self._cycle_lock.acquire(blocking=False):
+            logger.warning("上一轮扫描尚未结束，跳过本轮")
+            return []
+        
+        try:
+            if full_cycle:
+                self._start_cycle()
+            with metrics.timer('cycle.prefetch'):
+                self._prefetch(tickers)
             
-            if signal and rm.check_greeks(signal['greeks']):
-                message = (
-                    f"🎯 交易信号生成成功\n"
-                    f"策略类型: {signal['strategy_type']}\n"
-                    f"建议行权价: {signal['strikes']}\n"
-                    f"预期胜率: {signal['probability']}%"
-                )
-                
-                # 发送到Telegram
-                if self.bot:
-                    self.bot.send_message(
-                        chat_id=os.getenv('TELEGRAM_CHAT_ID'),
-                        text=message
-                    )
+            with metrics.timer('cycle.scan'):
+                if self.executor is None:
+                    results = [(t, self._analyze_ticker(t)) for t in tickers]
                 else:
-                    print(message)
-                    
+                    results = self._scan_concurrently(tickers)
+            metrics.incr('tickers_scanned', len(results))
+            metrics.incr('signals', sum(1 for _, message in results if message))
+            
+            # 按观察列表顺序发送，保证日志和通知的顺序稳定
+            messages = [message for _, message in results if message]
+            if messages:
+                try:
+                    self._notify_cycle(messages)
+                except Exception as e:
+                    logger.error(f"发送信号失败: {str(e)}", exc_info=True)
+            if full_cycle:
+                self._report_cycle()
+            return results
+        finally:
+            self._cycle_lock.release()
+    
+    def scan_due(self, now=None):
+        """
+        调度循环入口：扫描已到期且请求预算允许的标的，完成后按各标的的观测重新安排
+        
+        休市期间每个标的的间隔不短于 closed_interval。
+        
+        参数:
+            now (datetime): 当前时间，默认现在
+        """
+        self.scheduler.set_tickers(self.config['watchlist'])
+        tickers = self.scheduler.pop_due()
+        if not tickers:
+            return []
+        try:
+            return self.scan_all(tickers)
+        finally:
+            floor = 0 if self.market_hours.is_open(now) else self.closed_interval
+            for ticker in tickers:
+                with self._state_lock:
+                    observation = self._observations.pop(ticker, {})
+                self.scheduler.reschedule(ticker, min_interval=floor, **observation)
+    
+    def tick(self, now=None):
+        """
+        调度循环的周期边界：距上个周期开始满 cycle_interval 秒时输出本周期指标，
+        并为下个周期清理过期快照、已移出观察列表的标的和过期持仓
+        
+        参数:
+            now (float): time.monotonic() 时间，默认现在
+        
+        返回:
+            bool: 是否开始了新周期
+        """
+        now = time.monotonic() if now is None else now
+        if now - self._cycle_started < self.cycle_interval:
+            return False
+        with self._cycle_lock:
+            self._report_cycle()
+            self._start_cycle(now)
+            # 日期变化后增量同步日线收盘价（每个标的每天最多联网一次）
+            if self._history_day is not None and date.today() > self._history_day:
+                self.warm_up()
+        return True
+    
+    def _start_cycle(self, now=None):
+        """新周期开始前清理过期快照和已移出观察列表的标的，周期内各模块共享同一份数据"""
+        self._cycle_started = time.monotonic() if now is None else now
+        get_snapshot_cache(self.config).purge_expired()
+        self._retain(self.config['watchlist'])
+        if self.risk_book is not None:
+            self.risk_book.expire()
+    
+    def _report_cycle(self):
+        """输出本周期指标：定期写摘要日志，并写入机器可读的指标文件"""
+        snap = metrics.reset()
+        self._cycles += 1
+        if self._cycles % self.summary_every == 0:
+            logger.info(summary_line(snap))
+            self._report_risk()
+        if self.metrics_path:
+            try:
+                write_metrics(dict(snap, cycle=self._cycles), self.metrics_path)
+            except OSError as e:
+                logger.error(f"写入指标文件失败: {str(e)}")
+        if self.memory.enabled and not self.memory.on_cycle() and self.restart_on_limit:
+            self.over_memory_limit = True
+    
+    def _report_risk(self):
+        """输出组合敞口及情景分析中的最大亏损"""
+        if self.risk_book is None or not len(self.risk_book):
+            return
+        try:
+            exposure = self.risk_book.exposure()
+            grid = self.risk_book.scenario_grid(
+                self.scenario.get('spot_shocks', [-0.1, -0.05, 0, 0.05, 0.1]),
+                self.scenario.get('vol_shocks', [-0.1, 0, 0.1])
+            )
+            stacked = grid.stack()
+            worst = stacked.idxmin()
+            greeks = ' '.join(f"{name}={value:.4f}" for name, value in exposure.items())
+            logger.info(
+                f"组合 {len(self.risk_book)} 个持仓 | {greeks} | "
+                f"最大情景亏损 {stacked.min():.2f}（现价 {worst[0]:+.0%}，波动率 {worst[1]:+.2f}）"
+            )
         except Exception as e:
-            logger.error(f"扫描 {ticker} 时发生错误: {str(e)}", exc_info=True)
+            logger.error(f"组合风险报告失败: {str(e)}", exc_info=True)
+    
+    def _prefetch(self, tickers):
+        """批量预取本轮标的的数据，失败时由各标的单独获取"""
+        try:
+            # 财报日历每天对整个观察列表批量刷新一次
+            self.watchlist_loader.refresh_calendar(self.config['watchlist'])
+            self.watchlist_loader.set_tickers(tickers)
+            refreshed = self.watchlist_loader.refresh()
+            logger.debug("批量预取完成: %s", refreshed)
+        except Exception as e:
+            logger.error(f"批量预取失败: {str(e)}", exc_info=True)
     
-    def scan_all(self):
-        """扫描所有观察列表股票"""
-        for ticker in self.config['watchlist']:
-            self.scan_ticker(ticker)
+    def _scan_concurrently(self, watchlist):
+        """使用线程池并发扫描，单个标的超时后不再等待其结果"""
+        futures = []
+        with self._state_lock:
+            for ticker in watchlist:
+                # 上一轮超时仍在运行的标的本轮跳过
+                if ticker in self._inflight:
+                    logger.warning(f"{ticker} 上一轮扫描仍在运行，本轮跳过")
+                    continue
+                self._inflight.add(ticker)
+                future = self.executor.submit(self._run_tracked, ticker)
+                future.add_done_callback(lambda _, t=ticker: self._release(t))
+                futures.append((ticker, future))
+        
+        # 整轮的最长等待时间，防止排队中的标的无限等待
+        rounds = math.ceil(len(futures) / self.max_workers) if futures else 0
+        cycle_deadline = time.monotonic() + self.ticker_timeout * rounds
+        
+        results = []
+        for ticker, future in futures:
+            results.append((ticker, self._wait_result(ticker, future, cycle_deadline)))
+        return results
+    
+    def _wait_result(self, ticker, future, cycle_deadline):
+        while True:
+            try:
+                return future.result(timeout=0.2)
+            except FutureTimeoutError:
+                now = time.monotonic()
+                with self._state_lock:
+                    started = self._started.get(ticker)
+                if (started is not None and now - started > self.ticker_timeout) or now > cycle_deadline:
+                    future.cancel()
+                    logger.warning(f"扫描 {ticker} 超时（{self.ticker_timeout}秒），忽略本轮结果")
+                    return None
+    
+    def _run_tracked(self, ticker):
+        with self._state_lock:
+            self._started[ticker] = time.monotonic()
+        return self._analyze_ticker(ticker)
+    
+    def _release(self, ticker):
+        with self._state_lock:
+            self._inflight.discard(ticker)
+            self._started.pop(ticker, None)
 
-def main():
-    scanner = OptionsScanner()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='期权扫描守护进程')
+    parser.add_argument('--profile-cycle', metavar='PATH',
+                        help='使用cProfile记录首个扫描周期，结果保存到PATH')
+    parser.add_argument('--import-time', action='store_true',
+                        help='测量启动时各依赖的导入耗时后退出')
+    args = parser.parse_args(argv)
     
-    # 立即执行一次
-    scanner.scan_all()
+    if args.import_time:
+        from src.utils.startup import import_report
+        print(import_report('src.daemon'))
+        return
+    
+    scanner = OptionsScanner()
+    scanner.warm_up()
     
-    # 设置定时任务
-    schedule.every(1).minutes.do(scanner.scan_all)
+    # 首批到期的标的立即扫描
+    if args.profile_cycle:
+        profile_call(scanner.scan_due, args.profile_cycle)
     
-    # 持续运行
+    # 持续运行：每次扫描到期的标的，空闲时睡到下一个标的可扫描（最长1秒）；周期指标与清理按时间进行
     while True:
-        schedule.run_pending()
-        time.sleep(1)
+        scanner.scan_due()
+        scanner.tick()
+        if scanner.over_memory_limit:
+            # 释放缓存后仍超过内存软上限：退出由 systemd（Restart=always）重启
+            logger.error("内存超过软上限，退出等待重启")
+            sys.exit(75)
+        wait = scanner.scheduler.seconds_until_next()
+        time.sleep(1.0 if wait is None else min(1.0, max(0.05, wait)))
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
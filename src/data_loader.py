@@ -1,191 +1,468 @@
-from yahooquery import Ticker
 import pandas as pd
-import yaml
-import os
-from datetime import datetime
-import requests
 import logging
+import threading
+from src.settings import get_settings, load_config  # load_config 保留在此处供旧代码导入
+from src.utils.cache import SnapshotCache
+from src.utils.history_store import get_history_store
+from src.utils.earnings_calendar import get_earnings_calendar, fetch_earnings
+from src.utils.metrics import metrics, timed
+from src.utils.volatility import calculate_iv_rank
+from src.utils.iv_surface import VolSurface
+from src.utils.option_chain import OptionChain
+from src.utils.bar_buffer import get_bar_buffers
 
 logger = logging.getLogger(__name__)
 
+_snapshot_cache = None
+_snapshot_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache(config=None):
+    """获取进程内共享的行情快照缓存，首次创建时读取 cache.ttl 配置"""
+    global _snapshot_cache
+    with _snapshot_cache_lock:
+        if _snapshot_cache is None:
+            ttl = ((config or {}).get('cache') or {}).get('ttl')
+            _snapshot_cache = SnapshotCache(ttl)
+        return _snapshot_cache
+
+
+# 扫描结束后即可释放的快照类型：同一标的下一次扫描时它们都已过期
+# （earnings 和 iv_rank 体积小且有效期长，保留）
+RELEASABLE_KINDS = ('bars', 'chain', 'surface')
+
+
+def _release_snapshots(cache, ticker):
+    for kind in RELEASABLE_KINDS:
+        cache.invalidate(ticker, kind)
+
+
+def _is_empty_frame(df):
+    return not isinstance(df, pd.DataFrame) or df.empty
+
+
+def _create_yahoo(symbols, session=None):
+    """
+    创建yahooquery客户端，传入 session 时复用已有连接池
+
+    未传入时使用共享传输层的会话，重试、并发限制和熔断由传输层统一处理。
+    """
+    from yahooquery import Ticker
+    from src.utils.http_transport import get_transport
+
+    if session is None:
+        session = get_transport(get_settings()).session(asynchronous=True)
+    return Ticker(
+        symbols, 
+        asynchronous=True,
+        formatted=False,
+        session=session
+    )
+
+
+def _select_symbol(df, ticker):
+    """从多标的结果中取出单个标的的数据，保留 symbol 索引层"""
+    if _is_empty_frame(df) or 'symbol' not in df.index.names:
+        return pd.DataFrame()
+    return df[df.index.get_level_values('symbol') == ticker]
+
+
+def _normalize_bars(df):
+    """标准化yahooquery历史K线"""
+    if _is_empty_frame(df):
+        return pd.DataFrame()
+    
+    # 只保留需要的列
+    df = df[['open', 'high', 'low', 'close', 'volume']]
+    # 标准化列名
+    df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+    return df.dropna()
+
+
+@timed('normalize.chain')
+def _normalize_option_chain(chains):
+    """一次性把yahooquery原始期权链的全部到期日转换为列式 OptionChain"""
+    try:
+        return OptionChain.from_yahoo(chains)
+    except Exception as e:
+        logger.error(f"处理期权数据失败: {str(e)}", exc_info=True)
+        return OptionChain.empty_chain()
+
+
+def _is_empty_chain(chain):
+    return chain is None or chain.empty
+
+
 class DataLoader:
-    def __init__(self, ticker):
+    """
+    单标的数据加载器
+
+    守护进程中每个标的一个长期存在的实例（见 WatchlistLoader.loader），
+    状态只有下列引用，行情数据都在共享的快照缓存和K线缓冲区中。
+    """
+    
+    __slots__ = ('ticker', 'config', 'cache', 'buffers', '_session', '_calendar', '_yahoo')
+    
+    def __init__(self, ticker, cache=None, session=None, buffers=None, calendar=None):
         self.ticker = ticker
         self.config = self._load_config()
-        self.yahoo = Ticker(
-            ticker, 
-            asynchronous=True,
-            formatted=False,
-            retry=int(os.getenv('YAHOO_RETRIES', 5)),
-            backoff_factor=float(os.getenv('YAHOO_BACKOFF', 0.3))
-        )
+        self.cache = cache if cache is not None else get_snapshot_cache(self.config)
+        self.buffers = buffers if buffers is not None else get_bar_buffers(self.config)
+        self._session = session
+        self._calendar = calendar
+        self._yahoo = None
+    
+    @property
+    def yahoo(self):
+        """按需创建yahooquery客户端，缓存命中时无需创建"""
+        if self._yahoo is None:
+            self._yahoo = _create_yahoo(self.ticker, self._session)
+        return self._yahoo
+    
+    @yahoo.setter
+    def yahoo(self, client):
+        self._yahoo = client
+    
+    @property
+    def calendar(self):
+        """本地财报日历，默认使用进程内共享的实例"""
+        if self._calendar is None:
+            self._calendar = get_earnings_calendar(self.config)
+        return self._calendar
     
     def _load_config(self):
-        """加载配置，优先使用环境变量"""
-        with open('config/config.yaml') as f:
-            config = yaml.safe_load(f)
-            
-        # 使用环境变量覆盖配置文件
-        if 'strategy' in config:
-            config['strategy'].update({
-                'iv_percentile_threshold': float(os.getenv('STRATEGY_IV_THRESHOLD', 
-                    config['strategy'].get('iv_percentile_threshold', 60))),
-                'min_volume': int(os.getenv('STRATEGY_MIN_VOLUME',
-                    config['strategy'].get('min_volume', 100))),
-                'max_spread_ratio': float(os.getenv('STRATEGY_MAX_SPREAD',
-                    config['strategy'].get('max_spread_ratio', 0.1))),
-                'max_vega': float(os.getenv('STRATEGY_MAX_VEGA',
-                    config['strategy'].get('max_vega', 0.5)))
-            })
-            
-        return config
-    
-    def _get_session(self):
-        """创建带有自定义请求头的会话"""
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': '*/*',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        })
-        return session
+        """进程内共享的配置（只解析一次）"""
+        return get_settings()
+    
+    def invalidate(self, kind=None):
+        """使本标的的缓存快照失效"""
+        self.cache.invalidate(self.ticker, kind)
+    
+    def release(self):
+        """扫描结束后释放本标的的K线、期权链和波动率曲面快照"""
+        _release_snapshots(self.cache, self.ticker)
     
     def get_real_time_data(self, interval='5m'):
-        """获取实时行情数据"""
+        """获取实时行情数据（同一周期内共享缓存快照）"""
+        return self.cache.get_or_load(
+            self.ticker, 'bars',
+            lambda: self._load_real_time_data(interval),
+            key=interval,
+            is_empty=_is_empty_frame
+        )
+    
+    def bar_buffer(self, interval='5m'):
+        """本标的跨扫描周期复用的K线缓冲区，提供 O(1) 的现价和波动率"""
+        return self.buffers.get(self.ticker, interval)
+    
+    def _load_real_time_data(self, interval):
         try:
-            # 使用yahooquery获取历史数据
-            df = self.yahoo.history(period='1d', interval=interval)
-            if isinstance(df, dict) or df.empty:
-                return pd.DataFrame()
-            
-            # 只保留需要的列
-            df = df[['open', 'high', 'low', 'close', 'volume']]
-            # 标准化列名
-            df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-            return df.dropna()
+            # 使用yahooquery获取历史数据，缓冲区已有当日K线时只请求新增部分
+            buffer = self.bar_buffer(interval)
+            metrics.incr('network_requests')
+            with metrics.timer('fetch.bars'):
+                df = self.yahoo.history(
+                    interval=interval, adj_timezone=False,
+                    **self.buffers.history_range([self.ticker], interval)
+                )
+            metrics.incr('bars_appended', buffer.extend(_normalize_bars(df)))
+            return buffer.to_frame(self.ticker)
         except Exception as e:
             print(f"数据获取失败: {str(e)}")
             return pd.DataFrame()
     
     def fetch_option_chain(self, expiration=None):
-        """获取完整期权链数据"""
+        """获取完整期权链数据（同一周期内共享缓存快照），返回 DataFrame"""
+        return self.cache.get_or_load(
+            self.ticker, 'chain',
+            lambda: self._load_option_chain(expiration),
+            key=expiration,
+            is_empty=_is_empty_frame
+        )
+    
+    def fetch_chain(self, expiration=None, min_dte=None, max_dte=None):
+        """
+        获取单个到期日的列式期权链（默认最近的到期日）
+        
+        与 fetch_option_chain 数据相同，但直接切片共享的 OptionChain，不生成 DataFrame。
+        未指定到期日时可用 min_dte / max_dte 限定期限，取剩余天数在该范围内最近的到期日。
+        """
+        try:
+            chains = self._normalized_chains()
+            if expiration is None:
+                chains = chains.between_days(min_dte, max_dte)
+            return chains.select_expiration(expiration)
+        except Exception as e:
+            logger.error(f"获取期权链失败: {str(e)}", exc_info=True)
+            return OptionChain.empty_chain()
+    
+    def _raw_option_chain(self):
+        """获取yahooquery原始期权链，所有到期日共享一次请求"""
+        return self.cache.get_or_load(
+            self.ticker, 'chain',
+            self._request_option_chain,
+            key='raw',
+            is_empty=_is_empty_frame
+        )
+    
+    @timed('fetch.chain')
+    def _request_option_chain(self):
+        metrics.incr('network_requests')
+        return self.yahoo.option_chain
+    
+    def _normalized_chains(self):
+        """全部到期日一次性转换的列式期权链，供各到期日及多到期日查询共享"""
+        return self.cache.get_or_load(
+            self.ticker, 'chain',
+            self._normalize_raw_chain,
+            key='all',
+            is_empty=_is_empty_chain
+        )
+    
+    def _normalize_raw_chain(self):
+        chain = _normalize_option_chain(self._raw_option_chain())
+        # 原始 DataFrame 只用于标准化，转换后立即释放
+        self.cache.discard(self.ticker, 'chain', 'raw')
+        return chain
+    
+    def _load_option_chain(self, expiration):
         try:
-            logger.debug(f"开始获取 {self.ticker} 期权数据")
+            logger.debug("开始获取 %s 期权数据", self.ticker)
             
             # 获取期权链
-            chains = self.yahoo.option_chain
-            if isinstance(chains, dict) or chains.empty:
-                logger.debug(f"{self.ticker} 无可用期权数据")
+            chains = self._normalized_chains()
+            if chains.empty:
+                logger.debug("%s 无可用期权数据", self.ticker)
                 return pd.DataFrame()
             
-            # 获取可用的期权到期日
-            expiration_dates = chains.index.get_level_values('expiration').unique()
-            logger.debug(f"可用的期权到期日: {expiration_dates.tolist()}")
-            
-            # 如果没有指定到期日，使用最近的到期日
-            if expiration is None:
-                expiration = expiration_dates[0]
-                logger.debug(f"使用最近到期日: {expiration}")
-            elif expiration not in expiration_dates:
-                logger.debug(f"警告: 指定的到期日 {expiration} 不可用")
+            # 如果没有指定到期日，使用最近的到期日；按到期日编码切片，不扫描整条链
+            result = chains.select_expiration(expiration)
+            if result.empty:
+                logger.debug("警告: 指定的到期日 %s 不可用", expiration)
                 return pd.DataFrame()
             
-            try:
-                # 获取指定到期日的数据
-                exp_chains = chains[chains.index.get_level_values('expiration') == expiration]
-                
-                # 分离看涨和看跌期权
-                # 检查数据结构
-                logger.debug("\n数据结构信息:")
-                logger.debug(f"列名: {exp_chains.columns.tolist()}")
-                logger.debug(f"索引: {exp_chains.index.names}")
-                logger.debug(f"样本数据:\n{exp_chains.head(1)}")
-                
-                # 根据索引级别分离看涨和看跌期权
-                calls = exp_chains.xs('calls', level='optionType').assign(type='call')
-                puts = exp_chains.xs('puts', level='optionType').assign(type='put')
-                
-                logger.debug(f"\n期权数据获取成功:")
-                logger.debug(f"看涨期权数量: {len(calls)}")
-                logger.debug(f"看跌期权数量: {len(puts)}")
-                
-                # 合并数据
-                option_chain = pd.concat([calls, puts])
-                
-                # 添加到期日和剩余天数
-                option_chain['expiration'] = expiration
-                option_chain['days_to_expire'] = (
-                    pd.to_datetime(expiration) - pd.Timestamp.now()
-                ).days
-                
-                # 标准化列名
-                column_mapping = {
-                    'strike': 'strike',
-                    'lastPrice': 'lastPrice',
-                    'bid': 'bid',
-                    'ask': 'ask',
-                    'volume': 'volume',
-                    'impliedVolatility': 'impliedVolatility',
-                }
-                
-                # 重命名列
-                option_chain = option_chain.rename(columns=column_mapping)
-                
-                # 确保所需列都存在
-                required_cols = ['strike', 'bid', 'ask', 'volume', 'impliedVolatility',
-                               'type', 'expiration', 'days_to_expire']
-                
-                for col in required_cols:
-                    if col not in option_chain.columns:
-                        logger.debug(f"添加缺失的列: {col}")
-                        option_chain[col] = 0
-                
-                # 数据类型转换
-                numeric_cols = ['strike', 'bid', 'ask', 'volume', 'impliedVolatility']
-                for col in numeric_cols:
-                    option_chain[col] = pd.to_numeric(option_chain[col], errors='coerce').fillna(0)
-                
-                result = option_chain[required_cols].reset_index(drop=True)
-                
-                logger.debug(f"\n最终数据信息:")
-                logger.debug(f"总行数: {len(result)}")
-                logger.debug(f"列名: {result.columns.tolist()}")
-                if not result.empty:
-                    logger.debug(f"样本数据:\n{result.head(1)}")
-                
-                return result
-                
-            except Exception as e:
-                logger.error(f"处理期权数据失败: {str(e)}", exc_info=True)
-                return pd.DataFrame()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("%s %s 期权数量: %d", self.ticker, result.expiration_dates[0], len(result))
+            return result.to_frame()
                 
         except Exception as e:
             logger.error(f"获取期权链失败: {str(e)}", exc_info=True)
             return pd.DataFrame()
     
-    def get_earnings_dates(self):
-        """获取财报日历"""
-        try:
-            # ETF没有财报日期
-            if 'QQQ' in self.ticker or 'SPY' in self.ticker:
-                return []
-                
-            # 使用yahooquery获取财报信息
-            calendar = self.yahoo.calendar_events
-            if isinstance(calendar, dict) or calendar.empty:
-                return []
+    def fetch_option_chains(self, min_dte=None, max_dte=None):
+        """
+        获取多个到期日的期权链
+        
+        参数:
+            min_dte (int): 最短剩余天数，默认不限
+            max_dte (int): 最长剩余天数，默认不限
             
-            # 获取未来的财报日期
-            if 'Earnings Date' in calendar.columns:
-                future_dates = calendar[
-                    calendar['Earnings Date'] > pd.Timestamp.now()
-                ]['Earnings Date']
-                return [d.to_pydatetime() for d in future_dates]
-            
-            return []
+        返回:
+            pd.DataFrame: 以 (expiration, type, strike) 为索引的期权链
+        """
+        try:
+            chains = self._normalized_chains()
+            if chains.empty:
+                return pd.DataFrame()
             
+            chains = chains.between_days(min_dte, max_dte)
+            if chains.empty:
+                return pd.DataFrame()
+            # 列式期权链已按 (到期日, 类型, 行权价) 排序
+            return chains.to_frame().set_index(['expiration', 'type', 'strike'])
+        except Exception as e:
+            logger.error(f"获取多到期日期权链失败: {str(e)}", exc_info=True)
+            return pd.DataFrame()
+    
+    def get_vol_surface(self):
+        """基于全部到期日期权链拟合的隐含波动率曲面（随期权链快照缓存），无数据时返回 None"""
+        return self.cache.get_or_load(
+            self.ticker, 'surface',
+            self._fit_vol_surface,
+            is_empty=lambda surface: surface is None
+        )
+    
+    @timed('fit.surface')
+    def _fit_vol_surface(self):
+        try:
+            bars = self.get_real_time_data()
+            chains = self._normalized_chains()
+            if bars.empty or chains.empty:
+                return None
+            surface = VolSurface.fit(chains, bars['Close'].iloc[-1])
+            return None if surface.empty else surface
+        except Exception as e:
+            logger.error(f"拟合波动率曲面失败: {str(e)}", exc_info=True)
+            return None
+    
+    def now(self):
+        """当前时间，回放模式下为快照时间"""
+        return pd.Timestamp.now()
+    
+    def get_iv_rank(self, current_iv=None):
+        """基于本地历史库计算波动率排名，当前ATM隐含波动率会被记录入库"""
+        rank = calculate_iv_rank(self.ticker, current_iv, get_history_store(self.config))
+        # 保存到快照缓存，供录制器使用
+        self.cache.put(self.ticker, 'iv_rank', rank)
+        return rank
+    
+    def get_earnings_dates(self):
+        """获取财报日历（由本地财报日历回答，按日缓存）"""
+        dates = self.cache.get_or_load(
+            self.ticker, 'earnings',
+            self._load_earnings_dates,
+            is_empty=lambda value: value is None
+        )
+        return dates if dates is not None else []
+    
+    def _load_earnings_dates(self):
+        """当天尚未刷新时单独刷新本标的，从未获取成功时返回 None 以免缓存错误结果"""
+        calendar = self.calendar
+        if calendar.needs_refresh(self.ticker):
+            calendar.refresh(
+                [self.ticker], lambda tickers, quote_types: fetch_earnings(self.yahoo, tickers, quote_types)
+            )
+        return calendar.dates(self.ticker, self.now())
+
+
+class WatchlistLoader:
+    """
+    观察列表批量加载器
+    
+    使用同一个yahooquery客户端一次性请求整个观察列表的K线、期权链和财报日历，
+    按标的拆分后写入共享快照缓存，DataLoader 随后直接命中缓存。
+    客户端及其HTTP会话在多个扫描周期间复用。
+    """
+    
+    def __init__(self, tickers, cache=None, config=None, buffers=None, calendar=None):
+        self.config = config if config is not None else get_settings()
+        self.cache = cache if cache is not None else get_snapshot_cache(self.config)
+        self.buffers = buffers if buffers is not None else get_bar_buffers(self.config)
+        self._calendar = calendar
+        self._loaders = {}
+        self._loaders_lock = threading.Lock()
+        self.tickers = list(tickers)
+        self.yahoo = _create_yahoo(self.tickers)
+    
+    @property
+    def calendar(self):
+        """本地财报日历，默认使用进程内共享的实例"""
+        if self._calendar is None:
+            self._calendar = get_earnings_calendar(self.config)
+        return self._calendar
+    
+    @property
+    def session(self):
+        return self.yahoo.session
+    
+    def set_tickers(self, tickers):
+        """更新观察列表，复用现有会话"""
+        self.tickers = list(tickers)
+        self.yahoo.symbols = self.tickers
+    
+    def loader(self, ticker):
+        """标的的 DataLoader（共享缓存与会话），每个标的只创建一次，跨周期复用"""
+        with self._loaders_lock:
+            loader = self._loaders.get(ticker)
+            if loader is None:
+                loader = self._loaders[ticker] = self._new_loader(ticker)
+            return loader
+    
+    def _new_loader(self, ticker):
+        loader = DataLoader(ticker, cache=self.cache, session=self.session, buffers=self.buffers,
+                            calendar=self.calendar)
+        loader.config = self.config
+        return loader
+    
+    def retain(self, tickers):
+        """只保留观察列表内标的的 DataLoader，已移除的标的释放其快照"""
+        wanted = set(tickers)
+        with self._loaders_lock:
+            removed = [t for t in self._loaders if t not in wanted]
+            for ticker in removed:
+                del self._loaders[ticker]
+        for ticker in removed:
+            _release_snapshots(self.cache, ticker)
+        return removed
+    
+    def release(self, ticker):
+        """扫描结束后释放标的的K线、期权链和波动率曲面快照"""
+        _release_snapshots(self.cache, ticker)
+    
+    def refresh(self, interval='5m'):
+        """批量刷新缓存中缺失或已过期的数据，返回各类数据刷新的标的数"""
+        bars = self._refresh(
+            'bars', interval,
+            lambda: self.yahoo.history(
+                interval=interval, adj_timezone=False,
+                **self.buffers.history_range(self.yahoo.symbols, interval)
+            ),
+            lambda raw, ticker: self._append_bars(ticker, interval, raw)
+        )
+        chains = self._refresh(
+            'chain', 'raw',
+            lambda: self.yahoo.option_chain,
+            _select_symbol
+        )
+        return {'bars': bars, 'chain': chains, 'earnings': self._refresh_earnings()}
+    
+    def _append_bars(self, ticker, interval, raw):
+        """将批量结果中该标的的新K线追加到缓冲区，返回完整的当日K线"""
+        buffer = self.buffers.get(ticker, interval)
+        metrics.incr('bars_appended', buffer.extend(_normalize_bars(_select_symbol(raw, ticker))))
+        return buffer.to_frame(ticker)
+    
+    def _missing(self, kind, key=None):
+        return [t for t in self.tickers if self.cache.get(t, kind, key) is None]
+    
+    def _fetch(self, symbols, fetch):
+        """以指定标的子集执行一次批量请求"""
+        self.yahoo.symbols = symbols
+        metrics.incr('network_requests')
+        try:
+            with metrics.timer('fetch.bulk'):
+                return fetch()
+        finally:
+            self.yahoo.symbols = self.tickers
+    
+    def _refresh(self, kind, key, fetch, split):
+        symbols = self._missing(kind, key)
+        if not symbols:
+            return 0
+        
+        try:
+            raw = self._fetch(symbols, fetch)
         except Exception as e:
-            print(f"财报日历获取失败: {str(e)}")
-            return []
\ No newline at end of file
+            logger.error(f"批量获取 {kind} 失败: {str(e)}", exc_info=True)
+            return 0
+        
+        refreshed = 0
+        for ticker in symbols:
+            value = split(raw, ticker)
+            if not _is_empty_frame(value):
+                self.cache.put(ticker, kind, value, key)
+                refreshed += 1
+        logger.debug("批量刷新 %s: %d/%d 个标的", kind, refreshed, len(symbols))
+        return refreshed
+    
+    def refresh_calendar(self, tickers=None):
+        """批量刷新财报日历中当天尚未刷新的标的（默认本轮标的），返回刷新的标的数"""
+        return self.calendar.refresh(
+            self.tickers if tickers is None else tickers,
+            lambda symbols, quote_types: fetch_earnings(self.yahoo, symbols, quote_types)
+        )
+    
+    def _refresh_earnings(self):
+        """由财报日历填充缓存中缺失的财报日期"""
+        missing = self._missing('earnings')
+        if not missing:
+            return 0
+        self.refresh_calendar(missing)
+        
+        refreshed = 0
+        for ticker in missing:
+            dates = self.calendar.dates(ticker)
+            if dates is not None:
+                self.cache.put(ticker, 'earnings', dates)
+                refreshed += 1
+        return refreshed
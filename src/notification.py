@@ -1,43 +1,180 @@
 import requests
 import os
+import time
+import queue
+import logging
+import threading
 from threading import Thread
+from src.utils.metrics import metrics
+from src.utils.http_transport import get_transport
+
+logger = logging.getLogger(__name__)
+
+# Telegram单条消息的最大长度
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    """令牌桶限流：平均每秒 rate 个请求，最多突发 capacity 个"""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """取得一个令牌，不足时阻塞等待"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self._sleep(wait)
+
 
 class NotificationManager:
-    def __init__(self):
-        self.token = os.getenv('TELEGRAM_BOT_TOKEN')
-        self.chat_id = os.getenv('TELEGRAM_CHAT_ID')
-        self.queue = []
-        self._start_worker()
-
-    def _send_telegram(self, message):
-        url = f"https://api.telegram.org/bot{self.token}/sendMessage"
-        params = {
-            'chat_id': self.chat_id,
-            'text': message,
-            'parse_mode': 'Markdown'
-        }
-        try:
-            requests.post(url, params=params, timeout=5)
-        except Exception as e:
-            print(f"消息发送失败: {str(e)}")
+    """
+    Telegram通知管道
+
+    消息进入有界线程安全队列，由后台线程经令牌桶限流后通过共享传输层的会话发送，
+    连接错误和服务器错误由传输层重试，Telegram限速（429）按其返回的等待时间重试。
+    同一扫描周期的多条信号可合并为一条消息发送。
+    """
+
+    def __init__(self, token=None, chat_id=None, config=None, session=None, start=True):
+        config = config or {}
+        self.token = token or os.getenv('TELEGRAM_BOT_TOKEN')
+        self.chat_id = chat_id or os.getenv('TELEGRAM_CHAT_ID')
+        self.base_url = config.get('base_url', 'https://api.telegram.org').rstrip('/')
+        self.timeout = float(config.get('timeout', 5))
+        self.max_retries = int(config.get('max_retries', 3))
+        self.backoff = float(config.get('backoff', 1.0))
+        self.queue = queue.Queue(maxsize=int(config.get('max_queue', 100)))
+        self.bucket = TokenBucket(
+            rate=float(config.get('rate_per_second', 1.0)),
+            capacity=float(config.get('burst', 1))
+        )
+        self.session = session or get_transport().session()
+        self._worker_thread = None
+        if start:
+            self._start_worker()
+
+    def _send_telegram(self, message, parse_mode=None):
+        """发送单条消息，返回是否成功"""
+        url = f"{self.base_url}/bot{self.token}/sendMessage"
+        data = {'chat_id': self.chat_id, 'text': message}
+        if parse_mode:
+            data['parse_mode'] = parse_mode
+
+        # 连接错误和5xx由传输层按重试预算退避重试，这里只处理Telegram的429限速
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                metrics.incr('network_requests')
+                with metrics.timer('notify.send'):
+                    response = self.session.post(url, data=data, timeout=self.timeout)
+            except requests.RequestException as e:
+                logger.error(f"消息发送失败: {str(e)}")
+                return False
+            if response.status_code == 200:
+                metrics.incr('notifications_sent')
+                return True
+            if response.status_code != 429:
+                logger.error(f"消息发送失败: HTTP {response.status_code} {response.text[:200]}")
+                return False
+            # 遵循Telegram返回的等待时间
+            retry_after = _retry_after(response)
+            delay = retry_after if retry_after is not None else self.backoff * 2 ** attempt
+            if attempt < self.max_retries:
+                logger.warning(f"消息发送被限速，{delay:.1f}秒后重试")
+                time.sleep(delay)
+
+        logger.error(f"消息发送失败，已重试 {self.max_retries} 次")
+        return False
 
     def _worker(self):
         while True:
-            if self.queue:
-                msg = self.queue.pop(0)
-                self._send_telegram(msg)
-            time.sleep(1)
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._send_telegram(*item)
+            except Exception as e:
+                logger.error(f"通知线程异常: {str(e)}", exc_info=True)
+            finally:
+                self.queue.task_done()
 
     def _start_worker(self):
-        Thread(target=self._worker, daemon=True).start()
+        self._worker_thread = Thread(target=self._worker, daemon=True, name='notification')
+        self._worker_thread.start()
+
+    def notify(self, message, parse_mode=None):
+        """消息入队，队列已满时丢弃并返回 False"""
+        try:
+            self.queue.put_nowait((message, parse_mode))
+            return True
+        except queue.Full:
+            logger.warning("通知队列已满，丢弃消息")
+            return False
+
+    def notify_batch(self, messages, separator='\n\n'):
+        """将一个周期内的多条消息合并发送，超出长度限制时拆分为多条"""
+        for message in _coalesce(messages, separator):
+            self.notify(message)
 
     def notify_signal(self, signal):
         msg = f"""
         🚨 **交易信号警报** 🚨
         标的：`{signal['ticker']}`
         策略类型：`{signal['strategy_type']}`
-        推荐操作：`{signal['action']}`
+        推荐操作：`{signal.get('action', '-')}`
         预期胜率：`{signal['probability']}%`
-        风险等级：`{signal['risk_level']}`
+        风险等级：`{signal.get('risk_level', '-')}`
         """
-        self.queue.append(msg)
\ No newline at end of file
+        self.notify(msg, parse_mode='Markdown')
+
+    def flush(self):
+        """阻塞直到队列中的消息全部处理完"""
+        self.queue.join()
+
+    def close(self, timeout=None):
+        """处理完剩余消息后停止后台线程"""
+        self.queue.put(None)
+        if self._worker_thread is not None:
+            self._worker_thread.join(timeout)
+        self.session.close()
+
+
+def _retry_after(response):
+    try:
+        return float(response.json()['parameters']['retry_after'])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _coalesce(messages, separator):
+    """按长度上限合并消息"""
+    batch = ''
+    for message in messages:
+        if not message:
+            continue
+        candidate = f"{batch}{separator}{message}" if batch else message
+        if len(candidate) <= MAX_MESSAGE_LENGTH:
+            batch = candidate
+            continue
+        if batch:
+            yield batch
+        batch = message[:MAX_MESSAGE_LENGTH]
+    if batch:
+        yield batch
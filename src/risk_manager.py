@@ -1,27 +1,71 @@
+import logging
+import numpy as np
 import pandas as pd
+from src.settings import StrategySettings, get_settings
+from src.utils.metrics import timed
+from src.utils.chain_filter import spread_ratio
+from src.utils.risk_book import position_key
+from src.utils.earnings_calendar import event_within
+
+logger = logging.getLogger(__name__)
 
 class RiskManager:
-    def __init__(self, config):
-        self.config = config
+    def __init__(self, config=None, book=None):
+        """
+        参数:
+            config: strategy 配置（StrategySettings 或字典），默认读取共享配置
+            book (RiskBook): 组合风险账本
+        """
+        self.settings = StrategySettings.from_dict(
+            config if config is not None else get_settings().strategy
+        )
+        self.book = book
         
+    @timed('risk.check_greeks')
     def check_greeks(self, portfolio_greeks):
         """希腊值风险检查"""
         return (
             abs(portfolio_greeks['delta']) < 0.5 and
-            portfolio_greeks['vega'] < self.config['max_vega'] and
+            portfolio_greeks['vega'] < self.settings.max_vega and
             portfolio_greeks['gamma'] < 0.1
         )
     
+    @timed('risk.check_liquidity')
     def check_liquidity(self, contract):
-        """合约流动性验证"""
-        spread = contract['ask'] - contract['bid']
-        spread_ratio = spread / contract['lastPrice']
-        return (
-            contract['volume'] > self.config['min_volume'] and
-            spread_ratio < self.config['max_spread_ratio']
+        """
+        合约流动性验证
+        
+        contract 可以是单个合约（dict/Series，返回 bool），也可以是整条期权链
+        （DataFrame，返回布尔序列）。价差比例相对中间价计算，缺少中间价时退回最新成交价。
+        """
+        ratio = spread_ratio(contract['bid'], contract['ask'], contract.get('mid'), contract.get('lastPrice'))
+        liquid = (
+            (np.asarray(contract['volume'], dtype=float) > self.settings.min_volume) &
+            (ratio < self.settings.max_spread_ratio)
         )
+        if isinstance(contract, pd.DataFrame):
+            return pd.Series(liquid, index=contract.index)
+        return bool(liquid)
     
-    def check_event_risk(self, earnings_dates):
-        """事件风险检查"""
-        next_5_days = pd.Timestamp.now() + pd.DateOffset(days=5)
-        return any(date <= next_5_days for date in earnings_dates)
\ No newline at end of file
+    @timed('risk.check_event_risk')
+    def check_event_risk(self, earnings_dates, now=None):
+        """事件风险检查：当天及之后5天内是否有财报（日期须升序，二分查找）"""
+        return event_within(earnings_dates, 5, now)
+    
+    @timed('risk.check_portfolio')
+    def check_portfolio(self, signal, quantity=1):
+        """
+        组合限额检查，通过后信号作为拟建仓位计入风险账本
+        
+        只比较信号的希腊值与账本中已聚合的敞口，不重新定价已有持仓；
+        同一价差的重复信号替换原持仓而不是叠加。
+        """
+        if self.book is None:
+            return True
+        ok, breaches = self.book.try_add(
+            position_key(signal), signal['ticker'], signal['greeks'],
+            signal['legs'], signal['entry_price'], quantity
+        )
+        if not ok:
+            logger.info(f"{signal['ticker']} 信号超出组合限额: {'; '.join(breaches)}")
+        return ok
@@ -0,0 +1,127 @@
+import os
+import copy
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, fields
+
+CONFIG_PATH = 'config/config.yaml'
+
+# strategy 中可由环境变量覆盖的字段
+_ENV_OVERRIDES = {
+    'iv_percentile_threshold': ('STRATEGY_IV_THRESHOLD', float, 60),
+    'min_volume': ('STRATEGY_MIN_VOLUME', int, 100),
+    'max_spread_ratio': ('STRATEGY_MAX_SPREAD', float, 0.1),
+    'max_vega': ('STRATEGY_MAX_VEGA', float, 0.5),
+}
+
+
+class _Section:
+    @classmethod
+    def from_dict(cls, values):
+        """由配置字典创建，缺失或为空的字段使用默认值"""
+        if isinstance(values, cls):
+            return values
+        values = values or {}
+        return cls(**{
+            f.name: f.type(values[f.name]) for f in fields(cls)
+            if values.get(f.name) is not None
+        })
+
+
+@dataclass(frozen=True)
+class StrategySettings(_Section):
+    iv_percentile_threshold: float = 60.0
+    min_volume: int = 100
+    max_spread_ratio: float = 0.1
+    max_vega: float = 0.5
+    polling_interval: float = 15.0
+    min_dte: int = 7
+    max_dte: int = 60
+
+
+@dataclass(frozen=True)
+class ScannerSettings(_Section):
+    max_workers: int = 1
+    ticker_timeout: float = 60.0
+    cycle_interval: float = 0.0
+
+
+class Settings(Mapping):
+    """
+    解析后的配置
+
+    常用配置段提供带类型的只读视图（strategy / scanner / watchlist），
+    其余配置仍按字典方式访问（settings['cache']、settings.get('portfolio')），
+    与原先 load_config() 返回的字典兼容。实例在进程内共享，不要修改其中的字典；
+    需要修改时使用 load_config() 取得副本。
+    """
+
+    def __init__(self, raw, path=None):
+        self._raw = raw
+        self.path = path
+        self.strategy = StrategySettings.from_dict(raw.get('strategy'))
+        self.scanner = ScannerSettings.from_dict(raw.get('scanner'))
+        self.watchlist = tuple(raw.get('watchlist') or ())
+
+    def __getitem__(self, key):
+        return self._raw[key]
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+    def __repr__(self):
+        return f"Settings(path={self.path!r}, sections={list(self._raw)})"
+
+    def to_dict(self):
+        """可自由修改的深拷贝"""
+        return copy.deepcopy(self._raw)
+
+
+def as_settings(config):
+    """把配置字典包装为 Settings，已是 Settings 时原样返回"""
+    return config if isinstance(config, Settings) else Settings(dict(config or {}))
+
+
+def _env_key():
+    return tuple(os.getenv(name) for name, _, _ in _ENV_OVERRIDES.values())
+
+
+def _parse(path):
+    """读取配置文件并应用环境变量覆盖"""
+    import yaml
+
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    if 'strategy' in config:
+        strategy = config['strategy']
+        for field, (name, cast, default) in _ENV_OVERRIDES.items():
+            strategy[field] = cast(os.getenv(name, strategy.get(field, default)))
+    return config
+
+
+_settings = {}
+_settings_lock = threading.Lock()
+
+
+def get_settings(path=CONFIG_PATH):
+    """
+    获取进程内缓存的配置
+
+    配置文件只解析一次，DataLoader、OptionsScanner、RiskManager 共享同一实例；
+    文件修改时间或相关环境变量变化后重新解析。
+    """
+    key = (os.stat(path).st_mtime_ns, _env_key())
+    with _settings_lock:
+        cached = _settings.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, Settings(_parse(path), path))
+            _settings[path] = cached
+        return cached[1]
+
+
+def load_config(path=CONFIG_PATH):
+    """加载配置（环境变量优先），返回可修改的字典副本"""
+    return get_settings(path).to_dict()
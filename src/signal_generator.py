@@ -1,32 +1,54 @@
-from src.utils.volatility import calculate_iv_rank
-from src.utils.greeks import calculate_greeks
+from src.utils.volatility import atm_implied_volatility
+from src.utils.greeks import calculate_greeks, calculate_greeks_batch
+from src.utils.spreads import score_vertical_spreads
+from src.utils.chain_filter import prefilter_chain, filter_settings
+from src.utils.strategies import StrategyEngine, evaluate_chain
 from src.data_loader import DataLoader
+from src.utils.metrics import metrics, timed
+from src.utils.earnings_calendar import event_within
 import pandas as pd
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
 class SignalGenerator:
-    def __init__(self, data_loader):
+    __slots__ = ('dl', 'config', 'compute', 'spot_price', '_min_probability', 'engine')
+    
+    def __init__(self, data_loader, compute=None):
+        """
+        参数:
+            data_loader: DataLoader 或同接口的加载器
+            compute (ComputePool): 计算进程池，默认在当前线程计算
+        """
         self.dl = data_loader
         self.config = data_loader.config
+        self.compute = compute
         self.spot_price = None
+        self._min_probability = os.getenv('STRATEGY_MIN_PROBABILITY')
+        self.engine = StrategyEngine.from_config(
+            self.config.get('strategies'), min_probability=self._min_probability
+        )
     
-    def generate_vertical_spread_signal(self):
-        """生成垂直价差信号"""
+    def _prepare(self):
+        """
+        获取K线和期权链，完成财报检查、隐含波动率补全与预筛选
+        
+        返回:
+            tuple: (K线, 期权链, 波动率曲面)，无法生成信号时返回 None
+        """
         # 获取基础数据
         df = self.dl.get_real_time_data()
         if df.empty:
             return None
             
-        self.spot_price = df['Close'].iloc[-1]
+        self.spot_price = self._spot(df)
         earnings_dates = self.dl.get_earnings_dates()
         
-        # 获取期权链数据
-        option_chain = self.dl.fetch_option_chain()
+        # 获取期权链数据（列式，按行权价二分查找合约）
+        option_chain = self.fetch_chain()
         if option_chain.empty:
             print("无法获取期权链数据")
             return None
@@ -41,14 +63,94 @@ class SignalGenerator:
         if self._has_earnings_risk(earnings_dates):
             return None
             
+        # 用隐含波动率曲面补全缺失或为0的隐含波动率
+        surface = self.dl.get_vol_surface()
+        option_chain = self._fill_implied_volatility(option_chain, surface)
+        
+        # 定价前剔除流动性差、过于虚值或超出期限范围的合约
+        option_chain = self._prefilter(option_chain)
+        if option_chain.empty:
+            logger.debug("%s 预筛选后无可用合约", self.dl.ticker)
+            return None
+        return df, option_chain, surface
+    
+    def fetch_chain(self):
+        """
+        预筛选期限范围（strategy.prefilter 的 min_dte / max_dte）内最近到期日的期权链
+        
+        剩余天数向下取整，盘中次日到期的合约为0天；先按期限选到期日，
+        避免最近的到期日被预筛选整体剔除后无合约可用。
+        """
+        settings = filter_settings(self.config.get('strategy'))
+        return self.dl.fetch_chain(min_dte=settings['min_dte'], max_dte=settings['max_dte'])
+    
+    def _iv_rank(self, option_chain):
+        with metrics.timer('signal.iv_rank'):
+            atm_iv = atm_implied_volatility(option_chain, self.spot_price)
+            return self.dl.get_iv_rank(atm_iv)
+    
+    def generate_signals(self, limit=None):
+        """
+        用策略引擎在同一份期权链上评估全部已启用策略
+        
+        期权链、希腊值和期望收益只计算一次，由各策略共享；未配置 strategies.enabled
+        时退回单一的牛市看涨价差信号。
+        
+        参数:
+            limit (int): 最多返回的信号数，默认读取 strategies.max_signals
+            
+        返回:
+            list: 按期望收益排序的信号
+        """
+        if not self.engine:
+            signal = self.generate_vertical_spread_signal()
+            return [signal] if signal else []
+        with metrics.timer('signal.total'):
+            return self._generate_strategy_signals(limit)
+    
+    def _generate_strategy_signals(self, limit):
+        prepared = self._prepare()
+        if prepared is None:
+            return []
+        df, option_chain, surface = prepared
+        iv_rank = self._iv_rank(option_chain)
+        
+        # 预测波动率优先取K线实现波动率，与隐含波动率的差异体现为期望收益
+        sigma = self._historical_sigma(df)
+        if sigma is None or not np.isfinite(sigma) or sigma <= 0:
+            sigma = self._surface_sigma(surface, self.spot_price, self.spot_price)
+        
+        settings = self.config.get('strategies') or {}
+        limit = settings.get('max_signals') if limit is None else limit
+        return self._compute(
+            evaluate_chain, option_chain, spot=self.spot_price, settings=settings,
+            ticker=self.dl.ticker, sigma=sigma, iv_rank=iv_rank,
+            iv_threshold=self.config['strategy']['iv_percentile_threshold'],
+            limit=limit, min_probability=self._min_probability
+        )
+    
+    def _compute(self, func, option_chain, *args, **kwargs):
+        """CPU密集的计算：有进程池时通过共享内存提交，否则在当前线程执行"""
+        if self.compute is not None:
+            return self.compute.run(func, *args, chain=option_chain, **kwargs)
+        return func(option_chain, *args, **kwargs)
+    
+    @timed('signal.total')
+    def generate_vertical_spread_signal(self):
+        """生成垂直价差信号"""
+        prepared = self._prepare()
+        if prepared is None:
+            return None
+        df, option_chain, surface = prepared
+        
         # 计算波动率指标
-        iv_rank = calculate_iv_rank(self.dl.ticker)
-        if iv_rank > self.config['strategy']['iv_percentile_threshold']:
+        iv_rank = self._iv_rank(option_chain)
+        if iv_rank is not None and iv_rank > self.config['strategy']['iv_percentile_threshold']:
             return None
             
         # 选择行权价
-        long_strike = self._select_strike_by_delta('call', 0.3)  # 买入期权
-        short_strike = self._select_strike_by_delta('call', 0.2)  # 卖出期权
+        long_strike = self._select_strike_by_delta('call', 0.3, option_chain)  # 买入期权
+        short_strike = self._select_strike_by_delta('call', 0.2, option_chain)  # 卖出期权
         
         if long_strike is None or short_strike is None:
             print("无法选择合适的行权价")
@@ -59,17 +161,10 @@ class SignalGenerator:
             long_strike, short_strike = short_strike, long_strike
         
         # 获取合约信息
-        long_contract = option_chain[
-            (option_chain['strike'] == long_strike) &
-            (option_chain['type'] == 'call')
-        ].iloc[0]
-        
-        short_contract = option_chain[
-            (option_chain['strike'] == short_strike) &
-            (option_chain['type'] == 'call')
-        ].iloc[0]
+        long_contract = option_chain.contract(long_strike, 'call')
+        short_contract = option_chain.contract(short_strike, 'call')
         
-        if long_contract.empty or short_contract.empty:
+        if long_contract is None or short_contract is None:
             print("无法获取合约信息")
             return None
             
@@ -98,13 +193,16 @@ class SignalGenerator:
             'theta': long_greeks['theta'] - short_greeks['theta']
         }
             
-        # 计算胜率
-        prob = self._calculate_probability(long_strike, short_strike)
+        # 计算胜率（优先使用曲面上的隐含波动率，否则复用已获取的K线估计历史波动率）
+        sigma = self._surface_sigma(surface, long_strike, short_strike)
+        if sigma is None:
+            sigma = self._historical_sigma(df)
+        prob = self._calculate_probability(long_strike, short_strike, sigma)
         
         # 只有当胜率超过阈值时才返回信号
         min_probability = float(os.getenv('STRATEGY_MIN_PROBABILITY', 60))
         if prob < min_probability:
-            logger.debug(f"胜率 {prob:.2f}% 低于最小要求 {min_probability}%")
+            logger.debug("胜率 %.2f%% 低于最小要求 %s%%", prob, min_probability)
             return None
         
         return {
@@ -114,72 +212,169 @@ class SignalGenerator:
             'probability': round(prob, 2),
             'entry_price': self.spot_price,
             'expiration': long_contract['expiration'],
-            'greeks': portfolio_greeks
+            'greeks': portfolio_greeks,
+            'legs': [
+                {'type': 'call', 'strike': long_strike, 'quantity': 1,
+                 'expiration': long_contract['expiration'], 'iv': long_contract['impliedVolatility']},
+                {'type': 'call', 'strike': short_strike, 'quantity': -1,
+                 'expiration': short_contract['expiration'], 'iv': short_contract['impliedVolatility']},
+            ]
         }
     
     def _has_earnings_risk(self, dates):
-        """检查未来5天内是否有财报"""
-        next_5d = pd.Timestamp.now() + pd.DateOffset(days=5)
-        return any(d <= next_5d for d in dates)
+        """检查当天及之后5天内是否有财报"""
+        return event_within(dates, 5, self.dl.now())
     
-    def _select_strike_by_delta(self, option_type, target_delta):
-        """基于Delta选择行权价（修正版）"""
-        option_chain = self.dl.fetch_option_chain()
+    def _select_strike_by_delta(self, option_type, target_delta, option_chain=None):
+        """基于Delta选择行权价（修正版），可传入已获取的期权链避免重复获取"""
+        if option_chain is None:
+            option_chain = self._fill_implied_volatility(self.fetch_chain())
         if option_chain.empty:
             return None
         
         # 筛选指定类型的期权
-        chain = option_chain[option_chain['type'] == option_type]
-        
-        # 计算Delta值
-        deltas = []
-        for _, row in chain.iterrows():
-            # 确保天数大于0
-            days = max(1, row['days_to_expire'])
-            # 确保波动率大于0
-            iv = max(0.0001, row['impliedVolatility'])
-            
-            g = calculate_greeks(
-                option_type=row['type'],
-                strike=row['strike'],
+        mask = np.asarray(option_chain['type']) == option_type
+        strike = np.asarray(option_chain['strike'], dtype=float)[mask]
+        
+        # 批量计算Delta值（天数至少为1，波动率大于0）
+        with metrics.timer('signal.greeks'):
+            greeks = calculate_greeks_batch(
+                option_type=option_type,
+                strike=strike,
                 spot=self.spot_price,
-                t=days,
-                iv=iv
+                t=np.maximum(1, np.asarray(option_chain['days_to_expire'], dtype=float)[mask]),
+                iv=np.maximum(0.0001, np.asarray(option_chain['impliedVolatility'], dtype=float)[mask])
             )
-            deltas.append(g['delta'])
         
-        # 找到最接近目标Delta的行权价
-        chain = chain.assign(delta=deltas)
-        # 过滤掉无效的Delta值
-        valid_chain = chain[chain['delta'] != 0]
-        if valid_chain.empty:
+        # 过滤掉无效的Delta值后，找到最接近目标Delta的行权价
+        delta = np.asarray(greeks['delta'], dtype=float)
+        valid = delta != 0
+        if not valid.any():
             return None
+        return strike[valid][np.abs(delta[valid] - target_delta).argmin()]
+    
+    def rank_vertical_spreads(self, option_chain=None, sigma=None, **kwargs):
+        """
+        对期权链中全部可行的牛市看涨/熊市看跌价差组合评分排序
+        
+        参数:
+            option_chain (pd.DataFrame): 期权链，默认获取最近到期日
+            sigma (float): 统一波动率，默认使用各腿隐含波动率
+            **kwargs: 传递给 score_vertical_spreads 的筛选参数
             
-        closest_idx = np.abs(valid_chain['delta'] - target_delta).argmin()
-        return valid_chain.iloc[closest_idx]['strike']
+        返回:
+            pd.DataFrame: 按期望收益排序的价差列表
+        """
+        if not self._ensure_spot():
+            return pd.DataFrame()
+        if option_chain is None:
+            option_chain = self.dl.fetch_option_chain()
+        if option_chain.empty:
+            return pd.DataFrame()
+        option_chain = self._fill_implied_volatility(option_chain)
+        with metrics.timer('signal.spread_scoring'):
+            return self._compute(score_vertical_spreads, option_chain, self.spot_price, sigma=sigma, **kwargs)
     
-    def _calculate_probability(self, long_strike, short_strike):
-        """计算牛市价差的获利概率"""
-        df = self.dl.get_real_time_data()
+    def scan_term_structure(self, min_dte=None, max_dte=None, **kwargs):
+        """
+        在DTE窗口内的全部到期日上评分价差组合
+        
+        参数:
+            min_dte (int): 最短剩余天数，默认读取 strategy.min_dte
+            max_dte (int): 最长剩余天数，默认读取 strategy.max_dte
+            **kwargs: 传递给 score_vertical_spreads 的筛选参数
+            
+        返回:
+            pd.DataFrame: 所有到期日合并后按期望收益排序的价差列表
+        """
+        strategy = self.config.get('strategy', {})
+        min_dte = strategy.get('min_dte', 7) if min_dte is None else min_dte
+        max_dte = strategy.get('max_dte', 60) if max_dte is None else max_dte
+        
+        chains = self.dl.fetch_option_chains(min_dte, max_dte)
+        if chains.empty:
+            return pd.DataFrame()
+        if not self._ensure_spot():
+            return pd.DataFrame()
+        chains = self._prefilter(self._fill_implied_volatility(chains.reset_index()))
+        return self.rank_vertical_spreads(chains, **kwargs)
+    
+    def _prefilter(self, option_chain):
+        """按 strategy 配置对期权链做向量化预筛选"""
+        filtered, _ = prefilter_chain(
+            option_chain, self.spot_price, ticker=self.dl.ticker,
+            **filter_settings(self.config.get('strategy'))
+        )
+        return filtered
+    
+    def _fill_implied_volatility(self, option_chain, surface=None):
+        """用波动率曲面补全期权链中缺失的隐含波动率，曲面不可用时原样返回"""
+        if option_chain.empty:
+            return option_chain
+        surface = surface if surface is not None else self.dl.get_vol_surface()
+        return surface.fill(option_chain) if surface is not None else option_chain
+    
+    def _surface_sigma(self, surface, long_strike, short_strike, days=30):
+        """曲面上价差中点行权价、与胜率计算相同期限的隐含波动率"""
+        if surface is None:
+            return None
+        sigma = float(surface.iv((long_strike + short_strike) / 2, days))
+        return sigma if np.isfinite(sigma) and sigma > 0 else None
+    
+    def reset(self):
+        """开始新一次分析前清除上次的现价（守护进程跨周期复用同一实例）"""
+        self.spot_price = None
+    
+    def current_spot(self):
+        """当前现价（按需加载K线），无数据时返回 None"""
+        return self.spot_price if self._ensure_spot() else None
+    
+    def _ensure_spot(self):
+        """尚未获取现价时加载K线，无数据时返回 False"""
+        if self.spot_price is None:
+            df = self.dl.get_real_time_data()
+            if df.empty:
+                return False
+            self.spot_price = self._spot(df)
+        return True
+    
+    def _spot(self, df):
+        """现价优先取自K线缓冲区"""
+        buffer = self.dl.bar_buffer()
+        return buffer.spot if len(buffer) else df['Close'].iloc[-1]
+    
+    def _historical_sigma(self, df=None):
+        """基于日内K线对数收益估计年化波动率，缓冲区已有数据时直接读取增量维护的结果"""
+        buffer = self.dl.bar_buffer()
+        if len(buffer):
+            return buffer.sigma
+        if df is None:
+            df = self.dl.get_real_time_data()
         if df.empty:
+            return None
+        log_returns = np.log(df['Close']/df['Close'].shift(1)).dropna()
+        return log_returns.std() * np.sqrt(252)
+    
+    @timed('signal.probability')
+    def _calculate_probability(self, long_strike, short_strike, sigma=None):
+        """计算牛市价差的获利概率"""
+        if sigma is None:
+            sigma = self._historical_sigma()
+        if sigma is None:
             return 0
             
-        # 计算历史波动率
-        log_returns = np.log(df['Close']/df['Close'].shift(1)).dropna()
-        sigma = log_returns.std() * np.sqrt(252)
-        
         # 使用30天作为目标期限
         t = 30/365
         
         # 计算在到期时股价高于低行权价的概率
         d1_long = (np.log(self.spot_price/long_strike) + 
                   (0.05 + 0.5*sigma**2)*t) / (sigma*np.sqrt(t))
-        prob_above_long = norm.cdf(d1_long)
+        prob_above_long = ndtr(d1_long)
         
         # 计算在到期时股价高于高行权价的概率
         d1_short = (np.log(self.spot_price/short_strike) + 
                    (0.05 + 0.5*sigma**2)*t) / (sigma*np.sqrt(t))
-        prob_above_short = norm.cdf(d1_short)
+        prob_above_short = ndtr(d1_short)
         
         # 牛市价差的最大获利区间是在高行权价以下
         # 胜率 = P(长期价格 > 低行权价) - P(长期价格 > 高行权价)
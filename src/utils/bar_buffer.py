@@ -0,0 +1,227 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+
+_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class BarBuffer:
+    """
+    单个标的的流式K线环形缓冲区
+
+    K线保存在定长数组中，每次只追加比最后一根更新的K线（时间相同则视为对
+    未完成K线的修正）。对数收益的和与平方和随追加/淘汰增量维护，spot 与
+    sigma 均为 O(1)；为避免浮点误差累积，每写满一轮后精确重算一次。
+    相邻两根K线间隔超过 session_gap 时视为新交易日，清空后重新累计，
+    与原先只取当日K线的口径一致。
+
+    参数:
+        capacity (int): 最多保留的K线数量
+        session_gap (pd.Timedelta): 判断新交易日的最小间隔，None 表示不分日
+        annualization (int): 年化系数，与 _historical_sigma 一致取252
+    """
+
+    def __init__(self, capacity=100, session_gap=pd.Timedelta(hours=4), annualization=252):
+        self.capacity = max(2, int(capacity))
+        self.session_gap = None if session_gap is None else pd.Timedelta(session_gap).value
+        self.annualization = annualization
+        self._times = np.zeros(self.capacity, dtype='int64')
+        self._bars = np.zeros((self.capacity, len(_COLUMNS)))
+        self._lock = threading.Lock()
+        self.clear()
+
+    @classmethod
+    def from_frame(cls, df, **kwargs):
+        """由已有K线创建缓冲区（容量不小于K线数量）"""
+        buffer = cls(capacity=max(len(df), kwargs.pop('capacity', 2)), **kwargs)
+        buffer.extend(df)
+        return buffer
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._updates = 0
+
+    def __len__(self):
+        return self._size
+
+    def _slot(self, i):
+        """第 i 根K线（按时间顺序，支持负数）在数组中的位置"""
+        return (self._start + i % self._size) % self.capacity
+
+    def _return_at(self, i):
+        """第 i-1 根到第 i 根K线的对数收益"""
+        return math.log(self._bars[self._slot(i), 3] / self._bars[self._slot(i - 1), 3])
+
+    def _add_return(self, value, sign=1):
+        self._sum += sign * value
+        self._sumsq += sign * value * value
+
+    def _recompute(self):
+        returns = self.returns
+        self._sum = float(returns.sum())
+        self._sumsq = float((returns * returns).sum())
+        self._updates = 0
+
+    @property
+    def last_timestamp(self):
+        """最后一根K线的时间，缓冲区为空时为 None"""
+        if not self._size:
+            return None
+        return pd.Timestamp(self._times[self._slot(-1)])
+
+    @property
+    def spot(self):
+        """最新收盘价"""
+        if not self._size:
+            return None
+        return float(self._bars[self._slot(-1), 3])
+
+    @property
+    def sigma(self):
+        """对数收益的年化波动率（样本标准差），收益少于2个时为 None"""
+        n = self._size - 1
+        if n < 2:
+            return None
+        variance = max((self._sumsq - self._sum * self._sum / n) / (n - 1), 0.0)
+        return float(np.sqrt(variance) * np.sqrt(self.annualization))
+
+    @property
+    def returns(self):
+        """按时间顺序的对数收益数组"""
+        closes = self._ordered(self._bars[:, 3])
+        return np.log(closes[1:] / closes[:-1])
+
+    def _ordered(self, values):
+        return values[(self._start + np.arange(self._size)) % self.capacity]
+
+    def append(self, timestamp, open_, high, low, close, volume=0.0):
+        """
+        追加一根K线
+
+        返回:
+            bool: 是否为新K线（修正最后一根或忽略旧K线时为 False）
+        """
+        if not isinstance(timestamp, (int, np.integer)):
+            timestamp = pd.Timestamp(timestamp).value
+        if not math.isfinite(close) or close <= 0:
+            return False
+        row = (open_, high, low, close, volume)
+
+        with self._lock:
+            if self._size:
+                last = self._times[self._slot(-1)]
+                if timestamp < last:
+                    return False
+                if timestamp == last:
+                    # 未完成K线的修正：替换最后一个收益
+                    if self._size > 1:
+                        self._add_return(self._return_at(-1), -1)
+                    self._bars[self._slot(-1)] = row
+                    if self._size > 1:
+                        self._add_return(self._return_at(-1))
+                    return False
+                if self.session_gap is not None and timestamp - last > self.session_gap:
+                    self.clear()
+
+            if self._size == self.capacity:
+                # 淘汰最早的K线及其后的第一个收益
+                self._add_return(self._return_at(1), -1)
+                self._start = (self._start + 1) % self.capacity
+                self._size -= 1
+
+            slot = (self._start + self._size) % self.capacity
+            self._times[slot] = timestamp
+            self._bars[slot] = row
+            self._size += 1
+            if self._size > 1:
+                self._add_return(self._return_at(-1))
+
+            self._updates += 1
+            if self._updates >= self.capacity:
+                self._recompute()
+            return True
+
+    def extend(self, df):
+        """
+        追加标准化K线（Open/High/Low/Close/Volume 列，时间为索引或多级索引的最后一层）
+
+        返回:
+            int: 新增的K线数量
+        """
+        if df is None or df.empty:
+            return 0
+        times = pd.DatetimeIndex(df.index.get_level_values(-1))
+        if times.tz is not None:
+            times = times.tz_convert(None)
+        values = df[_COLUMNS].to_numpy(dtype=float)
+        last = self.last_timestamp
+        # 跳过已有的K线，最后一根保留以便修正
+        start = 0 if last is None else int(np.searchsorted(times.asi8, last.value))
+        added = 0
+        for timestamp, row in zip(times.asi8[start:], values[start:]):
+            added += self.append(timestamp, *row)
+        return added
+
+    def to_frame(self, symbol=None):
+        """导出为与 _normalize_bars 结构一致的 DataFrame"""
+        with self._lock:
+            times = pd.to_datetime(self._ordered(self._times))
+            bars = self._ordered(self._bars)
+        index = (
+            pd.MultiIndex.from_arrays([[symbol] * len(times), times], names=['symbol', 'date'])
+            if symbol is not None else pd.DatetimeIndex(times, name='date')
+        )
+        return pd.DataFrame(bars, index=index, columns=_COLUMNS)
+
+
+class BarBuffers:
+    """按 (标的, 周期) 管理跨扫描周期复用的K线缓冲区"""
+
+    def __init__(self, capacity=100, session_gap_hours=4):
+        self.capacity = int(capacity)
+        self.session_gap = pd.Timedelta(hours=session_gap_hours)
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def get(self, ticker, interval='5m'):
+        with self._lock:
+            key = (ticker, interval)
+            if key not in self._buffers:
+                self._buffers[key] = BarBuffer(self.capacity, self.session_gap)
+            return self._buffers[key]
+
+    def history_range(self, tickers, interval='5m'):
+        """
+        批量请求K线的时间范围参数
+
+        全部标的都已有最近一天内的K线时只请求最早的最后一根之后的数据，否则请求一整天。
+        请求时需配合 adj_timezone=False，使K线时间与 start 参数都按UTC解释。
+        """
+        last = [self.get(t, interval).last_timestamp for t in tickers]
+        if not last or any(ts is None for ts in last):
+            return {'period': '1d'}
+        start = min(last)
+        if pd.Timestamp.utcnow().tz_localize(None) - start > pd.Timedelta(days=1):
+            return {'period': '1d'}
+        return {'start': start.to_pydatetime()}
+
+
+_bar_buffers = None
+_bar_buffers_lock = threading.Lock()
+
+
+def get_bar_buffers(config=None):
+    """获取进程内共享的K线缓冲区，首次创建时读取 bars 配置"""
+    global _bar_buffers
+    with _bar_buffers_lock:
+        if _bar_buffers is None:
+            settings = (config or {}).get('bars') or {}
+            _bar_buffers = BarBuffers(
+                capacity=int(settings.get('capacity', 100)),
+                session_gap_hours=float(settings.get('session_gap_hours', 4))
+            )
+        return _bar_buffers
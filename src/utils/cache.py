@@ -0,0 +1,96 @@
+import threading
+import time
+import logging
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 各数据类型的默认有效期（秒）
+DEFAULT_TTL = {
+    'bars': 30,
+    'chain': 30,
+    'earnings': 86400,
+    'iv_rank': 30,
+    'surface': 30,
+}
+
+
+class SnapshotCache:
+    """
+    行情快照缓存
+    
+    以 (标的, 数据类型, 到期日/参数) 为键保存已解析的数据，
+    同一扫描周期内的所有调用方共享同一份 DataFrame，调用方不应原地修改。
+    """
+    
+    def __init__(self, ttl=None, clock=time.monotonic):
+        self.ttl = dict(DEFAULT_TTL)
+        self.ttl.update(ttl or {})
+        self._clock = clock
+        self._entries = {}
+        self._lock = threading.Lock()
+        
+    def _ttl_for(self, kind):
+        return self.ttl.get(kind, DEFAULT_TTL.get(kind, 0))
+    
+    def get(self, ticker, kind, key=None):
+        """读取未过期的快照，不存在或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get((ticker, kind, key))
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self._clock() - stored_at > self._ttl_for(kind):
+                del self._entries[(ticker, kind, key)]
+                return None
+            return value
+    
+    def put(self, ticker, kind, value, key=None):
+        """写入快照"""
+        with self._lock:
+            self._entries[(ticker, kind, key)] = (self._clock(), value)
+        
+    def get_or_load(self, ticker, kind, loader, key=None, is_empty=None):
+        """
+        读取快照，未命中时调用 loader 加载并缓存
+        
+        参数:
+            loader (callable): 无参加载函数
+            is_empty (callable): 判断加载结果是否为空，空结果不缓存
+        """
+        value = self.get(ticker, kind, key)
+        if value is not None:
+            metrics.incr('cache_hits')
+            return value
+        
+        metrics.incr('cache_misses')
+        value = loader()
+        if is_empty is None or not is_empty(value):
+            self.put(ticker, kind, value, key)
+        return value
+    
+    def discard(self, ticker, kind, key=None):
+        """删除单个快照"""
+        with self._lock:
+            self._entries.pop((ticker, kind, key), None)
+    
+    def invalidate(self, ticker=None, kind=None):
+        """使指定标的和/或数据类型的快照失效，不带参数时清空全部"""
+        with self._lock:
+            for entry_key in list(self._entries):
+                if ticker is not None and entry_key[0] != ticker:
+                    continue
+                if kind is not None and entry_key[1] != kind:
+                    continue
+                del self._entries[entry_key]
+    
+    def purge_expired(self):
+        """清理所有已过期的快照"""
+        now = self._clock()
+        with self._lock:
+            for entry_key, (stored_at, _) in list(self._entries.items()):
+                if now - stored_at > self._ttl_for(entry_key[1]):
+                    del self._entries[entry_key]
+    
+    def __len__(self):
+        return len(self._entries)
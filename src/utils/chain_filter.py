@@ -0,0 +1,134 @@
+import logging
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from src.utils.metrics import metrics, timed
+
+logger = logging.getLogger(__name__)
+
+# 预筛选规则的执行顺序
+FILTER_RULES = ('dte', 'quote', 'volume', 'spread', 'moneyness', 'delta')
+
+
+def filter_settings(strategy_config):
+    """
+    从 strategy 配置读取预筛选参数
+
+    min_volume / max_spread_ratio 沿用 strategy 顶层配置，其余读取 strategy.prefilter。
+    """
+    strategy_config = strategy_config or {}
+    prefilter = strategy_config.get('prefilter') or {}
+    return {
+        'min_volume': strategy_config.get('min_volume'),
+        'max_spread_ratio': strategy_config.get('max_spread_ratio'),
+        'max_log_moneyness': prefilter.get('max_log_moneyness'),
+        'min_abs_delta': prefilter.get('min_abs_delta'),
+        'max_abs_delta': prefilter.get('max_abs_delta'),
+        'min_dte': prefilter.get('min_dte'),
+        'max_dte': prefilter.get('max_dte'),
+    }
+
+
+def spread_ratio(bid, ask, mid=None, last_price=None):
+    """
+    买卖价差占价格的比例，支持标量和数组
+
+    价格优先取中间价，没有时退回最新成交价；价格不为正时比例为无穷大。
+    """
+    bid = np.asarray(bid, dtype=float)
+    ask = np.asarray(ask, dtype=float)
+    price = 0.5 * (bid + ask) if mid is None else np.asarray(mid, dtype=float)
+    if last_price is not None:
+        price = np.where(price > 0, price, np.asarray(last_price, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(price > 0, (ask - bid) / price, np.inf)
+
+
+def _approx_abs_delta(chain, spot, r):
+    """按报价隐含波动率计算的 |Delta|，隐含波动率无效时为 NaN"""
+    iv = np.asarray(chain['impliedVolatility'], dtype=float)
+    strike = np.asarray(chain['strike'], dtype=float)
+    t = np.maximum(np.asarray(chain['days_to_expire'], dtype=float), 1) / 365
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(spot / strike) + (r + 0.5 * iv ** 2) * t) / (iv * np.sqrt(t))
+    delta = ndtr(d1)
+    is_call = np.asarray(chain['type']) == 'call'
+    return np.where(iv > 0, np.where(is_call, delta, 1 - delta), np.nan)
+
+
+@timed('signal.prefilter')
+def prefilter_chain(option_chain, spot, min_volume=None, max_spread_ratio=None,
+                    max_log_moneyness=None, min_abs_delta=None, max_abs_delta=None,
+                    min_dte=None, max_dte=None, r=0.01, ticker=None):
+    """
+    在定价前用布尔掩码对整条期权链做预筛选
+
+    规则按 FILTER_RULES 顺序依次作用于上一条规则保留下来的合约，
+    未配置（None）的规则跳过。Delta 带只计算一次 N(d1)，不调用完整的希腊值计算。
+
+    参数:
+        option_chain (OptionChain | pd.DataFrame): 标准化期权链，返回相同类型
+        spot (float): 现货价格
+        min_volume (int): 最小成交量
+        max_spread_ratio (float): 最大买卖价差比例（相对中间价）
+        max_log_moneyness (float): |ln(K/S)| 上限
+        min_abs_delta, max_abs_delta (float): |Delta| 范围
+        min_dte, max_dte (int): 剩余天数范围
+        ticker (str): 仅用于日志
+
+    返回:
+        tuple: (筛选后的期权链, {规则: 剔除数量})
+    """
+    pruned = dict.fromkeys(FILTER_RULES, 0)
+    if option_chain.empty:
+        return option_chain, pruned
+
+    keep = np.ones(len(option_chain), dtype=bool)
+
+    def apply(rule, mask):
+        nonlocal keep
+        mask = np.asarray(mask, dtype=bool)
+        pruned[rule] = int(np.count_nonzero(keep & ~mask))
+        keep &= mask
+
+    days = np.asarray(option_chain['days_to_expire'], dtype=float)
+    if min_dte is not None or max_dte is not None:
+        apply('dte', (days >= (min_dte if min_dte is not None else -np.inf)) &
+                     (days <= (max_dte if max_dte is not None else np.inf)))
+
+    bid = np.asarray(option_chain['bid'], dtype=float)
+    ask = np.asarray(option_chain['ask'], dtype=float)
+    apply('quote', (ask > 0) & (ask >= bid))
+
+    if min_volume is not None:
+        apply('volume', np.asarray(option_chain['volume'], dtype=float) >= min_volume)
+
+    if max_spread_ratio is not None:
+        mid = option_chain['mid'] if 'mid' in option_chain.columns else None
+        last_price = option_chain['lastPrice'] if 'lastPrice' in option_chain.columns else None
+        apply('spread', spread_ratio(bid, ask, mid, last_price) <= max_spread_ratio)
+
+    if max_log_moneyness is not None and spot:
+        moneyness = np.abs(np.log(np.asarray(option_chain['strike'], dtype=float) / spot))
+        apply('moneyness', moneyness <= max_log_moneyness)
+
+    if (min_abs_delta is not None or max_abs_delta is not None) and spot:
+        delta = np.full(len(option_chain), np.nan)
+        delta[keep] = _approx_abs_delta(option_chain[keep], spot, r)
+        apply('delta', (delta >= (min_abs_delta if min_abs_delta is not None else 0)) &
+                       (delta <= (max_abs_delta if max_abs_delta is not None else 1)))
+
+    for rule, count in pruned.items():
+        if count:
+            metrics.incr(f'pruned.{rule}', count)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "%s 期权链预筛选: %d -> %d %s", ticker or '', len(option_chain), int(keep.sum()),
+            ' '.join(f"{rule}={count}" for rule, count in pruned.items())
+        )
+    if keep.all():
+        return option_chain, pruned
+    filtered = option_chain[keep]
+    if isinstance(filtered, pd.DataFrame):
+        filtered = filtered.reset_index(drop=True)
+    return filtered, pruned
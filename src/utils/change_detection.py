@@ -0,0 +1,135 @@
+import math
+import time
+import hashlib
+import threading
+import numpy as np
+from src.utils.risk_book import position_key
+
+
+def spot_bucket(spot, width):
+    """现价所在的对数区间编号，每个区间宽 width（相对变化）"""
+    if not spot or spot <= 0:
+        return None
+    return math.floor(math.log(spot) / math.log1p(width))
+
+
+def chain_hash(option_chain, quote_tick=0.01, iv_tick=0.001):
+    """
+    期权链报价的指纹
+
+    买卖价按 quote_tick、隐含波动率按 iv_tick 取整后连同行权价、类型、到期日和剩余天数
+    一起哈希，小于一个最小变动单位的跳动不改变指纹。
+    """
+    if option_chain is None or option_chain.empty:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.asarray(option_chain['strike'], dtype=np.float64).tobytes())
+    digest.update(np.asarray(option_chain['type']).astype('U4').tobytes())
+    digest.update(np.asarray(option_chain['days_to_expire'], dtype=np.int64).tobytes())
+    for name, tick in (('bid', quote_tick), ('ask', quote_tick), ('impliedVolatility', iv_tick)):
+        values = np.asarray(option_chain[name], dtype=np.float64)
+        digest.update(np.rint(np.nan_to_num(values) / tick).astype(np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class ChangeGate:
+    """
+    增量分析的输入指纹
+
+    每个标的记录上次完整分析时的输入：现价区间、期权链报价指纹和财报日期集合。
+    输入均未变化时跳过希腊值计算和策略评分；超过 max_age 秒仍强制重新分析一次，
+    以覆盖指纹之外缓慢变化的输入（如K线波动率、组合敞口）。
+
+    参数:
+        spot_width (float): 现价区间宽度（相对变化）
+        quote_tick (float): 报价最小变动单位
+        iv_tick (float): 隐含波动率最小变动单位
+        max_age (float): 指纹的最长有效期（秒），0 表示不限
+    """
+
+    def __init__(self, spot_width=0.001, quote_tick=0.01, iv_tick=0.001, max_age=0, clock=time.monotonic):
+        self.spot_width = spot_width
+        self.quote_tick = quote_tick
+        self.iv_tick = iv_tick
+        self.max_age = max_age
+        self._clock = clock
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        config = config or {}
+        return cls(
+            spot_width=float(config.get('spot_bucket', 0.001)),
+            quote_tick=float(config.get('quote_tick', 0.01)),
+            iv_tick=float(config.get('iv_tick', 0.001)),
+            max_age=float(config.get('max_age', 0))
+        )
+
+    def fingerprint(self, spot, option_chain, earnings_dates=()):
+        """计算输入指纹，缺少现价或期权链时返回 None（总是重新分析）"""
+        bucket = spot_bucket(spot, self.spot_width)
+        quotes = chain_hash(option_chain, self.quote_tick, self.iv_tick)
+        if bucket is None or quotes is None:
+            return None
+        return bucket, quotes, tuple(sorted(str(d) for d in earnings_dates or ()))
+
+    def unchanged(self, ticker, fingerprint):
+        """输入与上次分析相同且未超过有效期"""
+        if fingerprint is None:
+            return False
+        with self._lock:
+            entry = self._seen.get(ticker)
+        if entry is None or entry[1] != fingerprint:
+            return False
+        return not self.max_age or self._clock() - entry[0] <= self.max_age
+
+    def update(self, ticker, fingerprint):
+        """记录完成分析时的输入"""
+        with self._lock:
+            if fingerprint is None:
+                self._seen.pop(ticker, None)
+            else:
+                self._seen[ticker] = (self._clock(), fingerprint)
+
+    def forget(self, ticker=None):
+        with self._lock:
+            if ticker is None:
+                self._seen.clear()
+            else:
+                self._seen.pop(ticker, None)
+
+
+class SignalDeduplicator:
+    """
+    信号去重：同一标的、策略、行权价和到期日的信号在 window 秒内只发送一次
+
+    参数:
+        window (float): 去重窗口（秒），0 表示不去重
+    """
+
+    def __init__(self, window=3600, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._sent = {}
+        self._lock = threading.Lock()
+
+    def filter(self, signals):
+        """返回窗口内尚未发送过的信号，并记录为已发送"""
+        if not self.window:
+            return list(signals)
+        now = self._clock()
+        fresh = []
+        with self._lock:
+            for signal in signals:
+                key = position_key(signal)
+                sent_at = self._sent.get(key)
+                if sent_at is not None and now - sent_at < self.window:
+                    continue
+                self._sent[key] = now
+                fresh.append(signal)
+            # 清理已过窗口的记录
+            expired = [key for key, sent_at in self._sent.items() if now - sent_at >= self.window]
+            for key in expired:
+                del self._sent[key]
+        return fresh
@@ -0,0 +1,262 @@
+import os
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class ChainHandle:
+    """
+    共享内存中期权链的描述信息，可廉价地传给子进程
+
+    数据本身按列存放在一块共享内存中，每列每行8字节：数值列为 float64，
+    时间列为 int64 纳秒，其余列为 int64 分类编码（类别列表随描述一起传递）。
+    """
+
+    __slots__ = ('name', 'rows', 'columns')
+
+    def __init__(self, name, rows, columns):
+        self.name = name
+        self.rows = rows
+        # [(列名, 'f' | 'M' | 'c', 类别列表或 None)]
+        self.columns = columns
+
+    def __getstate__(self):
+        return self.name, self.rows, self.columns
+
+    def __setstate__(self, state):
+        self.name, self.rows, self.columns = state
+
+
+class SharedChain:
+    """
+    把期权链复制到共享内存，供进程池中的任务读取，避免序列化整个 DataFrame
+
+    由创建方负责 close()（释放并删除共享内存），子进程通过 attach_chain 只读访问。
+    """
+
+    def __init__(self, chain):
+        if not isinstance(chain, pd.DataFrame):
+            # 列式期权链按其 pandas 视图复制
+            chain = chain.to_frame()
+        columns = []
+        arrays = []
+        for name in chain.columns:
+            values = chain[name]
+            if pd.api.types.is_datetime64_any_dtype(values):
+                if getattr(values.dt, 'tz', None) is not None:
+                    values = values.dt.tz_convert(None)
+                columns.append((name, 'M', None))
+                arrays.append(values.to_numpy(dtype='datetime64[ns]').view('int64'))
+            elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values):
+                columns.append((name, 'f', None))
+                arrays.append(values.to_numpy(dtype=float))
+            else:
+                codes, categories = pd.factorize(values)
+                columns.append((name, 'c', list(categories)))
+                arrays.append(codes.astype('int64'))
+
+        rows = len(chain)
+        size = max(1, rows * 8 * len(arrays))
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        for k, (array, (_, kind, _)) in enumerate(zip(arrays, columns)):
+            _column_view(self._shm.buf, k, rows, kind)[:] = array
+        self.handle = ChainHandle(self._shm.name, rows, columns)
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def close(self):
+        try:
+            self._shm.close()
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _column_view(buf, k, rows, kind):
+    dtype = 'float64' if kind == 'f' else 'int64'
+    return np.ndarray((rows,), dtype=dtype, buffer=buf, offset=k * rows * 8)
+
+
+def attach_chain(handle):
+    """在子进程中按描述信息还原期权链（复制出共享内存后立即断开）"""
+    shm = shared_memory.SharedMemory(name=handle.name)
+    try:
+        data = {}
+        for k, (name, kind, categories) in enumerate(handle.columns):
+            view = _column_view(shm.buf, k, handle.rows, kind)
+            if kind == 'f':
+                data[name] = view.copy()
+            elif kind == 'M':
+                data[name] = view.copy().view('datetime64[ns]')
+            else:
+                # 缺失值的编码为 -1，对应追加在末尾的 None
+                data[name] = np.append(np.asarray(categories, dtype=object), None)[view]
+            del view
+        return pd.DataFrame(data)
+    finally:
+        shm.close()
+
+
+def _run_task(func, handle, args, kwargs):
+    """
+    子进程入口：传入 handle 时还原共享的期权链后调用 func(chain, *args, **kwargs)
+
+    子进程逐个执行任务，任务前清零本进程的指标，连同结果返回任务期间记录的快照，
+    由父进程合并，使进程池内计算的阶段耗时和计数器同样出现在周期指标中。
+    """
+    metrics.reset()
+    if handle is None:
+        result = func(*args, **kwargs)
+    else:
+        result = func(attach_chain(handle), *args, **kwargs)
+    return result, metrics.reset()
+
+
+def _unwrap(source, target):
+    """把子进程返回的 (结果, 指标快照) 拆开：合并指标，结果交给 target"""
+    try:
+        result, snap = source.result()
+    except BaseException as e:
+        target.set_exception(e)
+        return
+    metrics.merge(snap)
+    target.set_result(result)
+
+
+def _warm_up():
+    """子进程初始化：预先导入计算模块，避免首个任务承担导入开销"""
+    import src.utils.strategies  # noqa: F401
+    import src.utils.spreads  # noqa: F401
+
+
+class ComputePool:
+    """
+    CPU密集型分析的常驻进程池
+
+    扫描线程负责I/O，取得期权链后把定价、策略评估等计算提交到进程池并等待结果，
+    计算不再占用守护进程的GIL。期权链通过共享内存传递，只有描述信息和结果需要序列化。
+    进程池在首次提交时创建并在进程退出前一直复用；合约数少于 min_rows 或未启用时
+    直接在当前线程计算。进程池异常退出时重建，本次任务退回在线程内计算。
+
+    参数:
+        max_workers (int): 进程数，0或None表示CPU核数
+        start_method (str): 进程启动方式，守护进程含多个线程，默认 forkserver
+        min_rows (int): 提交到进程池的最小合约数
+        enabled (bool): 是否启用进程池
+    """
+
+    def __init__(self, max_workers=None, start_method='forkserver', min_rows=0, enabled=True):
+        self.max_workers = int(max_workers or os.cpu_count() or 1)
+        self.start_method = start_method
+        self.min_rows = int(min_rows)
+        self.enabled = enabled
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context, initializer=_warm_up
+                )
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, func, *args, chain=None, **kwargs):
+        """
+        提交计算任务，返回 Future
+
+        func 必须可在子进程中导入（模块级函数）。传入 chain 时通过共享内存传递，
+        并作为第一个参数传给 func；共享内存在任务完成后释放。子进程中记录的指标随结果返回并合并。
+        """
+        if not self.enabled or (chain is not None and len(chain) < self.min_rows):
+            return self._run_inline(func, args, kwargs, chain)
+
+        executor = self._get_executor()
+        metrics.incr('compute.tasks')
+        result = Future()
+        if chain is None:
+            future = executor.submit(_run_task, func, None, args, kwargs)
+            future.add_done_callback(lambda done: _unwrap(done, result))
+            return result
+
+        shared = SharedChain(chain)
+        metrics.incr('compute.shared_bytes', shared.nbytes)
+        try:
+            future = executor.submit(_run_task, func, shared.handle, args, kwargs)
+        except Exception:
+            shared.close()
+            raise
+
+        def done(finished):
+            shared.close()
+            _unwrap(finished, result)
+
+        future.add_done_callback(done)
+        return result
+
+    def run(self, func, *args, chain=None, **kwargs):
+        """提交任务并等待结果；进程池损坏时重建并在当前线程重新计算"""
+        with metrics.timer('compute.run'):
+            future = self.submit(func, *args, chain=chain, **kwargs)
+            try:
+                return future.result()
+            except BrokenProcessPool:
+                logger.error("计算进程池异常退出，重建后在线程内计算", exc_info=True)
+                executor = self._executor
+                if executor is not None:
+                    self._reset(executor)
+                return self._run_inline(func, args, kwargs, chain).result()
+
+    def _run_inline(self, func, args, kwargs, chain):
+        metrics.incr('compute.inline')
+        future = Future()
+        try:
+            result = func(chain, *args, **kwargs) if chain is not None else func(*args, **kwargs)
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_compute_pool = None
+_compute_pool_lock = threading.Lock()
+
+
+def get_compute_pool(config=None):
+    """获取进程内共享的计算进程池，首次创建时读取 compute 配置"""
+    global _compute_pool
+    with _compute_pool_lock:
+        if _compute_pool is None:
+            settings = (config or {}).get('compute') or {}
+            _compute_pool = ComputePool(
+                max_workers=settings.get('max_workers'),
+                start_method=settings.get('start_method', 'forkserver'),
+                min_rows=settings.get('min_contracts', 0),
+                enabled=bool(settings.get('enabled', False))
+            )
+            atexit.register(_compute_pool.shutdown)
+        return _compute_pool
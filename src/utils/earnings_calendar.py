@@ -0,0 +1,281 @@
+import sqlite3
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+import pandas as pd
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 没有财报的品种（yahoo quoteType）
+NO_EARNINGS_TYPES = frozenset({'ETF', 'INDEX', 'MUTUALFUND', 'CURRENCY', 'CRYPTOCURRENCY', 'FUTURE', 'OPTION'})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS earnings_date (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    PRIMARY KEY (ticker, date)
+);
+CREATE TABLE IF NOT EXISTS earnings_state (
+    ticker TEXT PRIMARY KEY,
+    quote_type TEXT,
+    refreshed_on TEXT
+);
+"""
+
+
+def _today(now=None):
+    """按日比较的起点：当天零点（财报日期保存为零点时间戳）"""
+    return (pd.Timestamp.now() if now is None else pd.Timestamp(now)).normalize()
+
+
+def event_within(dates, days=5, now=None):
+    """
+    升序日期列表中是否有 [当天, 当天 + days] 内的事件，二分查找 O(log n)
+
+    按日比较，当天盘后发布的财报同样计入。
+
+    参数:
+        dates (list): 升序排列的事件日期
+        days (int): 天数
+        now (datetime): 当前时间，默认为现在
+    """
+    if not dates:
+        return False
+    today = _today(now)
+    i = bisect_left(dates, today)
+    return i < len(dates) and dates[i] <= today + pd.DateOffset(days=days)
+
+
+def parse_earnings_dates(calendar, ticker, now=None):
+    """从 calendar_events 返回值中解析当天及以后的财报日期，该标的无有效数据时返回 None"""
+    payload = calendar.get(ticker) if isinstance(calendar, dict) else None
+    if not isinstance(payload, dict):
+        return None
+
+    raw_dates = (payload.get('earnings') or {}).get('earningsDate') or []
+    today = _today(now)
+    dates = []
+    for value in raw_dates:
+        if isinstance(value, (int, float)):
+            parsed = pd.to_datetime(value, unit='s', errors='coerce')
+        else:
+            # formatted=False 时日期为 "YYYY-MM-DD ..." 字符串
+            parsed = pd.to_datetime(str(value)[:10], errors='coerce')
+        if pd.notna(parsed) and parsed >= today:
+            dates.append(parsed.to_pydatetime())
+    return sorted(dates)
+
+
+def _parse_quote_type(payload, ticker):
+    entry = payload.get(ticker) if isinstance(payload, dict) else None
+    if not isinstance(entry, dict):
+        return None
+    quote_type = entry.get('quoteType')
+    return str(quote_type).upper() if quote_type else None
+
+
+def fetch_earnings(yahoo, tickers, quote_types=None):
+    """
+    用一个yahooquery客户端批量获取财报日期
+
+    先为品种未知的标的批量请求 quoteType，再只为可能有财报的标的批量请求 calendar_events；
+    请求结束后恢复客户端原来的标的列表。
+
+    返回:
+        dict: {标的: (quoteType, 财报日期列表)}，日期获取失败时为 None
+    """
+    quote_types = dict(quote_types or {})
+    previous = yahoo.symbols
+    calendar = {}
+    try:
+        unknown = [t for t in tickers if not quote_types.get(t)]
+        if unknown:
+            yahoo.symbols = unknown
+            metrics.incr('network_requests')
+            with metrics.timer('fetch.quote_type'):
+                payload = yahoo.quote_type
+            for ticker in unknown:
+                quote_types[ticker] = _parse_quote_type(payload, ticker)
+
+        symbols = [t for t in tickers if quote_types.get(t) not in NO_EARNINGS_TYPES]
+        if symbols:
+            yahoo.symbols = symbols
+            metrics.incr('network_requests')
+            with metrics.timer('fetch.earnings'):
+                calendar = yahoo.calendar_events
+    finally:
+        yahoo.symbols = previous
+
+    return {
+        ticker: (quote_types.get(ticker),
+                 [] if quote_types.get(ticker) in NO_EARNINGS_TYPES else parse_earnings_dates(calendar, ticker))
+        for ticker in tickers
+    }
+
+
+class EarningsCalendar:
+    """
+    本地财报日历（SQLite持久化，内存中按日期排序索引）
+
+    整个观察列表每天最多批量刷新一次；ETF、指数等没有财报的品种由 quoteType 识别并持久化，
+    之后不再请求其财报日历。"某标的N天内是否有财报"与"N天内有财报的标的"均用二分查找回答。
+    """
+
+    def __init__(self, path='data/earnings.db'):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        if str(self.path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._memory_conn = sqlite3.connect(':memory:', check_same_thread=False) \
+            if str(self.path) == ':memory:' else None
+        self._dates = {}
+        self._quote_types = {}
+        self._refreshed = {}
+        self._event_dates = []
+        self._event_tickers = []
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            dates = conn.execute("SELECT ticker, date FROM earnings_date ORDER BY date").fetchall()
+            states = conn.execute("SELECT ticker, quote_type, refreshed_on FROM earnings_state").fetchall()
+        for ticker, day in dates:
+            self._dates.setdefault(ticker, []).append(pd.Timestamp(day).to_pydatetime())
+        for ticker, quote_type, refreshed_on in states:
+            self._quote_types[ticker] = quote_type
+            self._refreshed[ticker] = refreshed_on
+        self._rebuild_events()
+
+    @contextmanager
+    def _connection(self):
+        """串行化访问数据库，事务结束后提交并关闭连接"""
+        with self._lock:
+            conn = self._memory_conn or sqlite3.connect(self.path, timeout=30)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                if conn is not self._memory_conn:
+                    conn.close()
+
+    def _rebuild_events(self):
+        """所有标的的财报按日期排序的全局索引"""
+        events = sorted((d, t) for t, dates in self._dates.items() for d in dates)
+        self._event_dates = [d for d, _ in events]
+        self._event_tickers = [t for _, t in events]
+
+    def needs_refresh(self, ticker, today=None):
+        """当天尚未刷新过的标的才需要联网"""
+        today = (today or date.today()).isoformat()
+        with self._index_lock:
+            refreshed = self._refreshed.get(ticker)
+        return refreshed is None or refreshed < today
+
+    def has_earnings(self, ticker):
+        """是否为有财报的品种，品种未知时返回 None"""
+        with self._index_lock:
+            quote_type = self._quote_types.get(ticker)
+        return None if quote_type is None else quote_type not in NO_EARNINGS_TYPES
+
+    def refresh(self, tickers, fetch, today=None):
+        """
+        批量刷新当天尚未刷新的标的
+
+        参数:
+            tickers (list): 标的列表
+            fetch (callable): (标的列表, 已知 quoteType) -> {标的: (quoteType, 日期列表或 None)}，
+                见 fetch_earnings
+            today (date): 刷新日期，默认今天
+
+        返回:
+            int: 成功刷新的标的数
+        """
+        pending = [t for t in dict.fromkeys(tickers) if self.needs_refresh(t, today)]
+        if not pending:
+            return 0
+        with self._index_lock:
+            known = {t: self._quote_types[t] for t in pending if self._quote_types.get(t)}
+
+        try:
+            results = fetch(pending, known)
+        except Exception as e:
+            logger.error(f"批量获取财报日历失败: {str(e)}", exc_info=True)
+            return 0
+
+        day = (today or date.today()).isoformat()
+        refreshed = {}
+        types = {}
+        for ticker in pending:
+            quote_type, dates = results.get(ticker, (None, None))
+            if quote_type:
+                types[ticker] = quote_type
+            if dates is not None:
+                refreshed[ticker] = sorted(dates)
+
+        with self._index_lock:
+            previous = {t: self._refreshed.get(t) for t in pending}
+        with self._connection() as conn:
+            for ticker, dates in refreshed.items():
+                conn.execute("DELETE FROM earnings_date WHERE ticker = ?", (ticker,))
+                conn.executemany(
+                    "INSERT OR REPLACE INTO earnings_date VALUES (?, ?)",
+                    [(ticker, pd.Timestamp(d).isoformat()) for d in dates]
+                )
+            for ticker in set(types) | set(refreshed):
+                conn.execute(
+                    "INSERT OR REPLACE INTO earnings_state VALUES (?, ?, ?)",
+                    (ticker, types.get(ticker) or known.get(ticker),
+                     day if ticker in refreshed else previous[ticker])
+                )
+
+        with self._index_lock:
+            self._quote_types.update(types)
+            for ticker, dates in refreshed.items():
+                self._dates[ticker] = [pd.Timestamp(d).to_pydatetime() for d in dates]
+                self._refreshed[ticker] = day
+            self._rebuild_events()
+        logger.debug("财报日历刷新: %d/%d 个标的", len(refreshed), len(pending))
+        return len(refreshed)
+
+    def dates(self, ticker, now=None):
+        """
+        标的当天及以后的财报日期（升序）
+
+        从未成功刷新过的标的返回 None；当天刷新失败时沿用上次的数据。
+        """
+        with self._index_lock:
+            if self._refreshed.get(ticker) is None:
+                return None
+            dates = self._dates.get(ticker, [])
+        return dates[bisect_left(dates, _today(now)):]
+
+    def has_event_within(self, ticker, days=5, now=None):
+        with self._index_lock:
+            dates = self._dates.get(ticker, [])
+        return event_within(dates, days, now)
+
+    def upcoming(self, days=5, now=None):
+        """[当天, 当天 + days] 内有财报的标的"""
+        today = _today(now)
+        with self._index_lock:
+            dates, tickers = self._event_dates, self._event_tickers
+        start = bisect_left(dates, today)
+        end = bisect_right(dates, today + pd.DateOffset(days=days))
+        return sorted(set(tickers[start:end]))
+
+
+_earnings_calendar = None
+_earnings_calendar_lock = threading.Lock()
+
+
+def get_earnings_calendar(config=None):
+    """获取进程内共享的财报日历，首次创建时读取 earnings 配置"""
+    global _earnings_calendar
+    with _earnings_calendar_lock:
+        if _earnings_calendar is None:
+            settings = (config or {}).get('earnings') or {}
+            _earnings_calendar = EarningsCalendar(path=settings.get('path', 'data/earnings.db'))
+        return _earnings_calendar
@@ -1,7 +1,6 @@
-from py_vollib.black_scholes.greeks.analytical import (
-    delta, gamma, theta, vega
-)
 import numpy as np
+import pandas as pd
+from scipy.special import ndtr
 
 def calculate_greeks(option_type, strike, spot, t, iv, r=0.01):
     """
@@ -18,6 +17,9 @@ def calculate_greeks(option_type, strike, spot, t, iv, r=0.01):
     返回:
         dict: 包含希腊字母值的字典
     """
+    # py_vollib 会导入 scipy.stats，只在需要单个期权计算时加载
+    from py_vollib.black_scholes.greeks.analytical import delta, gamma, theta, vega
+    
     try:
         # 参数验证
         if not all(isinstance(x, (int, float)) for x in [strike, spot, t, iv]):
@@ -59,4 +61,98 @@ def calculate_greeks(option_type, strike, spot, t, iv, r=0.01):
             
     except Exception as e:
         print(f"计算希腊字母时发生错误: {str(e)}")
-        return {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0}
\ No newline at end of file
+        return {'delta': 0, 'gamma': 0, 'theta': 0, 'vega': 0}
+
+GREEK_NAMES = ('delta', 'gamma', 'theta', 'vega')
+
+
+def calculate_greeks_batch(option_type, strike, spot, t, iv, r=0.01):
+    """
+    批量计算希腊字母值（向量化版本，与 calculate_greeks 结果一致）
+    
+    参数:
+        option_type (array-like): 期权类型数组 ('call' 或 'put')
+        strike (array-like): 行权价数组
+        spot (float 或 array-like): 现货价格，可为标量并自动广播
+        t (array-like): 剩余期限（天数）
+        iv (array-like): 隐含波动率
+        r (float): 无风险利率，默认1%
+        
+    返回:
+        dict: 键为 delta/gamma/theta/vega，值为 np.ndarray；无效输入对应位置为0
+    """
+    strike = _as_float_array(strike)
+    spot = _as_float_array(spot)
+    t = _as_float_array(t)
+    iv = _as_float_array(iv)
+    strike, spot, t, iv = np.broadcast_arrays(strike, spot, t, iv)
+    
+    is_call = np.char.lower(
+        np.broadcast_to(np.asarray(option_type, dtype=str), strike.shape)
+    ) == 'call'
+    
+    # 参数验证：非数值或非正数的输入结果置0
+    valid = (
+        np.isfinite(strike) & np.isfinite(spot) & np.isfinite(t) & np.isfinite(iv) &
+        (strike > 0) & (spot > 0) & (iv > 0)
+    )
+    
+    # 将天数转换为年，防止除零
+    t_year = np.maximum(t / 365, 0.00001)
+    iv = np.maximum(iv, 0.0001)
+    
+    with np.errstate(all='ignore'):
+        sqrt_t = np.sqrt(t_year)
+        d1 = (np.log(spot / strike) + (r + 0.5 * iv ** 2) * t_year) / (iv * sqrt_t)
+        d2 = d1 - iv * sqrt_t
+        pdf_d1 = np.exp(-0.5 * d1 ** 2) / np.sqrt(2 * np.pi)
+        discount = r * strike * np.exp(-r * t_year)
+        
+        d = np.where(is_call, ndtr(d1), ndtr(d1) - 1.0)
+        g = pdf_d1 / (spot * iv * sqrt_t)
+        v = spot * pdf_d1 * sqrt_t * 0.01
+        first_term = -spot * pdf_d1 * iv / (2 * sqrt_t)
+        th = np.where(
+            is_call,
+            first_term - discount * ndtr(d2),
+            first_term + discount * ndtr(-d2)
+        ) / 365.0
+    
+    # 检查结果是否为有效数值
+    greeks = {'delta': d, 'gamma': g, 'theta': th, 'vega': v}
+    for values in greeks.values():
+        valid &= np.isfinite(values)
+    
+    return {name: np.where(valid, greeks[name], 0.0) for name in GREEK_NAMES}
+
+
+def calculate_chain_greeks(option_chain, spot, r=0.01):
+    """
+    为整条期权链计算希腊字母
+    
+    参数:
+        option_chain (pd.DataFrame): fetch_option_chain 返回的数据，
+            需包含 type/strike/days_to_expire/impliedVolatility 列
+        spot (float): 现货价格
+        r (float): 无风险利率，默认1%
+        
+    返回:
+        pd.DataFrame: 新增 delta/gamma/theta/vega 列的期权链副本
+    """
+    greeks = calculate_greeks_batch(
+        option_chain['type'].to_numpy(),
+        option_chain['strike'].to_numpy(),
+        spot,
+        option_chain['days_to_expire'].to_numpy(),
+        option_chain['impliedVolatility'].to_numpy(),
+        r=r
+    )
+    return option_chain.assign(**greeks)
+
+
+def _as_float_array(values):
+    """转换为浮点数组，无法解析的值记为NaN"""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(np.ravel(values)), errors='coerce').to_numpy()
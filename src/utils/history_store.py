@@ -0,0 +1,200 @@
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_close (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL NOT NULL,
+    PRIMARY KEY (ticker, date)
+);
+CREATE TABLE IF NOT EXISTS atm_iv (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    iv REAL NOT NULL,
+    PRIMARY KEY (ticker, date)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    ticker TEXT PRIMARY KEY,
+    synced_on TEXT NOT NULL
+);
+"""
+
+
+class HistoryStore:
+    """
+    本地日线收盘价与ATM隐含波动率历史库（SQLite）
+
+    每个标的每天最多联网同步一次，且只下载本地缺失的日期，
+    其余时间所有波动率计算都直接读取本地数据。
+    """
+
+    def __init__(self, path='data/history.db', lookback_days=365, min_iv_observations=20):
+        self.path = Path(path)
+        self.lookback_days = lookback_days
+        self.min_iv_observations = min_iv_observations
+        self._lock = threading.Lock()
+        if str(self.path) != ':memory:':
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._memory_conn = sqlite3.connect(':memory:', check_same_thread=False) \
+            if str(self.path) == ':memory:' else None
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connection(self):
+        """串行化访问数据库，事务结束后提交并关闭连接"""
+        with self._lock:
+            conn = self._memory_conn or sqlite3.connect(self.path, timeout=30)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                if conn is not self._memory_conn:
+                    conn.close()
+
+    def closes(self, ticker, days=None):
+        """读取最近 days 天的收盘价序列（按日期升序）"""
+        since = (date.today() - timedelta(days=days or self.lookback_days)).isoformat()
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT date, close FROM daily_close WHERE ticker = ? AND date >= ? ORDER BY date",
+                (ticker, since)
+            ).fetchall()
+        return pd.Series([r[1] for r in rows], index=pd.to_datetime([r[0] for r in rows]), dtype=float)
+
+    def iv_history(self, ticker, days=None):
+        """读取最近 days 天记录的ATM隐含波动率序列（按日期升序）"""
+        since = (date.today() - timedelta(days=days or self.lookback_days)).isoformat()
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT date, iv FROM atm_iv WHERE ticker = ? AND date >= ? ORDER BY date",
+                (ticker, since)
+            ).fetchall()
+        return pd.Series([r[1] for r in rows], index=pd.to_datetime([r[0] for r in rows]), dtype=float)
+
+    def append_closes(self, ticker, closes):
+        """写入收盘价序列，同一日期以新值覆盖（当日未收盘数据会在次日同步时修正）"""
+        closes = closes.dropna()
+        rows = [(ticker, pd.Timestamp(d).strftime('%Y-%m-%d'), float(c)) for d, c in closes.items()]
+        if not rows:
+            return 0
+        with self._connection() as conn:
+            conn.executemany("INSERT OR REPLACE INTO daily_close VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def record_atm_iv(self, ticker, iv, on=None):
+        """记录某日的ATM隐含波动率，同一天多次记录以最后一次为准"""
+        if iv is None or not iv > 0:
+            return
+        day = (on or date.today()).isoformat()
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO atm_iv VALUES (?, ?, ?)", (ticker, day, float(iv)))
+
+    def last_close_date(self, ticker):
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT MAX(date) FROM daily_close WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        return date.fromisoformat(row[0]) if row and row[0] else None
+
+    def needs_sync(self, ticker, today=None):
+        """当天尚未同步过的标的才需要联网"""
+        today = (today or date.today()).isoformat()
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT synced_on FROM sync_state WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        return row is None or row[0] < today
+
+    def mark_synced(self, ticker, today=None):
+        today = (today or date.today()).isoformat()
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (ticker, today))
+
+    def sync(self, tickers, download=None):
+        """
+        增量同步日线收盘价
+
+        只为当天尚未同步的标的发起一次批量下载，起始日期取各标的本地最后一个交易日
+        （重新下载该日以修正盘中写入的收盘价），本地无数据时回溯 lookback_days 天。
+
+        参数:
+            tickers (list): 标的列表
+            download (callable): 下载函数 (tickers, start) -> DataFrame，默认使用 yfinance
+
+        返回:
+            int: 写入的收盘价条数
+        """
+        pending = [t for t in tickers if self.needs_sync(t)]
+        if not pending:
+            return 0
+
+        default_start = date.today() - timedelta(days=self.lookback_days)
+        starts = [self.last_close_date(t) or default_start for t in pending]
+        start = max(min(starts), default_start)
+
+        # 下载失败或无数据时同样记为当天已同步，次日再试，避免每次扫描都重新联网
+        try:
+            closes = (download or _download_closes)(pending, start)
+        except Exception as e:
+            logger.error(f"同步历史收盘价失败: {str(e)}", exc_info=True)
+            closes = pd.DataFrame()
+
+        written = 0
+        for ticker in pending:
+            if ticker in closes.columns:
+                written += self.append_closes(ticker, closes[ticker])
+            self.mark_synced(ticker)
+        logger.debug("历史收盘价同步完成: %d 个标的, %d 条", len(pending), written)
+        return written
+
+
+def _download_closes(tickers, start):
+    """使用yfinance批量下载日线收盘价，返回以标的为列的 DataFrame"""
+    import yfinance as yf
+    from src.utils.http_transport import get_transport
+
+    def download(session):
+        return yf.download(tickers, start=start.isoformat(), progress=False,
+                           group_by='column', auto_adjust=False, threads=True, session=session)
+
+    try:
+        data = download(get_transport().session())
+    except Exception as e:
+        # 新版yfinance只接受 curl_cffi 会话：退回其自带会话（不经过共享传输层的重试与熔断）
+        if 'curl_cffi' not in str(e):
+            raise
+        logger.warning("yfinance 不接受 requests 会话，使用其自带会话下载收盘价")
+        data = download(None)
+    if data.empty:
+        return pd.DataFrame()
+    closes = data['Close']
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    return closes
+
+
+_history_store = None
+_history_store_lock = threading.Lock()
+
+
+def get_history_store(config=None):
+    """获取进程内共享的历史库，首次创建时读取 history 配置"""
+    global _history_store
+    with _history_store_lock:
+        if _history_store is None:
+            settings = (config or {}).get('history') or {}
+            _history_store = HistoryStore(
+                path=settings.get('path', 'data/history.db'),
+                lookback_days=int(settings.get('lookback_days', 365)),
+                min_iv_observations=int(settings.get('min_iv_observations', 20))
+            )
+        return _history_store
@@ -0,0 +1,308 @@
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """主机的熔断器处于打开状态，请求未发出"""
+
+
+class RetryBudget:
+    """
+    重试预算：每个请求存入 ratio 个令牌，每次重试取出一个
+
+    重试总量被限制在请求量的 ratio 倍以内，另按 min_per_second 补充少量令牌，
+    保证低流量时仍可重试。服务整体故障时重试不会成倍放大请求量。
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=0.5, capacity=10, clock=time.monotonic):
+        self.ratio = float(ratio)
+        self.min_per_second = float(min_per_second)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        """记录一个新请求"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def withdraw(self):
+        """取得一次重试的额度，预算耗尽时返回 False"""
+        with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """
+    单个主机的熔断器
+
+    连续 failure_threshold 次失败（连接错误、429、5xx）后打开，cooldown 秒内的请求直接失败；
+    冷却结束后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开。
+    响应带 Retry-After 时打开时长不短于服务器要求的等待时间。
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, cooldown=30, clock=time.monotonic):
+        self.failure_threshold = int(failure_threshold)
+        self.cooldown = float(cooldown)
+        self._clock = clock
+        self._failures = 0
+        self._open_until = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._open_until is None:
+                return self.CLOSED
+            if self._probing or self._clock() >= self._open_until:
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def allow(self):
+        """是否放行请求；半开状态只放行一个探测请求"""
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if self._probing or self._clock() < self._open_until:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._open_until = None
+            self._probing = False
+
+    def record_failure(self, retry_after=None):
+        """记录一次失败，返回熔断器是否因此打开"""
+        with self._lock:
+            self._failures += 1
+            if not self._probing and self._failures < self.failure_threshold:
+                return False
+            self._open_until = self._clock() + max(self.cooldown, retry_after or 0)
+            self._probing = False
+            return True
+
+
+class TransportAdapter(HTTPAdapter):
+    """
+    挂载到各会话上的共享适配器
+
+    每个主机一个长连接池（urllib3 按主机分池），全局与单主机并发上限，
+    带预算和抖动退避的重试，以及按主机的熔断。
+    """
+
+    def __init__(self, transport, pool_connections=10, pool_maxsize=10):
+        self.transport = transport
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+
+    def send(self, request, timeout=None, **kwargs):
+        transport = self.transport
+        host = urlsplit(request.url).netloc
+        breaker = transport.breaker(host)
+        if not breaker.allow():
+            metrics.incr('http.circuit_rejected')
+            raise CircuitOpenError(f"{host} 熔断中，请求未发出", request=request)
+        transport.budget.deposit()
+        if timeout is None:
+            timeout = transport.timeout
+
+        attempt = 0
+        while True:
+            response = error = None
+            metrics.incr('http.requests')
+            with transport.slot(host):
+                try:
+                    response = super().send(request, timeout=timeout, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+
+            status = None if response is None else response.status_code
+            if error is None and status != 429 and status < 500:
+                breaker.record_success()
+                return response
+
+            retry_after = _retry_after_header(response)
+            if breaker.record_failure(retry_after):
+                metrics.incr('http.circuit_opened')
+                logger.warning(f"{host} 连续失败，熔断 {max(breaker.cooldown, retry_after or 0):.0f} 秒")
+
+            retryable = error is not None or status in transport.retry_statuses
+            if not retryable or attempt >= transport.retries or not breaker.allow() \
+                    or not transport.budget.withdraw():
+                if error is not None:
+                    raise error
+                return response
+
+            delay = transport.backoff_delay(attempt, retry_after)
+            logger.debug("%s 请求失败（%s），%.2f秒后重试", host, error or status, delay)
+            metrics.incr('http.retries')
+            if response is not None:
+                response.close()
+            transport.sleep(delay)
+            attempt += 1
+
+
+class HttpTransport:
+    """
+    所有出站HTTP请求共享的传输层（yahooquery、yfinance、Telegram通知）
+
+    参数:
+        pool_connections (int): 保留长连接池的主机数
+        pool_maxsize (int): 每个主机保留的长连接数
+        max_concurrency (int): 全局同时进行的请求数
+        max_per_host (int): 单个主机同时进行的请求数
+        timeout (float): 默认超时（秒）
+        retries (int): 单个请求最多重试次数
+        backoff (float): 退避基数（秒），第 n 次重试在 [0, backoff*2^n] 内随机等待
+        max_backoff (float): 单次退避上限（秒）
+        retry_statuses (tuple): 需要重试的HTTP状态码；429 只计入熔断、不重试
+        budget_ratio, budget_min_per_second: 重试预算，见 RetryBudget
+        failure_threshold, cooldown: 熔断参数，见 CircuitBreaker
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, max_concurrency=16, max_per_host=8,
+                 timeout=10, retries=3, backoff=0.3, max_backoff=10,
+                 retry_statuses=(500, 502, 503, 504), budget_ratio=0.2, budget_min_per_second=0.5,
+                 failure_threshold=5, cooldown=30, clock=time.monotonic, sleep=time.sleep):
+        self.timeout = float(timeout)
+        self.retries = int(retries)
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.retry_statuses = frozenset(int(s) for s in retry_statuses)
+        self.failure_threshold = int(failure_threshold)
+        self.cooldown = float(cooldown)
+        self.max_per_host = int(max_per_host)
+        self.budget = RetryBudget(budget_ratio, budget_min_per_second, clock=clock)
+        self.sleep = sleep
+        self._clock = clock
+        self._random = random.Random()
+        self._global = threading.BoundedSemaphore(int(max_concurrency))
+        self._hosts = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.adapter = TransportAdapter(self, pool_connections, pool_maxsize)
+
+    @classmethod
+    def from_config(cls, config):
+        config = config or {}
+        return cls(
+            pool_connections=int(config.get('pool_connections', 10)),
+            pool_maxsize=int(config.get('pool_maxsize', 10)),
+            max_concurrency=int(config.get('max_concurrency', 16)),
+            max_per_host=int(config.get('max_per_host', 8)),
+            timeout=float(config.get('timeout', 10)),
+            retries=int(config.get('retries', 3)),
+            backoff=float(config.get('backoff', 0.3)),
+            max_backoff=float(config.get('max_backoff', 10)),
+            retry_statuses=config.get('retry_statuses') or (500, 502, 503, 504),
+            budget_ratio=float(config.get('retry_budget', 0.2)),
+            budget_min_per_second=float(config.get('min_retries_per_second', 0.5)),
+            failure_threshold=int(config.get('failure_threshold', 5)),
+            cooldown=float(config.get('cooldown', 30))
+        )
+
+    def breaker(self, host):
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = CircuitBreaker(self.failure_threshold, self.cooldown, self._clock)
+                self._breakers[host] = breaker
+            return breaker
+
+    def breaker_states(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {host: breaker.state for host, breaker in breakers.items()}
+
+    @contextmanager
+    def slot(self, host):
+        """占用一个全局并发名额和一个主机并发名额"""
+        with self._lock:
+            semaphore = self._hosts.get(host)
+            if semaphore is None:
+                semaphore = self._hosts[host] = threading.BoundedSemaphore(self.max_per_host)
+        with self._global, semaphore:
+            yield
+
+    def backoff_delay(self, attempt, retry_after=None):
+        """全抖动指数退避，服务器给出 Retry-After 时不短于该值"""
+        delay = self._random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        return max(delay, min(retry_after or 0, self.max_backoff))
+
+    def mount(self, session):
+        """在已有会话上挂载共享适配器并设置浏览器请求头"""
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        session.headers.update(BROWSER_HEADERS)
+        return session
+
+    def session(self, asynchronous=False, max_workers=8):
+        """
+        创建走共享连接池的会话
+
+        参数:
+            asynchronous (bool): 返回 requests_futures 的 FuturesSession（供 yahooquery 异步模式使用）
+            max_workers (int): FuturesSession 的线程数
+        """
+        if asynchronous:
+            from requests_futures.sessions import FuturesSession
+            session = FuturesSession(max_workers=max_workers)
+        else:
+            session = requests.Session()
+        return self.mount(session)
+
+
+def _retry_after_header(response):
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return None
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport(config=None):
+    """获取进程内共享的传输层，首次创建时读取 transport 配置"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = HttpTransport.from_config((config or {}).get('transport'))
+        return _transport
@@ -0,0 +1,263 @@
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+# 隐含波动率求解区间
+IV_LOWER = 1e-4
+IV_UPPER = 5.0
+
+_SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def _year_fraction(days):
+    """剩余天数转换为年，与 _select_strike_by_delta 一致至少按1天计算"""
+    return np.maximum(np.asarray(days, dtype=float), 1) / 365
+
+
+def bs_price(is_call, spot, strike, t, sigma, r=0.01):
+    """Black-Scholes 期权价格，支持数组广播，t 为年"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol = sigma * np.sqrt(t)
+        d1 = (np.log(spot / strike) + (r + 0.5 * sigma ** 2) * t) / vol
+        d2 = d1 - vol
+        discounted = strike * np.exp(-r * t)
+        call = spot * ndtr(d1) - discounted * ndtr(d2)
+        put = discounted * ndtr(-d2) - spot * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def _bs_vega(spot, strike, t, sigma, r=0.01):
+    """价格对波动率的导数（未缩放，与 calculate_greeks 中的 vega*100 相同）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sqrt_t = np.sqrt(t)
+        d1 = (np.log(spot / strike) + (r + 0.5 * sigma ** 2) * t) / (sigma * sqrt_t)
+    return spot * np.exp(-0.5 * d1 ** 2) / _SQRT_2PI * sqrt_t
+
+
+def implied_volatility(price, spot, strike, days, option_type, r=0.01, tol=1e-6, max_iter=60):
+    """
+    批量求解隐含波动率
+
+    所有合约同时迭代：每步先尝试牛顿法，若牛顿步落在当前区间之外或 vega 过小，
+    则改用区间中点（二分），因此总能收敛。已收敛的合约不再参与后续迭代。
+
+    参数:
+        price (array-like): 期权价格（通常为买卖中间价）
+        spot (float 或 array-like): 现货价格
+        strike (array-like): 行权价
+        days (array-like): 剩余天数
+        option_type (array-like): 期权类型 ('call' 或 'put')
+        r (float): 无风险利率，默认1%
+        tol (float): 价格误差容忍度
+
+    返回:
+        np.ndarray: 隐含波动率；价格违反无套利边界或无法求解的位置为 NaN
+    """
+    price, spot, strike, t = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(spot, dtype=float),
+        np.asarray(strike, dtype=float), _year_fraction(days)
+    )
+    shape = price.shape
+    is_call = np.char.lower(np.broadcast_to(np.asarray(option_type, dtype=str), shape)) == 'call'
+    price, spot, strike, t, is_call = (a.ravel() for a in (price, spot, strike, t, is_call))
+
+    # 无套利边界：价格须严格介于内在价值与上限之间
+    with np.errstate(invalid='ignore'):
+        discounted = strike * np.exp(-r * t)
+        lower = np.where(is_call, np.maximum(spot - discounted, 0), np.maximum(discounted - spot, 0))
+        upper = np.where(is_call, spot, discounted)
+        valid = (
+            np.isfinite(price) & np.isfinite(spot) & np.isfinite(strike) &
+            (spot > 0) & (strike > 0) & (price > lower) & (price < upper)
+        )
+
+    sigma = np.full(price.shape, np.nan)
+    idx = np.flatnonzero(valid)
+    # 初值：Brenner-Subrahmanyam 近似，限制在求解区间内
+    guess = np.clip(price[idx] / spot[idx] * np.sqrt(2 * np.pi / t[idx]), 0.05, 2.0)
+    lo = np.full(idx.shape, IV_LOWER)
+    hi = np.full(idx.shape, IV_UPPER)
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        s, k, tt, c, p = spot[idx], strike[idx], t[idx], is_call[idx], price[idx]
+        diff = bs_price(c, s, k, tt, guess, r) - p
+        done = np.abs(diff) < tol
+        sigma[idx[done]] = guess[done]
+
+        # 价格随波动率单调递增，据此收缩区间
+        hi = np.where(diff > 0, guess, hi)
+        lo = np.where(diff < 0, guess, lo)
+        vega = _bs_vega(s, k, tt, guess, r)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            newton = guess - diff / vega
+        use_newton = (vega > 1e-10) & (newton > lo) & (newton < hi)
+        guess = np.where(use_newton, newton, 0.5 * (lo + hi))
+
+        # 区间已足够小时同样视为收敛
+        narrow = ~done & (hi - lo < 1e-10)
+        sigma[idx[narrow]] = guess[narrow]
+        keep = ~(done | narrow)
+        idx, guess, lo, hi = idx[keep], guess[keep], lo[keep], hi[keep]
+
+    return sigma.reshape(shape)
+
+
+class Smile:
+    """
+    单个到期日的波动率微笑
+
+    以对数价值度 k = ln(K/F) 为自变量，按报价误差加权拟合三次平滑样条；
+    点数不足时退回线性插值。超出数据范围时保持端点波动率不变。
+    """
+
+    def __init__(self, k, iv, weights=None):
+        order = np.argsort(k)
+        k = np.asarray(k, dtype=float)[order]
+        iv = np.asarray(iv, dtype=float)[order]
+        weights = np.ones_like(iv) if weights is None else np.asarray(weights, dtype=float)[order]
+
+        # 合并重复的价值度
+        k, first = np.unique(k, return_index=True)
+        iv = np.add.reduceat(iv * weights, first) / np.add.reduceat(weights, first)
+        weights = np.add.reduceat(weights, first)
+
+        self.k = k
+        self.iv = iv
+        self._spline = None
+        if len(k) >= 5:
+            from scipy.interpolate import UnivariateSpline
+
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                # s=n：加权残差平方和约等于点数，即拟合误差与报价误差相当
+                self._spline = UnivariateSpline(k, iv, w=weights, k=3, s=len(k), ext='const')
+
+    def __call__(self, k):
+        k = np.asarray(k, dtype=float)
+        if self._spline is not None:
+            values = self._spline(np.clip(k, self.k[0], self.k[-1]))
+        else:
+            values = np.interp(k, self.k, self.iv)
+        return np.clip(values, IV_LOWER, IV_UPPER)
+
+
+class VolSurface:
+    """
+    隐含波动率曲面
+
+    由各到期日的微笑组成。同一行权价在两个到期日之间按总方差 σ²t 线性插值，
+    早于最近到期日或晚于最远到期日时使用最近的微笑。
+
+    参数:
+        smiles (dict): {剩余天数: Smile}
+        spot (float): 拟合时的现货价格
+        r (float): 无风险利率
+    """
+
+    def __init__(self, smiles, spot, r=0.01):
+        self.days = np.array(sorted(smiles), dtype=float)
+        self.smiles = [smiles[d] for d in sorted(smiles)]
+        self.spot = float(spot)
+        self.r = r
+
+    @property
+    def empty(self):
+        return len(self.smiles) == 0
+
+    @classmethod
+    def fit(cls, option_chain, spot, r=0.01):
+        """
+        从期权链拟合曲面
+
+        用买卖中间价批量反解隐含波动率，只使用虚值合约（远期价格以上取看涨、
+        以下取看跌），按 1/报价误差 加权拟合各到期日的微笑。
+
+        参数:
+            option_chain (pd.DataFrame): 标准化期权链，需包含
+                type/strike/bid/ask/days_to_expire 列
+            spot (float): 现货价格
+        """
+        if option_chain is None or option_chain.empty or not spot:
+            return cls({}, spot or 0, r)
+
+        bid = np.asarray(option_chain['bid'], dtype=float)
+        ask = np.asarray(option_chain['ask'], dtype=float)
+        strike = np.asarray(option_chain['strike'], dtype=float)
+        days = np.asarray(option_chain['days_to_expire'], dtype=float)
+        option_type = np.asarray(option_chain['type']).astype(str)
+        is_call = option_type == 'call'
+
+        quoted = (bid > 0) & (ask >= bid)
+        mid = np.where(quoted, 0.5 * (bid + ask), np.nan)
+        iv = implied_volatility(mid, spot, strike, days, option_type, r)
+
+        t = _year_fraction(days)
+        forward = spot * np.exp(r * t)
+        out_of_money = np.where(is_call, strike >= forward, strike < forward)
+        usable = np.isfinite(iv) & out_of_money
+
+        # 报价误差：半个买卖价差对应的波动率变化
+        vega = _bs_vega(spot, strike, t, np.where(usable, iv, 1.0), r)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iv_error = np.maximum(0.5 * (ask - bid) / vega, 0.002)
+        weights = 1 / iv_error
+        k = np.log(strike / forward)
+
+        smiles = {}
+        for d in np.unique(days[usable]):
+            mask = usable & (days == d)
+            smiles[float(d)] = Smile(k[mask], iv[mask], weights[mask])
+        return cls(smiles, spot, r)
+
+    def iv(self, strike, days):
+        """任意行权价和剩余天数上的隐含波动率，支持数组广播"""
+        strike, days = np.broadcast_arrays(np.asarray(strike, dtype=float), np.asarray(days, dtype=float))
+        shape = strike.shape
+        if self.empty:
+            return np.full(shape, np.nan)
+        strike, days = strike.ravel(), days.ravel()
+
+        t = _year_fraction(days)
+        # 每个微笑在自身到期日的远期价格下计算价值度
+        expiry_t = _year_fraction(self.days)
+        values = np.stack([
+            smile(np.log(strike / (self.spot * np.exp(self.r * te))))
+            for smile, te in zip(self.smiles, expiry_t)
+        ])
+
+        upper = np.clip(np.searchsorted(self.days, days), 0, len(self.days) - 1)
+        lower = np.clip(upper - 1, 0, len(self.days) - 1)
+        columns = np.arange(strike.size)
+        iv_lower = values[lower, columns]
+        iv_upper = values[upper, columns]
+
+        t_lower, t_upper = expiry_t[lower], expiry_t[upper]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            weight = np.clip((t - t_lower) / (t_upper - t_lower), 0, 1)
+            variance = (1 - weight) * iv_lower ** 2 * t_lower + weight * iv_upper ** 2 * t_upper
+            interpolated = np.sqrt(variance / t)
+        # 超出到期日范围时使用最近的微笑（保持波动率而非总方差不变）
+        result = np.where(
+            days <= self.days[0], values[0, columns],
+            np.where(days >= self.days[-1], values[-1, columns], interpolated)
+        )
+        return result.reshape(shape)
+
+    def fill(self, option_chain, min_iv=1e-3):
+        """
+        返回补全隐含波动率的期权链副本
+
+        报价的 impliedVolatility 缺失、为0或低于 min_iv 时替换为曲面上的值。
+        """
+        if self.empty or option_chain.empty:
+            return option_chain
+        quoted = np.asarray(pd.to_numeric(option_chain['impliedVolatility'], errors='coerce'), dtype=float)
+        missing = ~(quoted >= min_iv)
+        if not missing.any():
+            return option_chain
+        surface_iv = self.iv(option_chain['strike'], option_chain['days_to_expire'])
+        filled = np.where(missing & np.isfinite(surface_iv), surface_iv, quoted)
+        return option_chain.assign(impliedVolatility=filled)
@@ -0,0 +1,66 @@
+from datetime import date, datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+
+def _parse_time(value):
+    hours, minutes = str(value).split(':')
+    return dtime(int(hours), int(minutes))
+
+
+class MarketHours:
+    """
+    交易时段判断（默认美股常规交易时段，周一至周五 09:30-16:00 纽约时间）
+
+    参数:
+        timezone (str): 交易所时区
+        open, close (str): 开盘、收盘时间 "HH:MM"
+        holidays (list): 休市日期 "YYYY-MM-DD"
+    """
+
+    def __init__(self, timezone='America/New_York', open='09:30', close='16:00', holidays=()):
+        self.tz = ZoneInfo(timezone)
+        self.open = _parse_time(open)
+        self.close = _parse_time(close)
+        self.holidays = {date.fromisoformat(str(d)) for d in holidays or ()}
+
+    @classmethod
+    def from_config(cls, config):
+        config = config or {}
+        return cls(
+            timezone=config.get('timezone', 'America/New_York'),
+            open=config.get('open', '09:30'),
+            close=config.get('close', '16:00'),
+            holidays=config.get('holidays') or ()
+        )
+
+    def _local(self, now):
+        if now is None:
+            return datetime.now(self.tz)
+        if now.tzinfo is None:
+            # 无时区的时间视为本机时间
+            now = now.astimezone()
+        return now.astimezone(self.tz)
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def is_open(self, now=None):
+        """当前是否处于交易时段"""
+        local = self._local(now)
+        return self.is_trading_day(local.date()) and self.open <= local.time() < self.close
+
+    def next_open(self, now=None):
+        """下一次开盘时间（交易所时区），已开盘时返回当前时间"""
+        local = self._local(now)
+        if self.is_open(local):
+            return local
+        day = local.date()
+        if local.time() >= self.open:
+            day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, self.open, tzinfo=self.tz)
+
+    def seconds_until_open(self, now=None):
+        local = self._local(now)
+        return max(0.0, (self.next_open(local) - local).total_seconds())
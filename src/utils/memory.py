@@ -0,0 +1,147 @@
+import gc
+import os
+import sys
+import logging
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+_MIB = 1024 * 1024
+
+
+def rss_bytes():
+    """当前进程的常驻内存（字节），无法读取时返回 None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # 非Linux平台只能取得峰值常驻内存（macOS 单位为字节，其余为KiB）
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def trim_heap():
+    """把空闲的堆内存归还操作系统（glibc），其他平台无操作"""
+    try:
+        import ctypes
+        return bool(ctypes.CDLL('libc.so.6').malloc_trim(0))
+    except (OSError, AttributeError):
+        return False
+
+
+class MemoryMonitor:
+    """
+    守护进程内存报告与软上限
+
+    每 report_every 个扫描周期记录一次RSS；开启 tracemalloc 时同时列出与上次报告相比
+    增长最多的分配位置，用于定位长期运行中的内存增长。
+    RSS 超过 soft_limit_mb 时依次调用已注册的释放回调（清空缓存等），执行完整垃圾回收并把
+    空闲堆内存归还操作系统；
+    释放后仍超过上限时 check 返回 False，由调用方决定是否退出重启。
+
+    参数:
+        report_every (int): 报告间隔（周期数），0 表示不报告
+        top (int): 报告中列出的分配位置数
+        trace (bool): 是否开启 tracemalloc（有额外开销）
+        frames (int): tracemalloc 保存的调用栈深度
+        soft_limit_mb (float): RSS 软上限（MiB），0 表示不限
+    """
+
+    def __init__(self, report_every=0, top=10, trace=False, frames=1, soft_limit_mb=0, rss=rss_bytes):
+        self.report_every = int(report_every)
+        self.top = int(top)
+        self.trace = bool(trace)
+        self.frames = int(frames)
+        self.soft_limit = float(soft_limit_mb or 0) * _MIB
+        self._rss = rss
+        self._releasers = []
+        self._snapshot = None
+        self._cycles = 0
+
+    @classmethod
+    def from_config(cls, config):
+        config = config or {}
+        return cls(
+            report_every=int(config.get('report_every', 0)),
+            top=int(config.get('top', 10)),
+            trace=bool(config.get('tracemalloc', False)),
+            frames=int(config.get('frames', 1)),
+            soft_limit_mb=float(config.get('soft_limit_mb', 0))
+        )
+
+    @property
+    def enabled(self):
+        return bool(self.report_every or self.soft_limit)
+
+    def start(self):
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+
+    def stop(self):
+        if self.trace and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._snapshot = None
+
+    def add_releaser(self, release):
+        """注册超过软上限时调用的释放回调（无参）"""
+        self._releasers.append(release)
+
+    def report(self):
+        """记录RSS和增长最多的分配位置，返回报告内容"""
+        rss = self._rss()
+        report = {'rss_mib': None if rss is None else round(rss / _MIB, 1), 'top': []}
+        if self.trace and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            ))
+            if self._snapshot is None:
+                stats = snapshot.statistics('lineno')
+            else:
+                stats = snapshot.compare_to(self._snapshot, 'lineno')
+            self._snapshot = snapshot
+            report['traced_mib'] = round(tracemalloc.get_traced_memory()[0] / _MIB, 1)
+            report['top'] = [str(stat) for stat in stats[:self.top]]
+        logger.info("内存: RSS %s MiB%s", report['rss_mib'],
+                    f"，跟踪 {report['traced_mib']} MiB" if 'traced_mib' in report else '')
+        for line in report['top']:
+            logger.info("  %s", line)
+        return report
+
+    def check(self):
+        """
+        检查软上限，超过时释放缓存后再次检查
+
+        返回:
+            bool: 未超过上限（或释放后已回到上限以下）
+        """
+        if not self.soft_limit:
+            return True
+        rss = self._rss()
+        if rss is None or rss <= self.soft_limit:
+            return True
+        logger.warning("RSS %.1f MiB 超过软上限 %.1f MiB，释放缓存", rss / _MIB, self.soft_limit / _MIB)
+        for release in self._releasers:
+            try:
+                release()
+            except Exception as e:
+                logger.error(f"释放缓存失败: {str(e)}", exc_info=True)
+        gc.collect()
+        trim_heap()
+        rss = self._rss()
+        if rss is not None and rss > self.soft_limit:
+            logger.error("释放缓存后 RSS %.1f MiB 仍超过软上限", rss / _MIB)
+            return False
+        return True
+
+    def on_cycle(self):
+        """每个扫描周期结束时调用：按间隔输出报告并检查软上限，返回 check 的结果"""
+        self._cycles += 1
+        if self.report_every and self._cycles % self.report_every == 0:
+            self.report()
+        return self.check()
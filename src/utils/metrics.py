@@ -0,0 +1,126 @@
+import io
+import json
+import os
+import cProfile
+import pstats
+import time
+import threading
+import logging
+import functools
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class Metrics:
+    """
+    扫描周期指标收集器
+
+    记录各阶段耗时（次数/总耗时/最大耗时）和计数器（网络请求、缓存命中等），
+    线程安全；每个周期结束时通过 reset() 取出本周期的快照并清零。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._counters = {}
+        self._started = time.time()
+
+    @contextmanager
+    def timer(self, stage):
+        """统计代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            stats = self._timings.setdefault(stage, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def merge(self, snap):
+        """合并另一个收集器的快照（如计算子进程中记录的耗时和计数）"""
+        with self._lock:
+            for stage, stats in snap.get('timings', {}).items():
+                current = self._timings.setdefault(stage, [0, 0.0, 0.0])
+                current[0] += stats['count']
+                current[1] += stats['total']
+                current[2] = max(current[2], stats['max'])
+            for name, value in snap.get('counters', {}).items():
+                self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        """当前指标的只读副本"""
+        with self._lock:
+            return {
+                'started': self._started,
+                'elapsed': time.time() - self._started,
+                'timings': {
+                    stage: {'count': c, 'total': round(t, 6), 'max': round(m, 6)}
+                    for stage, (c, t, m) in self._timings.items()
+                },
+                'counters': dict(self._counters),
+            }
+
+    def reset(self):
+        """取出当前快照并清零，用于按周期统计"""
+        snap = self.snapshot()
+        with self._lock:
+            self._timings = {}
+            self._counters = {}
+            self._started = time.time()
+        return snap
+
+
+def summary_line(snap, top=8):
+    """生成单行摘要：总耗时、计数器及耗时最多的阶段"""
+    timings = sorted(snap['timings'].items(), key=lambda item: item[1]['total'], reverse=True)
+    stages = ' '.join(f"{stage}={stats['total']:.3f}s/{stats['count']}" for stage, stats in timings[:top])
+    counters = ' '.join(f"{name}={value}" for name, value in sorted(snap['counters'].items()))
+    return f"周期耗时 {snap['elapsed']:.2f}s | {counters} | {stages}"
+
+
+def write_metrics(snap, path):
+    """以JSON格式原子写入指标文件"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snap, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def timed(stage):
+    """函数耗时统计装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# 进程内共享的指标收集器
+metrics = Metrics()
+
+
+def profile_call(func, path, *args, **kwargs):
+    """使用cProfile执行一次函数调用，统计结果保存到 path 并记录耗时最多的函数"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(20)
+        logger.info(f"性能分析结果已保存到 {path}\n{stream.getvalue()}")
@@ -1,19 +1,163 @@
 import numpy as np
 
-def monte_carlo_simulation(spot, mu, sigma, days, n_sims=10000):
-    """蒙特卡洛价格路径模拟"""
-    dt = 1/252
-    paths = np.zeros((n_sims, days))
-    paths[:,0] = spot
-    
-    for t in range(1, days):
-        rand = np.random.normal(size=n_sims)
-        paths[:,t] = paths[:,t-1] * np.exp((mu - 0.5*sigma**2)*dt + 
-                      sigma*np.sqrt(dt)*rand)
-    
+DT = 1/252
+
+def monte_carlo_simulation(spot, mu, sigma, days, n_sims=10000, seed=None, antithetic=False):
+    """
+    蒙特卡洛价格路径模拟
+
+    对数收益一次性生成后按时间累加，不再逐日循环。第0列为现价，共 days 列。
+
+    参数:
+        seed (int 或 np.random.Generator): 随机种子或生成器
+        antithetic (bool): 是否使用对偶变量
+    """
+    rng = np.random.default_rng(seed)
+    steps = max(days - 1, 0)
+    rand = _standard_normal(rng, (n_sims, steps), antithetic)
+
+    log_returns = (mu - 0.5*sigma**2)*DT + sigma*np.sqrt(DT)*rand
+    paths = np.empty((n_sims, days))
+    if days > 0:
+        paths[:, 0] = 0
+        np.cumsum(log_returns, axis=1, out=paths[:, 1:])
+        np.exp(paths, out=paths)
+        paths *= spot
     return paths
 
 def calculate_itm_probability(paths, strike):
-    """计算价内概率"""
-    final_prices = paths[:,-1]
-    return np.mean(final_prices > strike)
\ No newline at end of file
+    """计算价内概率，paths 可以是完整路径矩阵或到期价格向量"""
+    final_prices = paths[:, -1] if np.ndim(paths) == 2 else paths
+    return np.mean(final_prices > strike)
+
+def _standard_normal(rng, shape, antithetic):
+    """生成标准正态随机数，对偶模式下后一半为前一半取负"""
+    if not antithetic:
+        return rng.standard_normal(shape)
+    n = shape[0]
+    half = rng.standard_normal(((n + 1) // 2,) + tuple(shape[1:]))
+    return np.concatenate([half, -half])[:n]
+
+
+class MonteCarloEngine:
+    """
+    到期价格蒙特卡洛引擎
+
+    只模拟到期价格（几何布朗运动的终值可一步精确抽样），按块生成，
+    内存占用为 O(chunk_size)，与总模拟次数无关。多个行权价、多个价差
+    收益共享同一组模拟价格。
+
+    参数:
+        spot (float): 现价
+        mu (float): 年化漂移率
+        sigma (float): 年化波动率
+        days (int): 模拟交易日数（与 monte_carlo_simulation 一致，共 days-1 步）
+        seed (int 或 np.random.Generator): 随机种子，相同种子结果可复现
+        antithetic (bool): 是否使用对偶变量降低方差
+        chunk_size (int): 每块模拟次数
+    """
+
+    def __init__(self, spot, mu, sigma, days, seed=None, antithetic=True, chunk_size=100000):
+        self.spot = float(spot)
+        self.mu = float(mu)
+        self.sigma = float(sigma)
+        self.t = max(days - 1, 0) * DT
+        self.seed = seed
+        self.antithetic = antithetic
+        self.chunk_size = int(chunk_size)
+
+    @property
+    def expected_terminal(self):
+        """到期价格的解析期望，用作控制变量"""
+        return self.spot * np.exp(self.mu * self.t)
+
+    def terminal_chunks(self, n_sims):
+        """按块生成到期价格"""
+        rng = np.random.default_rng(self.seed)
+        drift = (self.mu - 0.5*self.sigma**2) * self.t
+        vol = self.sigma * np.sqrt(self.t)
+        remaining = int(n_sims)
+        while remaining > 0:
+            size = min(self.chunk_size, remaining)
+            z = _standard_normal(rng, (size,), self.antithetic)
+            yield self.spot * np.exp(drift + vol*z)
+            remaining -= size
+
+    def simulate_terminal(self, n_sims):
+        """返回全部到期价格（仅在需要完整样本时使用）"""
+        return np.concatenate(list(self.terminal_chunks(n_sims)))
+
+    def expectations(self, payoff, n_sims=100000, control_variate=False):
+        """
+        估计收益函数的期望
+
+        参数:
+            payoff (callable): 输入到期价格向量 (n,)，返回 (n,) 或 (n, k) 的收益
+            n_sims (int): 模拟次数
+            control_variate (bool): 是否以到期价格为控制变量修正估计
+
+        返回:
+            tuple: (期望估计, 标准误)，形状与单个样本收益一致
+        """
+        n = 0
+        sum_y = sum_yy = sum_xy = 0.0
+        sum_x = sum_xx = 0.0
+        for prices in self.terminal_chunks(n_sims):
+            y = np.asarray(payoff(prices), dtype=float)
+            x = prices.reshape((-1,) + (1,) * (y.ndim - 1))
+            n += len(prices)
+            sum_y = sum_y + y.sum(axis=0)
+            sum_yy = sum_yy + (y*y).sum(axis=0)
+            sum_x += prices.sum()
+            sum_xx += (prices*prices).sum()
+            sum_xy = sum_xy + (x*y).sum(axis=0)
+
+        mean_y = sum_y / n
+        var_y = np.maximum(sum_yy / n - mean_y**2, 0)
+        if not control_variate:
+            return mean_y, np.sqrt(var_y / n)
+
+        mean_x = sum_x / n
+        var_x = sum_xx / n - mean_x**2
+        cov_xy = sum_xy / n - mean_x*mean_y
+        beta = cov_xy / var_x if var_x > 0 else np.zeros_like(mean_y)
+        adjusted = mean_y - beta*(mean_x - self.expected_terminal)
+        var_adj = np.maximum(var_y - beta**2 * var_x, 0)
+        return adjusted, np.sqrt(var_adj / n)
+
+    def prob_above(self, strikes, n_sims=100000):
+        """同一组模拟价格下到期高于各行权价的概率"""
+        strikes = np.atleast_1d(np.asarray(strikes, dtype=float))
+        prob, _ = self.expectations(lambda s: s[:, None] > strikes, n_sims)
+        return prob
+
+    def vertical_spread(self, long_strike, short_strike, debit=0.0, option_type='call',
+                        n_sims=100000, control_variate=True):
+        """
+        估计买方垂直价差的期望收益和获利概率
+
+        参数:
+            long_strike (float): 买入腿行权价
+            short_strike (float): 卖出腿行权价
+            debit (float): 建仓成本
+            option_type (str): 'call' 或 'put'
+
+        返回:
+            dict: expected_payoff（未贴现，已扣除成本）/ stderr / probability（百分比）
+        """
+        sign = 1 if option_type == 'call' else -1
+
+        def payoff(prices):
+            long_leg = np.maximum(sign*(prices - long_strike), 0)
+            short_leg = np.maximum(sign*(prices - short_strike), 0)
+            value = long_leg - short_leg - debit
+            return np.column_stack([value, value > 0])
+
+        (expected, probability), (stderr, _) = self.expectations(
+            payoff, n_sims, control_variate=control_variate
+        )
+        return {
+            'expected_payoff': float(expected),
+            'stderr': float(stderr),
+            'probability': float(np.clip(probability, 0, 1)) * 100
+        }
@@ -0,0 +1,320 @@
+import numpy as np
+import pandas as pd
+
+# 期权类型编码：0=看涨 1=看跌，同一到期日内看涨期权在前
+OPTION_TYPES = ('call', 'put')
+_TYPE_NAMES = np.array(OPTION_TYPES)
+_TYPE_CODES = {'calls': 0, 'call': 0, 'puts': 1, 'put': 1}
+
+# 价格与隐含波动率保存为 float64，成交量与持仓量为整数计数，float32 足够精确
+_PRICE_COLUMNS = ('strike', 'bid', 'ask', 'mid', 'lastPrice', 'impliedVolatility')
+_COUNT_COLUMNS = ('volume', 'openInterest')
+
+# 与原标准化 DataFrame 相同的列顺序
+COLUMNS = ['strike', 'bid', 'ask', 'mid', 'lastPrice', 'volume', 'openInterest',
+           'impliedVolatility', 'type', 'expiration', 'days_to_expire']
+
+
+def _numeric(values, dtype):
+    """转换为数值数组，无法解析的值和缺失值为0"""
+    values = np.asarray(values)
+    if values.dtype.kind not in 'fiub':
+        values = pd.to_numeric(values, errors='coerce')
+    values = np.asarray(values, dtype=dtype)
+    return np.where(np.isnan(values), 0, values).astype(dtype, copy=False)
+
+
+def _mid(bid, ask, last_price):
+    """中间价：买卖报价有效时取均值，否则退回最新成交价"""
+    return np.where((bid > 0) & (ask >= bid), 0.5 * (bid + ask), last_price)
+
+
+class OptionChain:
+    """
+    列式期权链
+
+    每个数值字段是一个连续数组（价格与隐含波动率为 float64，成交量与持仓量为 float32），
+    期权类型和到期日保存为小整数编码：type_code 为 0/1（看涨/看跌），
+    expiry_code 指向按时间升序排列的 expirations，剩余天数按到期日只存一份。
+    合约按 (到期日, 类型, 行权价) 排序，同一到期日同一类型的合约连续存放且行权价升序，
+    按行权价查找合约为二分查找；按到期日或剩余天数范围取子集是连续切片，不复制数据。
+
+    to_frame() 返回与原标准化 DataFrame 列相同的 pandas 视图（首次调用时生成并缓存），
+    供仍按 DataFrame 处理的调用方使用。
+    """
+
+    __slots__ = ('data', 'type_code', 'expiry_code', 'expirations', 'days', 'bounds', '_frame')
+
+    def __init__(self, data, type_code, expiry_code, expirations, days):
+        """
+        参数均为已排序的数组，一般通过 from_yahoo / from_frame 创建
+
+        参数:
+            data (dict): 数值列名 -> 数组
+            type_code (np.ndarray): int8 类型编码
+            expiry_code (np.ndarray): int16 到期日编码
+            expirations (np.ndarray): datetime64[ns]，升序
+            days (np.ndarray): 各到期日的剩余天数
+        """
+        self.data = data
+        self.type_code = type_code
+        self.expiry_code = expiry_code
+        self.expirations = expirations
+        self.days = days
+        # 分组 k = 到期日编码 * 2 + 类型编码 占据 [bounds[k], bounds[k + 1])
+        keys = expiry_code.astype(np.int64) * 2 + type_code
+        self.bounds = np.searchsorted(keys, np.arange(2 * len(expirations) + 1))
+        self._frame = None
+
+    @classmethod
+    def _build(cls, columns, type_code, expiry_code, expirations, days):
+        """按 (到期日, 类型, 行权价) 排序后创建，已有序时不复制"""
+        strike = columns['strike']
+        order = np.lexsort((strike, type_code, expiry_code))
+        if not np.array_equal(order, np.arange(len(order))):
+            columns = {name: values[order] for name, values in columns.items()}
+            type_code, expiry_code = type_code[order], expiry_code[order]
+        return cls(columns, type_code, expiry_code, expirations, days)
+
+    @classmethod
+    def empty_chain(cls):
+        columns = {name: np.empty(0, dtype=np.float64) for name in _PRICE_COLUMNS}
+        columns.update({name: np.empty(0, dtype=np.float32) for name in _COUNT_COLUMNS})
+        return cls(columns, np.empty(0, dtype=np.int8), np.empty(0, dtype=np.int16),
+                   np.empty(0, dtype='datetime64[ns]'), np.empty(0, dtype=np.int64))
+
+    @classmethod
+    def from_yahoo(cls, raw, now=None):
+        """
+        由 yahooquery 的原始期权链一次性创建
+
+        直接读取 (symbol, expiration, optionType) 多级索引的编码和各数值列，
+        不做 reset_index / xs / concat，每列只转换一次。
+
+        参数:
+            raw (pd.DataFrame): Ticker.option_chain 的返回值
+            now (pd.Timestamp): 计算剩余天数的当前时间，默认现在
+        """
+        if not isinstance(raw, pd.DataFrame) or raw.empty:
+            return cls.empty_chain()
+        if 'expiration' not in raw.index.names or 'optionType' not in raw.index.names:
+            return cls.from_frame(raw.reset_index(), now=now)
+
+        index = raw.index
+        exp_level = index.names.index('expiration')
+        type_level = index.names.index('optionType')
+
+        # 到期日编码按时间重新编号，使编码顺序即时间顺序
+        levels = pd.DatetimeIndex(pd.to_datetime(index.levels[exp_level]))
+        if levels.tz is not None:
+            levels = levels.tz_localize(None)
+        order = np.argsort(levels.values)
+        remap = np.empty(len(order), dtype=np.int16)
+        remap[order] = np.arange(len(order))
+        expirations = levels.values[order].astype('datetime64[ns]')
+        expiry_code = remap[index.codes[exp_level]]
+
+        type_table = np.array([_TYPE_CODES.get(str(v), 1) for v in index.levels[type_level]], dtype=np.int8)
+        type_code = type_table[index.codes[type_level]]
+
+        columns = {}
+        for name in _PRICE_COLUMNS + _COUNT_COLUMNS:
+            dtype = np.float32 if name in _COUNT_COLUMNS else np.float64
+            if name == 'mid':
+                continue
+            if name in raw.columns:
+                columns[name] = _numeric(raw[name].to_numpy(), dtype)
+            else:
+                columns[name] = np.zeros(len(raw), dtype=dtype)
+        columns['mid'] = _mid(columns['bid'], columns['ask'], columns['lastPrice'])
+
+        now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+        days = (pd.DatetimeIndex(expirations) - now).days.to_numpy(dtype=np.int64)
+        return cls._build(columns, type_code, expiry_code, expirations, days)
+
+    @classmethod
+    def from_frame(cls, df, now=None):
+        """
+        由标准化期权链 DataFrame 创建（录制的快照、旧接口返回的数据）
+
+        优先使用 DataFrame 中的 days_to_expire，缺失时按 now 计算；
+        多级索引中的 expiration/type/strike 作为普通列读取。
+        """
+        if isinstance(df, OptionChain):
+            return df
+        if df is None or df.empty:
+            return cls.empty_chain()
+        if any(name in ('expiration', 'type', 'strike') for name in df.index.names):
+            df = df.reset_index()
+
+        if 'optionType' in df.columns and 'type' not in df.columns:
+            option_type = df['optionType']
+        else:
+            option_type = df['type']
+        type_code = np.fromiter((_TYPE_CODES.get(str(v), 1) for v in option_type),
+                                dtype=np.int8, count=len(df))
+
+        codes, levels = pd.factorize(pd.to_datetime(df['expiration']), sort=True)
+        expirations = pd.DatetimeIndex(levels)
+        if expirations.tz is not None:
+            expirations = expirations.tz_localize(None)
+        expiry_code = codes.astype(np.int16)
+
+        if 'days_to_expire' in df.columns:
+            days = np.zeros(len(expirations), dtype=np.int64)
+            days[expiry_code] = df['days_to_expire'].to_numpy(dtype=np.int64)
+        else:
+            now = pd.Timestamp.now() if now is None else pd.Timestamp(now)
+            days = (expirations - now).days.to_numpy(dtype=np.int64)
+
+        columns = {}
+        for name in _PRICE_COLUMNS + _COUNT_COLUMNS:
+            dtype = np.float32 if name in _COUNT_COLUMNS else np.float64
+            if name in df.columns:
+                columns[name] = _numeric(df[name].to_numpy(), dtype)
+            elif name != 'mid':
+                columns[name] = np.zeros(len(df), dtype=dtype)
+        if 'mid' not in columns:
+            columns['mid'] = _mid(columns['bid'], columns['ask'], columns['lastPrice'])
+        return cls._build(columns, type_code, expiry_code,
+                          expirations.values.astype('datetime64[ns]'), days)
+
+    def __len__(self):
+        return len(self.type_code)
+
+    def __repr__(self):
+        return f"OptionChain(contracts={len(self)}, expirations={len(self.expiration_dates)})"
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def columns(self):
+        return COLUMNS
+
+    @property
+    def expiration_dates(self):
+        """链中实际存在合约的到期日（升序）"""
+        present = np.flatnonzero(np.diff(self.bounds[::2]) > 0)
+        return pd.DatetimeIndex(self.expirations[present])
+
+    def column(self, name):
+        """单列数组；type 为定长字符串数组，expiration/days_to_expire 由到期日编码展开"""
+        if name in self.data:
+            return self.data[name]
+        if name == 'type':
+            return _TYPE_NAMES[self.type_code]
+        if name == 'expiration':
+            return self.expirations[self.expiry_code]
+        if name == 'days_to_expire':
+            return self.days[self.expiry_code]
+        raise KeyError(name)
+
+    def __getitem__(self, key):
+        """字符串取列（返回数组），布尔掩码或升序位置取子集"""
+        if isinstance(key, str):
+            return self.column(key)
+        return self.take(key)
+
+    def __contains__(self, name):
+        return name in COLUMNS
+
+    def get(self, name, default=None):
+        return self.column(name) if name in COLUMNS else default
+
+    def _slice(self, start, stop):
+        """连续行的子集，数组为原数组的视图"""
+        if start == 0 and stop == len(self):
+            return self
+        return OptionChain(
+            {name: values[start:stop] for name, values in self.data.items()},
+            self.type_code[start:stop], self.expiry_code[start:stop], self.expirations, self.days
+        )
+
+    def take(self, indexer):
+        """
+        按布尔掩码或升序位置取子集
+
+        保持原有顺序时排序不变量仍然成立；乱序的位置数组会破坏分组，不应传入。
+        """
+        indexer = np.asarray(indexer)
+        if indexer.dtype == bool and indexer.all():
+            return self
+        return OptionChain(
+            {name: values[indexer] for name, values in self.data.items()},
+            self.type_code[indexer], self.expiry_code[indexer], self.expirations, self.days
+        )
+
+    def assign(self, **columns):
+        """替换数值列，返回新的期权链（其余数组共享）"""
+        data = dict(self.data)
+        for name, values in columns.items():
+            if name not in data:
+                raise KeyError(f"不支持赋值的列: {name}")
+            data[name] = np.asarray(values, dtype=data[name].dtype)
+        return OptionChain(data, self.type_code, self.expiry_code, self.expirations, self.days)
+
+    def _expiry_code(self, expiration):
+        """到期日对应的编码，不存在时返回 None；None 表示最近的到期日"""
+        if expiration is None:
+            return int(self.expiry_code[0]) if len(self) else None
+        target = np.datetime64(pd.Timestamp(expiration).tz_localize(None), 'ns')
+        code = int(np.searchsorted(self.expirations, target))
+        if code < len(self.expirations) and self.expirations[code] == target:
+            return code
+        return None
+
+    def select_expiration(self, expiration=None):
+        """单个到期日的期权链（默认最近的到期日），不存在时返回空链"""
+        code = self._expiry_code(expiration)
+        if code is None:
+            return OptionChain.empty_chain()
+        return self._slice(int(self.bounds[2 * code]), int(self.bounds[2 * code + 2]))
+
+    def between_days(self, min_dte=None, max_dte=None):
+        """剩余天数在 [min_dte, max_dte] 内的到期日，到期日有序因此为连续切片"""
+        if min_dte is None and max_dte is None:
+            return self
+        # 剩余天数随到期日编码单调不减
+        first = 0 if min_dte is None else int(np.searchsorted(self.days, min_dte, side='left'))
+        last = len(self.days) if max_dte is None else int(np.searchsorted(self.days, max_dte, side='right'))
+        if first >= last:
+            return OptionChain.empty_chain()
+        return self._slice(int(self.bounds[2 * first]), int(self.bounds[2 * last]))
+
+    def group(self, option_type, expiration=None):
+        """某到期日某类型合约的 [start, end)，行权价在此区间内升序"""
+        code = self._expiry_code(expiration)
+        if code is None:
+            return 0, 0
+        k = 2 * code + _TYPE_CODES[option_type]
+        return int(self.bounds[k]), int(self.bounds[k + 1])
+
+    def find(self, strike, option_type, expiration=None):
+        """二分查找行权价等于 strike 的合约位置，不存在时返回 -1"""
+        start, end = self.group(option_type, expiration)
+        strikes = self.data['strike']
+        i = start + int(np.searchsorted(strikes[start:end], strike))
+        return i if i < end and strikes[i] == strike else -1
+
+    def row(self, i):
+        """单个合约的全部字段"""
+        contract = {name: values[i].item() for name, values in self.data.items()}
+        code = self.expiry_code[i]
+        contract['type'] = OPTION_TYPES[self.type_code[i]]
+        contract['expiration'] = pd.Timestamp(self.expirations[code])
+        contract['days_to_expire'] = int(self.days[code])
+        return contract
+
+    def contract(self, strike, option_type, expiration=None):
+        """按行权价和类型查找合约，返回字段字典，不存在时返回 None"""
+        i = self.find(strike, option_type, expiration)
+        return self.row(i) if i >= 0 else None
+
+    def to_frame(self):
+        """与原标准化期权链相同列的 DataFrame（缓存，调用方不应修改）"""
+        if self._frame is None:
+            frame = pd.DataFrame({name: self.column(name) for name in COLUMNS}, columns=COLUMNS)
+            self._frame = frame
+        return self._frame
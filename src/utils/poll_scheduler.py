@@ -0,0 +1,170 @@
+import time
+import heapq
+import threading
+import numpy as np
+
+
+class PollScheduler:
+    """
+    按标的自适应轮询的优先级调度器
+
+    每个标的在最小堆中保存下一次到期时间，到期的标的由 pop_due 取出扫描，
+    扫描完成后 reschedule 按最近的观测重新计算间隔：
+      - 波动率：相对观察列表波动率中位数越高，间隔越短（0.5x-2x）；
+      - 信号接近度（0-1）：上次分析产生过信号的标的间隔减半；
+      - 获取耗时：超过 target_latency 时按比例延长，避免慢标的堆积。
+    全局请求预算用令牌桶实现：每分钟最多 requests_per_minute 个请求，桶容量只够
+    几个标的，请求被均匀摊开而不是整个观察列表同时发出。
+
+    参数:
+        base_interval (float): 基准轮询间隔（秒）
+        min_interval, max_interval (float): 间隔上下限（秒）
+        requests_per_minute (float): 全局请求预算
+        requests_per_ticker (float): 每次扫描一个标的消耗的请求数
+        burst (float): 令牌桶容量（请求数），默认5秒的预算且不少于一个标的
+        target_latency (float): 单个标的的目标耗时（秒）
+    """
+
+    def __init__(self, base_interval=900, min_interval=60, max_interval=3600,
+                 requests_per_minute=60, requests_per_ticker=2, burst=None,
+                 target_latency=5.0, clock=time.monotonic):
+        self.base_interval = float(base_interval)
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max(max_interval, min_interval))
+        self.rate = float(requests_per_minute) / 60
+        self.cost = float(requests_per_ticker)
+        self.burst = float(burst) if burst else max(self.cost, self.rate * 5)
+        self.target_latency = float(target_latency)
+        self._clock = clock
+        self._heap = []
+        self._due = {}
+        self._sigma = {}
+        self._seq = 0
+        self._tokens = self.burst
+        self._refilled = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, polling_interval=None):
+        """
+        由 polling 配置创建，基准间隔取 strategy.polling_interval（分钟）
+
+        参数:
+            config (dict): polling 配置段
+            polling_interval (float): 基准轮询间隔（分钟）
+        """
+        config = config or {}
+        return cls(
+            base_interval=float(polling_interval or 15) * 60,
+            min_interval=float(config.get('min_interval', 60)),
+            max_interval=float(config.get('max_interval', 3600)),
+            requests_per_minute=float(config.get('requests_per_minute', 60)),
+            requests_per_ticker=float(config.get('requests_per_ticker', 2)),
+            burst=config.get('burst'),
+            target_latency=float(config.get('target_latency', 5))
+        )
+
+    def __len__(self):
+        with self._lock:
+            return len(self._due)
+
+    def _push(self, ticker, due):
+        self._due[ticker] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, ticker))
+
+    def _peek(self):
+        """堆顶的有效条目，顺带丢弃已失效的条目（已取出、已重排或已移除）"""
+        while self._heap:
+            due, _, ticker = self._heap[0]
+            if self._due.get(ticker) == due:
+                return due, ticker
+            heapq.heappop(self._heap)
+        return None
+
+    def set_tickers(self, tickers):
+        """同步观察列表：新标的立即到期，已移除的标的不再调度，正在扫描的标的不受影响"""
+        with self._lock:
+            tickers = list(dict.fromkeys(tickers))
+            wanted = set(tickers)
+            # _sigma 的键即已调度的标的（含已取出、尚未重排的）
+            for ticker in list(self._sigma):
+                if ticker not in wanted:
+                    self._due.pop(ticker, None)
+                    del self._sigma[ticker]
+            now = self._clock()
+            for ticker in tickers:
+                if ticker not in self._sigma:
+                    self._sigma[ticker] = None
+                    self._push(ticker, now)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def pop_due(self, limit=None):
+        """
+        取出已到期且请求预算允许的标的（按到期时间先后）
+
+        预算不足时到期的标的留在堆中，下次调用再取；取出的标的在 reschedule 之前不会再到期。
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            due = []
+            while limit is None or len(due) < limit:
+                top = self._peek()
+                if top is None or top[0] > now or self._tokens < self.cost:
+                    break
+                heapq.heappop(self._heap)
+                del self._due[top[1]]
+                self._tokens -= self.cost
+                due.append(top[1])
+            return due
+
+    def seconds_until_next(self):
+        """距下一个标的可以扫描的秒数（同时考虑到期时间和请求预算），无标的时为 None"""
+        with self._lock:
+            top = self._peek()
+            if top is None:
+                return None
+            now = self._clock()
+            self._refill(now)
+            wait_tokens = max(0.0, (self.cost - self._tokens) / self.rate) if self.rate > 0 else float('inf')
+            return max(0.0, top[0] - now, wait_tokens)
+
+    def interval_for(self, ticker, volatility=None, proximity=0.0, latency=None):
+        """按最近观测计算标的的轮询间隔（秒）"""
+        factor = 1.0
+        if volatility is not None and np.isfinite(volatility) and volatility > 0:
+            others = [s for s in self._sigma.values() if s]
+            reference = float(np.median(others)) if others else volatility
+            factor *= float(np.clip(reference / volatility, 0.5, 2.0))
+        factor *= 1.0 - 0.5 * float(np.clip(proximity or 0.0, 0.0, 1.0))
+        if latency is not None and self.target_latency > 0:
+            factor *= max(1.0, latency / self.target_latency)
+        return float(np.clip(self.base_interval * factor, self.min_interval, self.max_interval))
+
+    def reschedule(self, ticker, volatility=None, proximity=0.0, latency=None, min_interval=None):
+        """
+        扫描完成后重新安排标的的下一次到期时间
+
+        参数:
+            volatility (float): 最近的实现波动率
+            proximity (float): 信号接近度，0-1
+            latency (float): 本次扫描耗时（秒）
+            min_interval (float): 本次间隔的下限（如休市期间的扫描间隔）
+
+        返回:
+            float: 采用的间隔（秒），标的已不在观察列表时为 None
+        """
+        with self._lock:
+            if ticker not in self._sigma:
+                return None
+            if volatility is not None and np.isfinite(volatility) and volatility > 0:
+                self._sigma[ticker] = float(volatility)
+            interval = self.interval_for(ticker, volatility, proximity, latency)
+            if min_interval:
+                interval = max(interval, float(min_interval))
+            self._push(ticker, self._clock() + interval)
+            return interval
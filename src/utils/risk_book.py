@@ -0,0 +1,311 @@
+import threading
+import logging
+import numpy as np
+import pandas as pd
+from src.utils.greeks import GREEK_NAMES, calculate_greeks_batch
+from src.utils.iv_surface import bs_price
+
+logger = logging.getLogger(__name__)
+
+_NS_PER_DAY = 86400 * 10**9
+
+
+def position_key(signal):
+    """同一标的、策略、行权价和到期日的信号视为同一持仓"""
+    return (
+        signal['ticker'], signal.get('strategy_type'),
+        tuple(signal.get('strikes', ())), str(signal.get('expiration'))
+    )
+
+
+class RiskBook:
+    """
+    组合风险账本
+
+    所有持仓腿保存在按需扩容的定长数组中，按标的维护希腊值敞口
+    （delta/gamma/theta/vega，单位与 calculate_greeks 一致，乘以持仓数量）。
+    增删持仓或更新现价时只调整受影响的标的，总敞口为各标的之和；
+    新信号的准入检查只比较几个数，不重新定价任何持仓。
+    情景分析对全部持仓腿一次性向量化定价。
+
+    参数:
+        limits (dict): {'total': {希腊值: 绝对值上限}, 'per_underlying': {...}}
+        r (float): 无风险利率
+        capacity (int): 初始容量（持仓腿数）
+        clock (callable): 返回当前时间，用于计算剩余期限
+        ttl (float): 拟建仓位的有效秒数，期间未被同一信号刷新则移出账本；None 表示持有至到期
+    """
+
+    def __init__(self, limits=None, r=0.01, capacity=64, clock=pd.Timestamp.now, ttl=None):
+        limits = limits or {}
+        self.limits = {
+            scope: np.array([float((limits.get(scope) or {}).get(name, np.inf)) for name in GREEK_NAMES])
+            for scope in ('total', 'per_underlying')
+        }
+        self.r = r
+        self._clock = clock
+        self.ttl = ttl
+        self._lock = threading.RLock()
+
+        capacity = max(1, int(capacity))
+        self._underlying = np.zeros(capacity, dtype=np.int32)
+        self._is_call = np.zeros(capacity, dtype=bool)
+        self._strike = np.zeros(capacity)
+        self._expiration = np.zeros(capacity, dtype='int64')
+        self._iv = np.zeros(capacity)
+        self._quantity = np.zeros(capacity)
+        self._greeks = np.zeros((capacity, len(GREEK_NAMES)))
+        self._active = np.zeros(capacity, dtype=bool)
+        self._free = list(range(capacity - 1, -1, -1))
+
+        self._tickers = []
+        self._ticker_index = {}
+        self._spots = np.zeros(0)
+        self._exposure = np.zeros((0, len(GREEK_NAMES)))
+        self._total = np.zeros(len(GREEK_NAMES))
+        self._positions = {}
+        self._added = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def _grow(self):
+        old = len(self._active)
+        new = old * 2
+        for name in ('_underlying', '_is_call', '_strike', '_expiration', '_iv', '_quantity', '_active'):
+            values = getattr(self, name)
+            grown = np.zeros(new, dtype=values.dtype)
+            grown[:old] = values
+            setattr(self, name, grown)
+        greeks = np.zeros((new, len(GREEK_NAMES)))
+        greeks[:old] = self._greeks
+        self._greeks = greeks
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def _underlying_id(self, ticker):
+        if ticker not in self._ticker_index:
+            self._ticker_index[ticker] = len(self._tickers)
+            self._tickers.append(ticker)
+            self._spots = np.append(self._spots, np.nan)
+            self._exposure = np.vstack([self._exposure, np.zeros(len(GREEK_NAMES))])
+        return self._ticker_index[ticker]
+
+    def _days(self, slots, now=None, days_ahead=0):
+        now = pd.Timestamp(now if now is not None else self._clock()).value
+        return (self._expiration[slots] - now) / _NS_PER_DAY - days_ahead
+
+    def _leg_greeks(self, slots):
+        """按当前现价计算持仓腿的希腊值（已乘以数量）"""
+        if len(slots) == 0:
+            return np.zeros((0, len(GREEK_NAMES)))
+        greeks = calculate_greeks_batch(
+            option_type=np.where(self._is_call[slots], 'call', 'put'),
+            strike=self._strike[slots],
+            spot=self._spots[self._underlying[slots]],
+            t=np.maximum(1, self._days(slots)),
+            iv=self._iv[slots],
+            r=self.r
+        )
+        return np.column_stack([greeks[name] for name in GREEK_NAMES]) * self._quantity[slots, None]
+
+    def add(self, key, ticker, legs, spot, quantity=1):
+        """
+        新增或替换持仓
+
+        参数:
+            key: 持仓标识，相同标识的旧持仓会被替换
+            ticker (str): 标的
+            legs (list): 持仓腿，每条包含 type/strike/expiration/iv/quantity（正为买入）
+            spot (float): 当前现价
+            quantity (float): 持仓数量，乘到每条腿上
+
+        返回:
+            dict: 该持仓的希腊值
+        """
+        with self._lock:
+            self.remove(key)
+            u = self._underlying_id(ticker)
+            self._spots[u] = spot
+
+            slots = []
+            for leg in legs:
+                if not self._free:
+                    self._grow()
+                slot = self._free.pop()
+                self._underlying[slot] = u
+                self._is_call[slot] = str(leg['type']).lower() == 'call'
+                self._strike[slot] = leg['strike']
+                self._expiration[slot] = pd.Timestamp(leg['expiration']).value
+                self._iv[slot] = leg['iv']
+                self._quantity[slot] = leg.get('quantity', 1) * quantity
+                self._active[slot] = True
+                slots.append(slot)
+
+            slots = np.array(slots, dtype=int)
+            self._greeks[slots] = self._leg_greeks(slots)
+            position_greeks = self._greeks[slots].sum(axis=0)
+            self._exposure[u] += position_greeks
+            self._total += position_greeks
+            self._positions[key] = (u, slots)
+            self._added[key] = pd.Timestamp(self._clock()).value
+            return dict(zip(GREEK_NAMES, position_greeks.tolist()))
+
+    def remove(self, key):
+        """移除持仓，不存在时返回 False"""
+        with self._lock:
+            entry = self._positions.pop(key, None)
+            self._added.pop(key, None)
+            if entry is None:
+                return False
+            u, slots = entry
+            position_greeks = self._greeks[slots].sum(axis=0)
+            self._exposure[u] -= position_greeks
+            self._total -= position_greeks
+            self._greeks[slots] = 0
+            self._active[slots] = False
+            self._free.extend(slots.tolist())
+            return True
+
+    def update_spot(self, ticker, spot):
+        """更新标的现价，只重新计算该标的持仓腿的希腊值"""
+        with self._lock:
+            if ticker not in self._ticker_index or not spot:
+                return
+            u = self._ticker_index[ticker]
+            self._spots[u] = spot
+            slots = np.flatnonzero(self._active & (self._underlying == u))
+            self._greeks[slots] = self._leg_greeks(slots)
+            exposure = self._greeks[slots].sum(axis=0)
+            self._total += exposure - self._exposure[u]
+            self._exposure[u] = exposure
+
+    def _stale(self, now=None):
+        """超过有效期未被刷新的持仓标识"""
+        if self.ttl is None:
+            return []
+        cutoff = pd.Timestamp(now if now is not None else self._clock()).value - int(self.ttl * 10**9)
+        return [key for key, added in self._added.items() if added < cutoff]
+
+    def expire(self, now=None):
+        """移除全部腿均已到期或超过有效期未刷新的持仓，返回移除数量"""
+        with self._lock:
+            expired = set(self._stale(now))
+            expired.update(
+                key for key, (_, slots) in self._positions.items()
+                if (self._days(slots, now) < 0).all()
+            )
+            for key in expired:
+                self.remove(key)
+            return len(expired)
+
+    def exposure(self, ticker=None):
+        """某标的或全部持仓的希腊值敞口"""
+        with self._lock:
+            if ticker is None:
+                values = self._total
+            elif ticker in self._ticker_index:
+                values = self._exposure[self._ticker_index[ticker]]
+            else:
+                values = np.zeros(len(GREEK_NAMES))
+            return dict(zip(GREEK_NAMES, values.tolist()))
+
+    def exposures(self):
+        """按标的列出的敞口"""
+        with self._lock:
+            return pd.DataFrame(self._exposure.copy(), index=list(self._tickers), columns=GREEK_NAMES)
+
+    def check(self, ticker, greeks, quantity=1, key=None):
+        """
+        检查新增持仓后是否仍在组合限额内（不修改账本）
+
+        参数:
+            greeks (dict): 单位持仓的希腊值（如信号中的 greeks）
+            key: 将被替换的已有持仓标识
+
+        返回:
+            tuple: (是否通过, 超限说明列表)
+        """
+        change = np.array([greeks.get(name, 0.0) for name in GREEK_NAMES]) * quantity
+        with self._lock:
+            u = self._ticker_index.get(ticker)
+            underlying = self._exposure[u] + change if u is not None else change
+            total = self._total + change
+            if key in self._positions:
+                # 替换已有持仓时先扣除其敞口
+                replaced_u, slots = self._positions[key]
+                replaced = self._greeks[slots].sum(axis=0)
+                total = total - replaced
+                if replaced_u == u:
+                    underlying = underlying - replaced
+
+        breaches = []
+        for scope, values in (('per_underlying', underlying), ('total', total)):
+            for name, value, limit in zip(GREEK_NAMES, values, self.limits[scope]):
+                if abs(value) > limit:
+                    breaches.append(f"{scope}.{name}={value:.4f} 超过限额 {limit}")
+        return not breaches, breaches
+
+    def try_add(self, key, ticker, greeks, legs, spot, quantity=1):
+        """原子地检查限额并加入持仓，返回 (是否通过, 超限说明列表)"""
+        with self._lock:
+            # 已失效的拟建仓位不应继续占用限额，不必等到下一轮周期清理
+            for stale in self._stale():
+                self.remove(stale)
+            ok, breaches = self.check(ticker, greeks, quantity, key)
+            if ok:
+                self.add(key, ticker, legs, spot, quantity)
+            return ok, breaches
+
+    def scenario_grid(self, spot_shocks, vol_shocks, days_ahead=0, ticker=None):
+        """
+        现价 × 波动率冲击下的组合盈亏
+
+        全部持仓腿在所有情景下一次性重新定价，盈亏相对当前现价和隐含波动率下的估值。
+
+        参数:
+            spot_shocks (array-like): 现价相对变化，如 -0.1 表示下跌10%
+            vol_shocks (array-like): 隐含波动率绝对变化，如 0.05 表示上升5个点
+            days_ahead (float): 情景所处的未来天数（计入时间价值衰减）
+            ticker (str): 只计算该标的的持仓，默认全部
+
+        返回:
+            pd.DataFrame: 行为现价冲击，列为波动率冲击
+        """
+        spot_shocks = np.asarray(spot_shocks, dtype=float)
+        vol_shocks = np.asarray(vol_shocks, dtype=float)
+        with self._lock:
+            mask = self._active.copy()
+            if ticker is not None:
+                mask &= self._underlying == self._ticker_index.get(ticker, -1)
+            slots = np.flatnonzero(mask)
+            is_call = self._is_call[slots]
+            strike = self._strike[slots]
+            iv = self._iv[slots]
+            quantity = self._quantity[slots]
+            spot = self._spots[self._underlying[slots]]
+            t_now = np.maximum(1, self._days(slots)) / 365
+            t_ahead = np.maximum(1, self._days(slots, days_ahead=days_ahead)) / 365
+
+        base = np.sum(bs_price(is_call, spot, strike, t_now, iv, self.r) * quantity)
+        # 形状 (现价冲击, 波动率冲击, 持仓腿)
+        shocked_spot = spot * (1 + spot_shocks[:, None, None])
+        shocked_iv = np.maximum(iv + vol_shocks[None, :, None], 1e-4)
+        values = bs_price(is_call, shocked_spot, strike, t_ahead, shocked_iv, self.r)
+        pnl = (values * quantity).sum(axis=-1) - base
+        return pd.DataFrame(pnl, index=pd.Index(spot_shocks, name='spot_shock'),
+                            columns=pd.Index(vol_shocks, name='vol_shock'))
+
+
+_risk_book = None
+_risk_book_lock = threading.Lock()
+
+
+def get_risk_book(config=None):
+    """获取进程内共享的组合风险账本，首次创建时读取 portfolio 配置"""
+    global _risk_book
+    with _risk_book_lock:
+        if _risk_book is None:
+            settings = (config or {}).get('portfolio') or {}
+            ttl = settings.get('proposal_ttl')
+            _risk_book = RiskBook(limits=settings.get('limits'), ttl=float(ttl) if ttl else None)
+        return _risk_book
@@ -0,0 +1,157 @@
+import os
+import bisect
+import logging
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.utils.option_chain import OptionChain
+
+logger = logging.getLogger(__name__)
+
+# 录制的数据类型及其在快照缓存中的键
+RECORDED_KINDS = {
+    'bars': '5m',
+    'chain': 'all',
+    'earnings': None,
+    'iv_rank': None,
+}
+
+_TIME_FORMAT = '%Y%m%dT%H%M%S%f'
+
+
+def frame_to_arrays(df):
+    """
+    将 DataFrame 按列拆分为 NumPy 数组
+
+    索引（含多级索引）作为普通列保存；日期列保存为 int64 纳秒，
+    字符串列保存为定长 Unicode 数组，读取时无需 pickle。
+    """
+    index_names = [name for name in df.index.names if name is not None]
+    flat = df.reset_index() if index_names else df.reset_index(drop=True)
+    arrays = {
+        '__columns__': np.array([str(c) for c in flat.columns]),
+        '__index__': np.array(index_names, dtype=str),
+    }
+    for name in flat.columns:
+        series = flat[name]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if getattr(series.dt, 'tz', None) is not None:
+                series = series.dt.tz_localize(None)
+            arrays[f'dt:{name}'] = series.to_numpy(dtype='datetime64[ns]').astype('int64')
+        elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            arrays[f'num:{name}'] = series.to_numpy()
+        else:
+            arrays[f'str:{name}'] = series.astype(str).to_numpy(dtype=str)
+    return arrays
+
+
+def arrays_to_frame(arrays):
+    """frame_to_arrays 的逆操作"""
+    data = {}
+    for name in arrays['__columns__']:
+        if f'dt:{name}' in arrays:
+            data[name] = pd.to_datetime(arrays[f'dt:{name}'])
+        elif f'num:{name}' in arrays:
+            data[name] = arrays[f'num:{name}']
+        else:
+            data[name] = arrays[f'str:{name}'].astype(object)
+    df = pd.DataFrame(data, columns=list(arrays['__columns__']))
+    index_names = list(arrays['__index__'])
+    return df.set_index(index_names) if index_names else df
+
+
+def _to_frame(kind, value):
+    if kind == 'earnings':
+        return pd.DataFrame({'date': pd.to_datetime(list(value))})
+    if kind == 'iv_rank':
+        # 积累期内的 IV 排名为 None，保存为 NaN
+        return pd.DataFrame({'value': [np.nan if value is None else float(value)]})
+    if isinstance(value, OptionChain):
+        return value.to_frame()
+    return value
+
+
+def _from_frame(kind, df):
+    if kind == 'earnings':
+        return [d.to_pydatetime() for d in df['date']]
+    if kind == 'iv_rank':
+        value = float(df['value'].iloc[0])
+        return None if np.isnan(value) else value
+    return df
+
+
+class SnapshotRecorder:
+    """
+    行情快照录制器
+
+    每个快照按列压缩保存为 <root>/<标的>/<类型>/<时间戳>.npz，
+    供回放和回测离线使用。
+    """
+
+    def __init__(self, root='data/snapshots'):
+        self.root = Path(root)
+
+    def record(self, ticker, kind, value, timestamp=None):
+        """保存单个快照，返回文件路径"""
+        timestamp = pd.Timestamp(timestamp or pd.Timestamp.now())
+        directory = self.root / ticker / kind
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{timestamp.strftime(_TIME_FORMAT)}.npz"
+        tmp_path = path.with_suffix('.tmp.npz')
+        np.savez_compressed(tmp_path, **frame_to_arrays(_to_frame(kind, value)))
+        os.replace(tmp_path, path)
+        return path
+
+    def record_cached(self, ticker, cache, timestamp=None):
+        """录制快照缓存中该标的当前已有的数据（不会触发网络请求）"""
+        timestamp = pd.Timestamp(timestamp or pd.Timestamp.now())
+        recorded = []
+        for kind, key in RECORDED_KINDS.items():
+            value = cache.get(ticker, kind, key)
+            if value is None or (isinstance(value, (pd.DataFrame, OptionChain)) and value.empty):
+                continue
+            try:
+                self.record(ticker, kind, value, timestamp)
+                recorded.append(kind)
+            except Exception as e:
+                logger.error(f"录制 {ticker} {kind} 快照失败: {str(e)}", exc_info=True)
+        return recorded
+
+
+class SnapshotStore:
+    """按时间戳读取录制快照，查找不晚于指定时间的最近快照为 O(log n)"""
+
+    def __init__(self, root='data/snapshots'):
+        self.root = Path(root)
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def tickers(self):
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def timestamps(self, ticker, kind):
+        """某标的某类型的全部快照时间（升序）"""
+        with self._lock:
+            key = (ticker, kind)
+            if key not in self._index:
+                directory = self.root / ticker / kind
+                files = sorted(directory.glob('*.npz')) if directory.exists() else []
+                files = [f for f in files if not f.name.endswith('.tmp.npz')]
+                times = list(pd.to_datetime([f.stem for f in files], format=_TIME_FORMAT))
+                self._index[key] = (times, files)
+            return list(self._index[key][0])
+
+    def load(self, ticker, kind, at=None):
+        """读取不晚于 at 的最近快照，不存在时返回 None"""
+        self.timestamps(ticker, kind)
+        times, files = self._index[(ticker, kind)]
+        if not times:
+            return None
+        position = len(times) if at is None else bisect.bisect_right(times, pd.Timestamp(at))
+        if position == 0:
+            return None
+        with np.load(files[position - 1], allow_pickle=False) as arrays:
+            return _from_frame(kind, arrays_to_frame(dict(arrays)))
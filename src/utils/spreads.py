@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+from src.utils.greeks import GREEK_NAMES, calculate_greeks_batch
+
+_SPREAD_COLUMNS = [
+    'strategy_type', 'type', 'expiration', 'days_to_expire',
+    'long_strike', 'short_strike', 'debit', 'width', 'max_profit', 'max_loss',
+    'breakeven', 'probability', 'expected_value', 'return_on_risk',
+    'delta', 'gamma', 'theta', 'vega'
+]
+
+
+def prob_above(spot, strike, sigma, t, mu=0.01):
+    """
+    对数正态分布下到期价格高于行权价的概率 P(S_T > K)，支持数组广播
+
+    参数:
+        spot: 现货价格
+        strike: 行权价
+        sigma: 年化波动率
+        t: 剩余期限（年）
+        mu: 年化漂移率
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol = sigma * np.sqrt(t)
+        d2 = (np.log(spot / strike) + (mu - 0.5 * sigma ** 2) * t) / vol
+    return ndtr(d2)
+
+
+def expected_call_payoff(spot, strike, sigma, t, mu=0.01):
+    """对数正态分布下看涨期权到期收益的期望 E[(S_T - K)+]（未贴现）"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol = sigma * np.sqrt(t)
+        d1 = (np.log(spot / strike) + (mu + 0.5 * sigma ** 2) * t) / vol
+        d2 = d1 - vol
+    return spot * np.exp(mu * t) * ndtr(d1) - strike * ndtr(d2)
+
+
+def score_vertical_spreads(option_chain, spot, sigma=None, r=0.01, mu=None,
+                           max_width=None, min_probability=0):
+    """
+    对期权链中所有可行的买方垂直价差（牛市看涨/熊市看跌）一次性评分
+
+    每个到期日、每种期权类型的全部行权价两两组合通过NumPy广播同时计算，
+    价格取买卖中间价，不满足 0 < 成本 < 价差宽度 的组合被剔除。
+
+    参数:
+        option_chain (pd.DataFrame): 期权链，需包含 type/strike/bid/ask/
+            impliedVolatility/days_to_expire/expiration 列
+        spot (float): 现货价格
+        sigma (float): 统一使用的年化波动率，默认取两腿隐含波动率均值
+        r (float): 无风险利率，用于贴现和希腊字母
+        mu (float): 计算概率和期望收益时的年化漂移率，默认等于 r
+        max_width (float): 最大价差宽度
+        min_probability (float): 最低获利概率（百分比）
+
+    返回:
+        pd.DataFrame: 按期望收益从高到低排序的价差列表
+    """
+    mu = r if mu is None else mu
+    frames = []
+    group_cols = [c for c in ('expiration', 'type') if c in option_chain.columns]
+    for _, group in option_chain.groupby(group_cols, sort=False):
+        scored = _score_group(group, spot, sigma, r, mu, max_width)
+        if scored is not None:
+            frames.append(scored)
+
+    if not frames:
+        return pd.DataFrame(columns=_SPREAD_COLUMNS)
+
+    result = pd.concat(frames, ignore_index=True)
+    result = result[result['probability'] >= min_probability]
+    return result.sort_values(
+        ['expected_value', 'probability'], ascending=False
+    ).reset_index(drop=True)
+
+
+def _score_group(group, spot, sigma, r, mu, max_width):
+    """为单一到期日、单一类型的期权评分全部行权价组合"""
+    group = group.sort_values('strike')
+    strikes = group['strike'].to_numpy(dtype=float)
+    mid = ((group['bid'] + group['ask']) / 2).to_numpy(dtype=float)
+    iv = group['impliedVolatility'].to_numpy(dtype=float)
+    days = float(max(1, group['days_to_expire'].iloc[0]))
+    option_type = group['type'].iloc[0]
+    t = days / 365
+
+    if len(strikes) < 2:
+        return None
+
+    greeks = calculate_greeks_batch(option_type, strikes, spot, days, np.maximum(iv, 0.0001), r=r)
+
+    # 行 i 为较低行权价，列 j 为较高行权价
+    low, high = np.triu_indices(len(strikes), k=1)
+    width = strikes[high] - strikes[low]
+    is_call = option_type == 'call'
+    # 牛市看涨：买低卖高；熊市看跌：买高卖低
+    long_idx, short_idx = (low, high) if is_call else (high, low)
+
+    debit = mid[long_idx] - mid[short_idx]
+    pair_sigma = sigma if sigma is not None else (iv[low] + iv[high]) / 2
+    pair_sigma = np.broadcast_to(pair_sigma, width.shape)
+
+    admissible = (
+        (mid[long_idx] > 0) & (mid[short_idx] > 0) &
+        (debit > 0) & (debit < width) & (pair_sigma > 0)
+    )
+    if max_width is not None:
+        admissible &= width <= max_width
+    if not admissible.any():
+        return None
+
+    low, high = low[admissible], high[admissible]
+    long_idx, short_idx = long_idx[admissible], short_idx[admissible]
+    width, debit, pair_sigma = width[admissible], debit[admissible], pair_sigma[admissible]
+    k_low, k_high = strikes[low], strikes[high]
+
+    # 到期收益 = 两腿看涨收益之差（看跌价差用看跌-看涨平价关系换算）
+    spread_payoff = (
+        expected_call_payoff(spot, k_low, pair_sigma, t, mu) -
+        expected_call_payoff(spot, k_high, pair_sigma, t, mu)
+    )
+    if is_call:
+        breakeven = k_low + debit
+        probability = prob_above(spot, breakeven, pair_sigma, t, mu)
+    else:
+        breakeven = k_high - debit
+        probability = 1 - prob_above(spot, breakeven, pair_sigma, t, mu)
+        spread_payoff = width - spread_payoff
+    expected_value = spread_payoff * np.exp(-r * t) - debit
+
+    result = {
+        'strategy_type': 'bull_call_spread' if is_call else 'bear_put_spread',
+        'type': option_type,
+        'expiration': group['expiration'].iloc[0] if 'expiration' in group else None,
+        'days_to_expire': days,
+        'long_strike': strikes[long_idx],
+        'short_strike': strikes[short_idx],
+        'debit': debit,
+        'width': width,
+        'max_profit': width - debit,
+        'max_loss': debit,
+        'breakeven': breakeven,
+        'probability': probability * 100,
+        'expected_value': expected_value,
+        'return_on_risk': expected_value / debit,
+    }
+    for name in GREEK_NAMES:
+        result[name] = greeks[name][long_idx] - greeks[name][short_idx]
+    return pd.DataFrame(result, columns=_SPREAD_COLUMNS)
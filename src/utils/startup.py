@@ -0,0 +1,70 @@
+import re
+import sys
+import subprocess
+
+_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_imports(target, python=None):
+    """
+    在新的解释器中用 -X importtime 导入 target，返回各模块的导入耗时
+
+    参数:
+        target (str): 模块名，如 'src.cli'
+        python (str): 解释器路径，默认当前解释器
+
+    返回:
+        list: [{'module', 'self_ms', 'cumulative_ms', 'depth'}]，按导入完成顺序
+    """
+    result = subprocess.run(
+        [python or sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {target} 失败:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append({
+                'module': module,
+                'self_ms': int(self_us) / 1000,
+                'cumulative_ms': int(cumulative_us) / 1000,
+                'depth': (len(indent) - 1) // 2,
+            })
+    return rows
+
+
+def import_report(target, top=15):
+    """导入耗时报告：总耗时、耗时最多的顶层依赖和本项目模块"""
+    rows = measure_imports(target)
+    total = next((r['cumulative_ms'] for r in reversed(rows) if r['module'] == target), 0.0)
+    # 只统计第三方包的顶层模块，子模块已计入其累计耗时；标准库与解释器启动不计
+    packages = {}
+    skip = set(sys.stdlib_module_names) | {'src', 'site', 'sitecustomize'}
+    for row in rows:
+        root = row['module'].split('.')[0]
+        if root not in skip and row['module'] == root:
+            packages[root] = max(packages.get(root, 0.0), row['cumulative_ms'])
+    own = [r for r in rows if r['module'].startswith('src.') or r['module'] == 'src']
+
+    lines = [f"导入 {target} 共耗时 {total:.1f}ms", "", "第三方依赖（累计）:"]
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {name:<28}{ms:>10.1f}ms")
+    lines += ["", "项目模块（自身 / 累计）:"]
+    for row in sorted(own, key=lambda r: -r['cumulative_ms'])[:top]:
+        lines.append(f"  {row['module']:<28}{row['self_ms']:>10.1f}ms{row['cumulative_ms']:>10.1f}ms")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    targets = (argv if argv is not None else sys.argv[1:]) or ['src.cli', 'src.daemon']
+    for target in targets:
+        print(import_report(target))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,490 @@
+import logging
+import numpy as np
+import pandas as pd
+from src.utils.greeks import GREEK_NAMES, calculate_greeks_batch
+from src.utils.spreads import prob_above, expected_call_payoff
+from src.utils.metrics import metrics, timed
+
+logger = logging.getLogger(__name__)
+
+_CANDIDATE_COLUMNS = [
+    'strategy_type', 'expiration', 'days_to_expire', 'strikes', 'debit',
+    'max_profit', 'max_loss', 'lower_breakeven', 'upper_breakeven',
+    'probability', 'expected_value', 'return_on_risk',
+    'delta', 'gamma', 'theta', 'vega'
+]
+
+# 已注册的策略：名称 -> 策略类
+STRATEGIES = {}
+
+
+def register_strategy(cls):
+    """注册策略插件（类装饰器），按类属性 name 登记"""
+    if not cls.name:
+        raise ValueError(f"策略 {cls.__name__} 缺少 name")
+    STRATEGIES[cls.name] = cls
+    return cls
+
+
+class LegTable:
+    """
+    单个标的一次性计算的期权腿表
+
+    整条期权链只调用一次 calculate_greeks_batch，并计算每个合约在预测波动率下
+    的贴现期望收益；合约按 (到期日, 类型, 行权价) 排序后保存为扁平数组，
+    各策略只通过下标组合这些数组，策略数量增加时不重复定价。
+    同一到期日内的行权价两两组合和各策略的中间结果缓存在表上供其他策略复用。
+
+    参数:
+        option_chain (OptionChain | pd.DataFrame): 已补全隐含波动率并预筛选的期权链
+        spot (float): 现货价格
+        sigma (float): 预测波动率（计算概率和期望收益），默认使用各合约的隐含波动率
+        r (float): 无风险利率
+        mu (float): 年化漂移率，默认等于 r
+    """
+
+    def __init__(self, option_chain, spot, sigma=None, r=0.01, mu=None):
+        self.spot = float(spot)
+        self.sigma = sigma if sigma is not None and np.isfinite(sigma) and sigma > 0 else None
+        self.r = r
+        self.mu = r if mu is None else mu
+        self._memo = {}
+
+        if 'expiration' in option_chain.columns:
+            codes, self.expirations = pd.factorize(pd.Index(option_chain['expiration']), sort=True)
+        else:
+            codes, self.expirations = pd.factorize(pd.Index(option_chain['days_to_expire']), sort=True)
+        is_call = np.asarray(option_chain['type']) == 'call'
+        strike = np.asarray(option_chain['strike'], dtype=float)
+        order = np.lexsort((strike, ~is_call, codes))
+
+        self.exp_code = codes[order]
+        self.is_call = is_call[order]
+        self.strike = strike[order]
+        self.days = np.maximum(1, np.asarray(option_chain['days_to_expire'], dtype=float)[order])
+        self.iv = np.asarray(option_chain['impliedVolatility'], dtype=float)[order]
+        if 'mid' in option_chain.columns:
+            self.mid = np.asarray(option_chain['mid'], dtype=float)[order]
+        else:
+            self.mid = np.asarray((option_chain['bid'] + option_chain['ask']) / 2, dtype=float)[order]
+
+        greeks = calculate_greeks_batch(
+            np.where(self.is_call, 'call', 'put'), self.strike, self.spot,
+            self.days, np.maximum(self.iv, 0.0001), r=r
+        )
+        self.greeks = np.column_stack([greeks[name] for name in GREEK_NAMES])
+        self.delta = self.greeks[:, 0]
+        self.value = self._expected_value()
+
+        # 每个 (到期日, 类型) 分组在扁平数组中的 [start, end)
+        keys = self.exp_code * 2 + self.is_call
+        bounds = np.flatnonzero(np.diff(keys)) + 1
+        starts = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(keys)]])
+        self.groups = {
+            (int(self.exp_code[s]), 'call' if self.is_call[s] else 'put'): (int(s), int(e))
+            for s, e in zip(starts, ends)
+        }
+
+    def __len__(self):
+        return len(self.strike)
+
+    def _expected_value(self):
+        """按预测波动率计算的贴现期望到期收益（看跌期权由期望平价关系换算）"""
+        t = self.days / 365
+        sigma = self.sigma if self.sigma is not None else np.maximum(self.iv, 0.0001)
+        call = expected_call_payoff(self.spot, self.strike, sigma, t, self.mu)
+        put = call - self.spot * np.exp(self.mu * t) + self.strike
+        return np.where(self.is_call, call, put) * np.exp(-self.r * t)
+
+    def memo(self, key, func):
+        """缓存策略间可共享的中间结果"""
+        if key not in self._memo:
+            self._memo[key] = func()
+        return self._memo[key]
+
+    def pairs(self, option_type):
+        """同一到期日、同一类型的全部行权价组合，返回 (低行权价位置, 高行权价位置)"""
+        def build():
+            low, high = [], []
+            for (_, kind), (start, end) in self.groups.items():
+                if kind != option_type or end - start < 2:
+                    continue
+                i, j = np.triu_indices(end - start, k=1)
+                low.append(i + start)
+                high.append(j + start)
+            if not low:
+                return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+            return np.concatenate(low), np.concatenate(high)
+        return self.memo(('pairs', option_type), build)
+
+    def probability_between(self, lower, upper, legs):
+        """到期价格落在 (lower, upper) 内的概率，未指定预测波动率时取各腿隐含波动率均值"""
+        sigma = self.sigma if self.sigma is not None else self.iv[legs].mean(axis=1)
+        t = self.days[legs[:, 0]] / 365
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return prob_above(self.spot, lower, sigma, t, self.mu) - prob_above(self.spot, upper, sigma, t, self.mu)
+
+    def candidates(self, strategy_type, legs, quantity, debit, max_profit, max_loss, lower, upper):
+        """汇总候选组合的概率、期望收益和希腊值"""
+        quantity = np.asarray(quantity, dtype=float)
+        probability = self.probability_between(lower, upper, legs)
+        expected_value = (self.value[legs] * quantity).sum(axis=1) - debit
+        greeks = (self.greeks[legs] * quantity[None, :, None]).sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return_on_risk = expected_value / max_loss
+        return Candidates(strategy_type, legs, quantity, {
+            'debit': debit, 'max_profit': max_profit, 'max_loss': max_loss,
+            'lower_breakeven': lower, 'upper_breakeven': upper,
+            'probability': probability * 100, 'expected_value': expected_value,
+            'return_on_risk': return_on_risk,
+            **{name: greeks[:, k] for k, name in enumerate(GREEK_NAMES)}
+        })
+
+
+class Candidates:
+    """某个策略的全部候选组合：腿在 LegTable 中的位置、每腿数量及各项指标数组"""
+
+    def __init__(self, strategy_type, legs, quantity, values):
+        self.strategy_type = strategy_type
+        self.legs = legs
+        self.quantity = quantity
+        self.values = values
+
+    def __len__(self):
+        return len(self.legs)
+
+    def take(self, mask):
+        return Candidates(self.strategy_type, self.legs[mask], self.quantity,
+                          {name: values[mask] for name, values in self.values.items()})
+
+
+class Strategy:
+    """
+    策略插件基类
+
+    子类声明 name、premium（'debit' 买方 / 'credit' 卖方）和所需的筛选参数，
+    并在 build 中用 LegTable 的数组生成候选组合。买方策略只在IV排名不高于阈值时
+    评估，卖方策略只在不低于阈值时评估。
+
+    参数:
+        min_probability (float): 最低获利概率（百分比）
+        min_expected_value (float): 最低期望收益
+        max_width (float): 最大价差宽度
+        short_delta (tuple): 卖出腿 |Delta| 范围
+    """
+    name = None
+    premium = 'debit'
+
+    def __init__(self, min_probability=0, min_expected_value=None, max_width=None, short_delta=None):
+        self.min_probability = float(min_probability)
+        self.min_expected_value = min_expected_value
+        self.max_width = max_width
+        self.short_delta = tuple(short_delta) if short_delta is not None else None
+
+    def accepts_iv_rank(self, iv_rank, threshold):
+        if iv_rank is None or threshold is None:
+            return True
+        return iv_rank <= threshold if self.premium == 'debit' else iv_rank >= threshold
+
+    def build(self, table):
+        """返回 Candidates，子类实现"""
+        raise NotImplementedError
+
+    def evaluate(self, table):
+        """生成候选并按策略自身的概率与期望收益门槛过滤"""
+        candidates = self.build(table)
+        if candidates is None or not len(candidates):
+            return None
+        keep = candidates.values['probability'] >= self.min_probability
+        if self.min_expected_value is not None:
+            keep &= candidates.values['expected_value'] >= self.min_expected_value
+        return candidates.take(keep)
+
+
+class VerticalSpread(Strategy):
+    """
+    垂直价差：同一到期日、同一类型的两个行权价
+
+    long_low 为 True 时买入低行权价（牛市看涨借方 / 牛市看跌贷方），
+    否则买入高行权价（熊市看涨贷方 / 熊市看跌借方）。
+    """
+    option_type = 'call'
+    long_low = True
+
+    def _short_delta_mask(self, table, short):
+        if self.short_delta is None:
+            return True
+        low, high = self.short_delta
+        abs_delta = np.abs(table.delta[short])
+        return (abs_delta >= low) & (abs_delta <= high)
+
+    def build(self, table):
+        low, high = table.pairs(self.option_type)
+        if not len(low):
+            return None
+        long, short = (low, high) if self.long_low else (high, low)
+        width = table.strike[high] - table.strike[low]
+        debit = table.mid[long] - table.mid[short]
+        cost = debit if self.premium == 'debit' else -debit
+
+        admissible = (
+            (table.mid[long] > 0) & (table.mid[short] > 0) &
+            (cost > 0) & (cost < width) & self._short_delta_mask(table, short)
+        )
+        if self.max_width is not None:
+            admissible &= width <= self.max_width
+        if not admissible.any():
+            return None
+
+        long, short = long[admissible], short[admissible]
+        low, high = low[admissible], high[admissible]
+        width, debit = width[admissible], debit[admissible]
+        if self.premium == 'debit':
+            max_profit, max_loss = width - debit, debit
+        else:
+            max_profit, max_loss = -debit, width + debit
+
+        # 看涨以低行权价、看跌以高行权价为基准，看多时盈亏平衡点为下界，看空时为上界
+        reference = table.strike[low] if self.option_type == 'call' else table.strike[high]
+        if self.long_low:
+            lower, upper = reference + debit, np.full(len(debit), np.inf)
+        else:
+            lower, upper = np.zeros(len(debit)), reference - debit
+
+        return table.candidates(
+            self.name, np.column_stack([long, short]), [1, -1],
+            debit, max_profit, max_loss, lower, upper
+        )
+
+
+@register_strategy
+class BullCallSpread(VerticalSpread):
+    name = 'bull_call_spread'
+    premium = 'debit'
+    option_type = 'call'
+    long_low = True
+
+
+@register_strategy
+class BearPutSpread(VerticalSpread):
+    name = 'bear_put_spread'
+    premium = 'debit'
+    option_type = 'put'
+    long_low = False
+
+
+@register_strategy
+class BullPutSpread(VerticalSpread):
+    name = 'bull_put_spread'
+    premium = 'credit'
+    option_type = 'put'
+    long_low = True
+
+
+@register_strategy
+class BearCallSpread(VerticalSpread):
+    name = 'bear_call_spread'
+    premium = 'credit'
+    option_type = 'call'
+    long_low = False
+
+
+@register_strategy
+class IronCondor(Strategy):
+    """
+    铁鹰：同一到期日的牛市看跌贷方价差 + 熊市看涨贷方价差
+
+    两侧先按卖出腿 Delta 带分别生成贷方价差（结果缓存在 LegTable 上），
+    每个到期日每侧只取期望收益最高的 wings 个再两两组合，避免组合数爆炸。
+
+    参数:
+        wings (int): 每个到期日每侧参与组合的价差数量
+    """
+    name = 'iron_condor'
+    premium = 'credit'
+
+    def __init__(self, wings=10, **kwargs):
+        super().__init__(**kwargs)
+        self.wings = max(1, int(wings))
+
+    def _side(self, table, cls):
+        side = cls(max_width=self.max_width, short_delta=self.short_delta)
+        return table.memo(('condor_side', cls.name, self.max_width, self.short_delta),
+                          lambda: side.build(table))
+
+    def _top(self, table, side, code):
+        positions = np.flatnonzero(table.exp_code[side.legs[:, 0]] == code)
+        order = np.argsort(-side.values['expected_value'][positions], kind='stable')
+        return positions[order[:self.wings]]
+
+    def build(self, table):
+        puts = self._side(table, BullPutSpread)
+        calls = self._side(table, BearCallSpread)
+        if puts is None or calls is None:
+            return None
+
+        put_idx, call_idx = [], []
+        for code in np.intersect1d(table.exp_code[puts.legs[:, 0]], table.exp_code[calls.legs[:, 0]]):
+            p, c = np.meshgrid(self._top(table, puts, code), self._top(table, calls, code), indexing='ij')
+            put_idx.append(p.ravel())
+            call_idx.append(c.ravel())
+        if not put_idx:
+            return None
+        p, c = np.concatenate(put_idx), np.concatenate(call_idx)
+
+        # 腿顺序：买入低看跌、卖出高看跌、卖出低看涨、买入高看涨
+        put_long, put_short = puts.legs[p, 0], puts.legs[p, 1]
+        call_short, call_long = calls.legs[c, 1], calls.legs[c, 0]
+        admissible = table.strike[put_short] < table.strike[call_short]
+        if not admissible.any():
+            return None
+        p, c = p[admissible], c[admissible]
+        legs = np.column_stack([put_long, put_short, call_short, call_long])[admissible]
+
+        debit = puts.values['debit'][p] + calls.values['debit'][c]
+        credit = -debit
+        width = np.maximum(puts.values['max_loss'][p] + puts.values['max_profit'][p],
+                           calls.values['max_loss'][c] + calls.values['max_profit'][c])
+        max_loss = width - credit
+        keep = max_loss > 0
+        legs, debit, credit, max_loss = legs[keep], debit[keep], credit[keep], max_loss[keep]
+
+        lower = table.strike[legs[:, 1]] - credit
+        upper = table.strike[legs[:, 2]] + credit
+        return table.candidates(self.name, legs, [1, -1, -1, 1], debit, credit, max_loss, lower, upper)
+
+
+class StrategyEngine:
+    """
+    多策略引擎：对同一份期权链快照只构建一次 LegTable，依次评估全部已启用策略，
+    合并候选并按期望收益、获利概率排序
+
+    参数:
+        strategies (list): Strategy 实例列表
+    """
+
+    def __init__(self, strategies):
+        self.strategies = list(strategies)
+
+    @classmethod
+    def from_config(cls, settings, min_probability=None):
+        """
+        按 strategies 配置创建引擎
+
+        settings 示例: {'enabled': [...], 'min_probability': 60, 'params': {名称: {参数}}}
+        min_probability 不为 None 时覆盖所有策略的最低获利概率（如环境变量设置）。
+        """
+        settings = settings or {}
+        params = settings.get('params') or {}
+        defaults = {}
+        if settings.get('min_probability') is not None:
+            defaults['min_probability'] = settings['min_probability']
+        if settings.get('min_expected_value') is not None:
+            defaults['min_expected_value'] = settings['min_expected_value']
+        if settings.get('max_width') is not None:
+            defaults['max_width'] = settings['max_width']
+
+        strategies = []
+        for name in settings.get('enabled') or []:
+            if name not in STRATEGIES:
+                logger.warning(f"未知策略 {name}，已忽略")
+                continue
+            kwargs = {**defaults, **(params.get(name) or {})}
+            if min_probability is not None:
+                kwargs['min_probability'] = min_probability
+            strategies.append(STRATEGIES[name](**kwargs))
+        return cls(strategies)
+
+    def __bool__(self):
+        return bool(self.strategies)
+
+    @timed('signal.strategies')
+    def evaluate(self, table, iv_rank=None, iv_threshold=None):
+        """
+        评估全部策略
+
+        返回:
+            list: 各策略的 Candidates（无候选的策略不出现）
+        """
+        results = []
+        for strategy in self.strategies:
+            if not strategy.accepts_iv_rank(iv_rank, iv_threshold):
+                continue
+            candidates = strategy.evaluate(table)
+            if candidates is not None and len(candidates):
+                metrics.incr(f'candidates.{strategy.name}', len(candidates))
+                results.append(candidates)
+        return results
+
+    def rank(self, table, results, limit=None):
+        """合并全部候选并排序，返回包含 _CANDIDATE_COLUMNS 的 DataFrame"""
+        if not results:
+            return pd.DataFrame(columns=_CANDIDATE_COLUMNS)
+        frames = []
+        for k, candidates in enumerate(results):
+            frame = pd.DataFrame(candidates.values)
+            frame['strategy_type'] = candidates.strategy_type
+            frame['_result'] = k
+            frame['_row'] = np.arange(len(candidates))
+            frames.append(frame)
+        ranked = pd.concat(frames, ignore_index=True).sort_values(
+            ['expected_value', 'probability'], ascending=False
+        )
+        if limit is not None:
+            ranked = ranked.head(limit)
+
+        # 只为入选的组合还原腿信息
+        legs = [results[k].legs[row] for k, row in zip(ranked['_result'], ranked['_row'])]
+        ranked['days_to_expire'] = [table.days[leg[0]] for leg in legs]
+        ranked['expiration'] = [table.expirations[table.exp_code[leg[0]]] for leg in legs]
+        ranked['strikes'] = [tuple(sorted(table.strike[leg].tolist())) for leg in legs]
+        return ranked.reset_index(drop=True)
+
+    def signals(self, table, ticker, iv_rank=None, iv_threshold=None, limit=None):
+        """
+        评估全部策略并生成排序后的信号
+
+        返回:
+            list: 与 generate_vertical_spread_signal 结构一致的信号字典
+        """
+        results = self.evaluate(table, iv_rank, iv_threshold)
+        ranked = self.rank(table, results, limit)
+        signals = []
+        for _, row in ranked.iterrows():
+            candidates = results[row['_result']]
+            legs = candidates.legs[row['_row']]
+            signals.append({
+                'ticker': ticker,
+                'strategy_type': row['strategy_type'],
+                'strikes': row['strikes'],
+                'probability': round(float(row['probability']), 2),
+                'expected_value': round(float(row['expected_value']), 4),
+                'debit': float(row['debit']),
+                'max_profit': float(row['max_profit']),
+                'max_loss': float(row['max_loss']),
+                'entry_price': table.spot,
+                'expiration': row['expiration'],
+                'greeks': {name: float(row[name]) for name in GREEK_NAMES},
+                'legs': [
+                    {'type': 'call' if table.is_call[i] else 'put', 'strike': float(table.strike[i]),
+                     'quantity': int(q), 'expiration': row['expiration'], 'iv': float(table.iv[i])}
+                    for i, q in zip(legs, candidates.quantity)
+                ]
+            })
+        return signals
+
+
+def evaluate_chain(option_chain, spot, settings, ticker, sigma=None, iv_rank=None,
+                   iv_threshold=None, limit=None, min_probability=None):
+    """
+    在一份期权链上构建 LegTable 并运行按 settings 创建的策略引擎
+
+    只依赖参数本身，可直接调用，也可提交到计算进程池执行。
+
+    返回:
+        list: 排序后的信号
+    """
+    engine = StrategyEngine.from_config(settings, min_probability=min_probability)
+    table = LegTable(option_chain, spot, sigma=sigma)
+    return engine.signals(table, ticker, iv_rank=iv_rank, iv_threshold=iv_threshold, limit=limit)
@@ -1,14 +1,63 @@
-import yfinance as yf
 import numpy as np
-import pandas as pd
+from src.utils.history_store import get_history_store
 
-def calculate_iv_rank(ticker):
-    """计算波动率排名"""
+def calculate_iv_rank(ticker, current_iv=None, store=None):
+    """
+    计算波动率排名
+    
+    数据全部来自本地历史库。本地记录的ATM隐含波动率不少于 min_iv_observations 天时
+    返回 IV Rank（0-100）；积累期内退回当前IV在历史实现波动率中的百分位（同为0-100），
+    收盘价也不足或计算失败时返回 None，调用方视为不按IV排名过滤。
+    
+    参数:
+        ticker (str): 标的代码
+        current_iv (float): 当前ATM隐含波动率，传入时先记录到历史库
+        store (HistoryStore): 历史库，默认使用共享实例
+    """
     try:
-        data = yf.Ticker(ticker).history(period="1y")['Close']
-        returns = np.log(data / data.shift(1)).dropna()
-        hist_vol = returns.std() * np.sqrt(252)
-        return hist_vol
+        store = store or get_history_store()
+        if not current_iv:
+            return None
+        store.record_atm_iv(ticker, current_iv)
+        iv_history = store.iv_history(ticker)
+        if len(iv_history) >= store.min_iv_observations:
+            return iv_rank(iv_history, current_iv)
+        return hv_percentile(store.closes(ticker), current_iv)
     except Exception as e:
         print(f"波动率计算失败: {str(e)}")
-        return 0
\ No newline at end of file
+        return None
+
+def hv_percentile(closes, current_iv, window=20):
+    """
+    当前IV在滚动 window 日年化实现波动率历史中的百分位（0-100）
+    
+    收盘价不足以得到一个完整窗口时返回 None。
+    """
+    returns = np.log(closes / closes.shift(1)).dropna()
+    hv = returns.rolling(window).std().dropna() * np.sqrt(252)
+    if hv.empty:
+        return None
+    return iv_percentile(hv, current_iv)
+
+def iv_rank(iv_history, current_iv):
+    """IV Rank：当前IV在历史最低与最高之间所处的位置（0-100）"""
+    low, high = np.min(iv_history), np.max(iv_history)
+    if high <= low:
+        return 0
+    return float(np.clip((current_iv - low) / (high - low), 0, 1) * 100)
+
+def iv_percentile(iv_history, current_iv):
+    """IV Percentile：历史中低于当前IV的天数占比（0-100）"""
+    values = np.asarray(iv_history, dtype=float)
+    if values.size == 0:
+        return 0
+    return float(np.mean(values < current_iv) * 100)
+
+def atm_implied_volatility(option_chain, spot):
+    """取最接近平值的行权价上看涨/看跌隐含波动率的均值（OptionChain 或 DataFrame）"""
+    iv = np.asarray(option_chain['impliedVolatility'], dtype=float)
+    valid = iv > 0
+    if not valid.any() or not spot:
+        return None
+    distance = np.abs(np.asarray(option_chain['strike'], dtype=float)[valid] - spot)
+    return float(iv[valid][distance == distance.min()].mean())
@@ -0,0 +1,88 @@
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.backtest import ReplayDataLoader, replay_ticker, run_backtest
+from src.data_loader import load_config
+from src.risk_manager import RiskManager
+from src.utils.iv_surface import bs_price
+from src.utils.snapshots import SnapshotRecorder, SnapshotStore
+
+def make_bars(timestamp, spot):
+    dates = pd.date_range(end=timestamp, periods=20, freq='5min')
+    close = spot * np.exp(np.linspace(-0.01, 0, 20) + 0.002 * (-1) ** np.arange(20))
+    index = pd.MultiIndex.from_product([['NVDA'], dates], names=['symbol', 'date'])
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                         'Volume': 1000}, index=index)
+
+def make_chain(timestamp, spot):
+    expiration = pd.Timestamp(timestamp).normalize() + pd.Timedelta(days=30)
+    rows = []
+    for option_type in ('call', 'put'):
+        for strike in np.arange(spot * 0.8, spot * 1.2, spot * 0.025):
+            price = bs_price(option_type == 'call', spot, round(strike, 2), 30 / 365, 0.4, 0.01)
+            rows.append({'strike': round(strike, 2), 'bid': round(price * 0.98, 2),
+                         'ask': round(price * 1.02, 2), 'volume': 500,
+                         'impliedVolatility': 0.4, 'type': option_type,
+                         'expiration': expiration, 'days_to_expire': 30})
+    return pd.DataFrame(rows)
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        recorder = SnapshotRecorder(self.root)
+        self.times = pd.to_datetime(['2024-03-01 10:00', '2024-03-04 10:00', '2024-03-05 10:00'])
+        for timestamp, spot in zip(self.times, [100.0, 110.0, 120.0]):
+            recorder.record('NVDA', 'bars', make_bars(timestamp, spot), timestamp)
+            recorder.record('NVDA', 'chain', make_chain(timestamp, spot), timestamp)
+            recorder.record('NVDA', 'iv_rank', 10.0, timestamp)
+        recorder.record('NVDA', 'earnings', [datetime(2024, 3, 7)], self.times[0])
+        self.config = load_config()
+        
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def test_round_trip(self):
+        store = SnapshotStore(self.root)
+        chain = store.load('NVDA', 'chain', self.times[1])
+        pd.testing.assert_frame_equal(chain, make_chain(self.times[1], 110.0))
+        bars = store.load('NVDA', 'bars', self.times[1])
+        self.assertEqual(bars.index.names, ['symbol', 'date'])
+        self.assertIsNone(store.load('NVDA', 'chain', '2024-01-01'))
+        
+    def test_replay_loader_serves_snapshot_at_time(self):
+        loader = ReplayDataLoader('NVDA', SnapshotStore(self.root), self.config)
+        loader.set_time(self.times[1] + pd.Timedelta(minutes=3))
+        expected = make_bars(self.times[1], 110.0)['Close'].iloc[-1]
+        self.assertAlmostEqual(loader.get_real_time_data()['Close'].iloc[-1], expected)
+        self.assertEqual(len(loader.fetch_option_chain()), len(make_chain(self.times[1], 110.0)))
+        self.assertEqual(loader.get_earnings_dates(), [datetime(2024, 3, 7)])
+        loader.set_time(self.times[2] + pd.Timedelta(days=3))
+        self.assertEqual(loader.get_earnings_dates(), [])
+        
+    def test_same_day_earnings_block_replay(self):
+        loader = ReplayDataLoader('NVDA', SnapshotStore(self.root), self.config)
+        now = pd.Timestamp('2024-03-07 10:30')
+        loader.set_time(now)
+        self.assertEqual(loader.get_earnings_dates(), [datetime(2024, 3, 7)])
+        self.assertTrue(RiskManager(self.config['strategy']).check_event_risk(loader.get_earnings_dates(), now=now))
+        
+    def test_missing_iv_rank_is_not_a_filter(self):
+        loader = ReplayDataLoader('TSLA', SnapshotStore(self.root), self.config)
+        loader.set_time(self.times[1])
+        self.assertIsNone(loader.get_iv_rank())
+        
+    def test_backtest_skips_earnings_window(self):
+        with mock.patch.dict('os.environ', {'STRATEGY_MIN_PROBABILITY': '0'}):
+            signals = replay_ticker('NVDA', self.root, config=self.config)
+            # 同一快照可发出多个策略的信号
+            self.assertEqual(sorted({s['timestamp'] for s in signals}), [self.times[0]])
+            
+            result = run_backtest(self.root, workers=2, config=self.config)
+        self.assertEqual(result['ticker'].unique().tolist(), ['NVDA'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.utils.bar_buffer import BarBuffer, BarBuffers
+
+def make_bars(start, n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    dates = pd.date_range(start, periods=n, freq='5min')
+    return pd.DataFrame({'Open': close, 'High': close, 'Low': close, 'Close': close,
+                         'Volume': 1000.0}, index=pd.DatetimeIndex(dates, name='date'))
+
+def pandas_sigma(df):
+    log_returns = np.log(df['Close'] / df['Close'].shift(1)).dropna()
+    return log_returns.std() * np.sqrt(252)
+
+class TestBarBuffer(unittest.TestCase):
+    def test_incremental_sigma_matches_pandas(self):
+        bars = make_bars('2030-01-02 14:30', 200)
+        buffer = BarBuffer(capacity=50)
+        for i in range(0, 200, 7):
+            buffer.extend(bars.iloc[:i + 7])
+            window = bars.iloc[max(0, min(i + 7, 200) - 50):i + 7]
+            self.assertAlmostEqual(buffer.sigma, pandas_sigma(window), places=10)
+        self.assertEqual(len(buffer), 50)
+        self.assertEqual(buffer.spot, bars['Close'].iloc[-1])
+        pd.testing.assert_frame_equal(buffer.to_frame(), bars.iloc[-50:], check_freq=False)
+        
+    def test_only_new_bars_are_appended(self):
+        bars = make_bars('2030-01-02 14:30', 20)
+        buffer = BarBuffer()
+        self.assertEqual(buffer.extend(bars.iloc[:10]), 10)
+        self.assertEqual(buffer.extend(bars.iloc[5:12]), 2)
+        self.assertEqual(buffer.extend(bars.iloc[:3]), 0)
+        self.assertEqual(len(buffer), 12)
+        
+    def test_last_bar_revision(self):
+        bars = make_bars('2030-01-02 14:30', 10)
+        buffer = BarBuffer()
+        buffer.extend(bars)
+        revised = bars.iloc[-1:].copy()
+        revised['Close'] = 120.0
+        self.assertEqual(buffer.extend(revised), 0)
+        expected = pd.concat([bars.iloc[:-1], revised])
+        self.assertEqual(buffer.spot, 120.0)
+        self.assertAlmostEqual(buffer.sigma, pandas_sigma(expected), places=10)
+        
+    def test_new_session_resets(self):
+        buffer = BarBuffer()
+        buffer.extend(make_bars('2030-01-02 14:30', 30))
+        buffer.extend(make_bars('2030-01-03 14:30', 5, seed=1))
+        self.assertEqual(len(buffer), 5)
+        self.assertEqual(buffer.last_timestamp, pd.Timestamp('2030-01-03 14:50'))
+
+class TestBarBuffers(unittest.TestCase):
+    def test_history_range(self):
+        buffers = BarBuffers()
+        self.assertEqual(buffers.history_range(['A', 'B']), {'period': '1d'})
+        now = pd.Timestamp.utcnow().tz_localize(None).floor('5min')
+        buffers.get('A').extend(make_bars(now - pd.Timedelta(minutes=50), 5))
+        buffers.get('B').extend(make_bars(now - pd.Timedelta(minutes=50), 8))
+        self.assertEqual(buffers.history_range(['A', 'B']),
+                         {'start': (now - pd.Timedelta(minutes=30)).to_pydatetime()})
+        self.assertEqual(buffers.history_range(['A', 'C']), {'period': '1d'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from benchmarks.synthetic import FakeDataLoader, FakeYahoo
+from benchmarks.run import compare
+from src.data_loader import load_config, _normalize_option_chain
+
+class TestSyntheticChain(unittest.TestCase):
+    def test_chain_normalizes(self):
+        yahoo = FakeYahoo(['SYN'], n_strikes=20, n_expirations=3)
+        chain = _normalize_option_chain(yahoo.option_chain)
+        self.assertEqual(len(chain), 20 * 3 * 2)
+        self.assertEqual(set(chain['type']), {'call', 'put'})
+        self.assertTrue((chain['ask'] >= chain['bid']).all())
+        
+    def test_fake_loader_is_offline(self):
+        loader = FakeDataLoader('SYN', config=load_config())
+        self.assertFalse(loader.get_real_time_data().empty)
+        self.assertFalse(loader.fetch_option_chain().empty)
+        self.assertEqual(loader.get_earnings_dates(), [])
+
+class TestCompare(unittest.TestCase):
+    def test_flags_regressions(self):
+        baseline = {'a': {'seconds': 1.0, 'peak_kib': 100}, 'b': {'seconds': 1.0, 'peak_kib': 100}}
+        results = {'a': {'seconds': 1.2, 'peak_kib': 110}, 'b': {'seconds': 2.0, 'peak_kib': 200}}
+        regressions = compare(results, baseline, time_tolerance=0.5, memory_tolerance=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(line.startswith('b:') for line in regressions))
+        
+    def test_uses_fastest_call_and_floors(self):
+        baseline = {'a': {'seconds': 1e-3, 'min_seconds': 1e-5, 'peak_kib': 1},
+                    'scan_all': {'seconds': 1.0, 'min_seconds': 1.0, 'peak_kib': 1}}
+        # 平均耗时翻倍但最快调用不变；微秒级差值低于绝对下限；scan_all 容忍度更宽
+        results = {'a': {'seconds': 2e-3, 'min_seconds': 3e-5, 'peak_kib': 1},
+                   'scan_all': {'seconds': 1.8, 'min_seconds': 1.8, 'peak_kib': 1}}
+        self.assertEqual(compare(results, baseline), [])
+        results['scan_all']['min_seconds'] = 2.5
+        self.assertEqual(len(compare(results, baseline)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from src.utils.cache import SnapshotCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        
+    def __call__(self):
+        return self.now
+
+class TestSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SnapshotCache({'chain': 10, 'earnings': 100}, clock=self.clock)
+        self.calls = 0
+        
+    def _loader(self):
+        self.calls += 1
+        return ['snapshot']
+        
+    def test_shared_until_expired(self):
+        first = self.cache.get_or_load('QQQ', 'chain', self._loader, key='2024-01-19')
+        second = self.cache.get_or_load('QQQ', 'chain', self._loader, key='2024-01-19')
+        self.assertIs(first, second)
+        self.assertEqual(self.calls, 1)
+        
+        self.clock.now = 11
+        self.cache.get_or_load('QQQ', 'chain', self._loader, key='2024-01-19')
+        self.assertEqual(self.calls, 2)
+        
+    def test_ttl_per_kind(self):
+        self.cache.put('NVDA', 'chain', 'chain')
+        self.cache.put('NVDA', 'earnings', 'earnings')
+        self.clock.now = 50
+        self.assertIsNone(self.cache.get('NVDA', 'chain'))
+        self.assertEqual(self.cache.get('NVDA', 'earnings'), 'earnings')
+        
+    def test_empty_results_not_cached(self):
+        self.cache.get_or_load('SPY', 'bars', lambda: [], is_empty=lambda v: not v)
+        self.assertIsNone(self.cache.get('SPY', 'bars'))
+        
+    def test_invalidate(self):
+        self.cache.put('QQQ', 'chain', 1)
+        self.cache.put('SPY', 'chain', 2)
+        self.cache.invalidate('QQQ')
+        self.assertIsNone(self.cache.get('QQQ', 'chain'))
+        self.assertEqual(self.cache.get('SPY', 'chain'), 2)
+        self.cache.invalidate(kind='chain')
+        self.assertEqual(len(self.cache), 0)
+
+if __name__ == '__main__':
+    unittest.main()
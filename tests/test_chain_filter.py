@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.risk_manager import RiskManager
+from src.utils.chain_filter import prefilter_chain, filter_settings
+from src.signal_generator import SignalGenerator
+from benchmarks.synthetic import FakeDataLoader, FakeYahoo, make_raw_chain
+
+def make_chain():
+    return pd.DataFrame({
+        'type': ['call'] * 6 + ['put'],
+        'strike': [100.0, 105.0, 110.0, 150.0, 100.0, 95.0, 90.0],
+        'bid': [2.0, 1.0, 0.5, 0.01, 0.0, 3.0, 1.0],
+        'ask': [2.1, 1.05, 0.8, 0.02, 0.1, 3.1, 1.05],
+        'mid': [2.05, 1.025, 0.65, 0.015, 0.1, 3.05, 1.025],
+        'lastPrice': [2.0, 1.0, 0.6, 0.01, 0.1, 3.0, 1.0],
+        'volume': [500, 300, 400, 1000, 800, 50, 200],
+        'impliedVolatility': [0.3] * 7,
+        'days_to_expire': [10, 10, 10, 10, 10, 0, 10],
+    })
+
+class TestPrefilter(unittest.TestCase):
+    def test_rules_and_counts(self):
+        chain, pruned = prefilter_chain(
+            make_chain(), 100.0, min_volume=100, max_spread_ratio=0.1,
+            max_log_moneyness=0.3, min_abs_delta=0.05, max_abs_delta=0.95, min_dte=1
+        )
+        # 90 看跌 10 天期 |Delta| 约 0.02，被 Delta 带剔除
+        self.assertEqual(chain['strike'].tolist(), [100.0, 105.0])
+        self.assertEqual(pruned, {'dte': 1, 'quote': 0, 'volume': 0, 'spread': 3,
+                                  'moneyness': 0, 'delta': 1})
+        self.assertEqual(list(chain.index), [0, 1])
+
+    def test_moneyness_and_delta_bands(self):
+        chain, pruned = prefilter_chain(make_chain(), 100.0, max_log_moneyness=0.2,
+                                        min_abs_delta=0.25)
+        self.assertEqual(pruned['moneyness'], 1)
+        self.assertNotIn(90.0, chain['strike'].tolist())
+        self.assertNotIn(150.0, chain['strike'].tolist())
+
+    def test_unconfigured_rules_are_skipped(self):
+        chain, pruned = prefilter_chain(make_chain(), 100.0)
+        self.assertEqual(len(chain), 7)
+        self.assertEqual(sum(pruned.values()), 0)
+
+    def test_settings_from_strategy(self):
+        settings = filter_settings({'min_volume': 100, 'max_spread_ratio': 0.1,
+                                    'prefilter': {'min_dte': 1}})
+        self.assertEqual(settings['min_volume'], 100)
+        self.assertEqual(settings['min_dte'], 1)
+        self.assertIsNone(settings['max_abs_delta'])
+
+class TestExpirySelection(unittest.TestCase):
+    def test_nearest_expiry_tomorrow(self):
+        # 盘中次日到期的合约剩余天数为0：应跳到期限范围内的下一个到期日，而不是整条链被剔除
+        raw = make_raw_chain('SYN', 100.0, n_expirations=3).reset_index()
+        raw['expiration'] -= pd.Timedelta(days=8)
+        yahoo = FakeYahoo(['SYN'])
+        yahoo._chains['SYN'] = raw.set_index(['symbol', 'expiration', 'optionType'])
+        config = {'strategy': {'prefilter': {'min_dte': 1, 'max_dte': 60}}}
+        sg = SignalGenerator(FakeDataLoader('SYN', yahoo=yahoo, config=config))
+        
+        with mock.patch('pandas.Timestamp.now', return_value=pd.Timestamp.now().normalize() + pd.Timedelta(hours=10)):
+            self.assertEqual(set(sg.dl.fetch_chain()['days_to_expire']), {0})
+            chain = sg.fetch_chain()
+        self.assertEqual(set(chain['days_to_expire']), {7})
+        
+        prepared = sg._prepare()
+        self.assertIsNotNone(prepared)
+        self.assertFalse(prepared[1].empty)
+
+class TestCheckLiquidity(unittest.TestCase):
+    def setUp(self):
+        self.rm = RiskManager({'min_volume': 100, 'max_spread_ratio': 0.1})
+
+    def test_single_contract_without_last_price(self):
+        self.assertTrue(self.rm.check_liquidity({'bid': 2.0, 'ask': 2.1, 'volume': 500}))
+        self.assertFalse(self.rm.check_liquidity({'bid': 0.5, 'ask': 0.8, 'volume': 500}))
+        self.assertFalse(self.rm.check_liquidity({'bid': 0.0, 'ask': 0.0, 'volume': 500}))
+
+    def test_whole_chain(self):
+        liquid = self.rm.check_liquidity(make_chain())
+        self.assertEqual(liquid.tolist(), [True, True, False, False, False, False, True])
+
+if __name__ == '__main__':
+    unittest.main()
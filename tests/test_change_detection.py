@@ -0,0 +1,93 @@
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import pandas as pd
+from src.utils.change_detection import ChangeGate, SignalDeduplicator, chain_hash
+from src.utils.market_hours import MarketHours
+
+def make_chain(bid=1.0):
+    return pd.DataFrame({
+        'strike': [95.0, 100.0, 105.0], 'type': ['call'] * 3,
+        'bid': [bid + 5, bid, bid / 2], 'ask': [bid + 5.2, bid + 0.2, bid / 2 + 0.2],
+        'impliedVolatility': [0.3, 0.28, 0.27], 'days_to_expire': [10, 10, 10],
+    })
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestChangeGate(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.gate = ChangeGate(spot_width=0.001, quote_tick=0.01, iv_tick=0.001, max_age=600, clock=self.clock)
+
+    def test_unchanged_inputs_skip(self):
+        first = self.gate.fingerprint(100.0, make_chain(), [])
+        self.assertFalse(self.gate.unchanged('SPY', first))
+        self.gate.update('SPY', first)
+        # 现价变化不到一个区间、报价跳动不到一个最小单位
+        second = self.gate.fingerprint(100.001, make_chain(1.001), [])
+        self.assertTrue(self.gate.unchanged('SPY', second))
+        self.assertFalse(self.gate.unchanged('QQQ', second))
+
+    def test_material_changes(self):
+        base = self.gate.fingerprint(100.0, make_chain(), [])
+        self.gate.update('SPY', base)
+        self.assertFalse(self.gate.unchanged('SPY', self.gate.fingerprint(101.0, make_chain(), [])))
+        self.assertFalse(self.gate.unchanged('SPY', self.gate.fingerprint(100.0, make_chain(1.05), [])))
+        earnings = [pd.Timestamp('2026-11-01')]
+        self.assertFalse(self.gate.unchanged('SPY', self.gate.fingerprint(100.0, make_chain(), earnings)))
+
+    def test_max_age_forces_refresh(self):
+        fingerprint = self.gate.fingerprint(100.0, make_chain(), [])
+        self.gate.update('SPY', fingerprint)
+        self.clock.now = 601
+        self.assertFalse(self.gate.unchanged('SPY', fingerprint))
+
+    def test_missing_inputs_never_skip(self):
+        self.assertIsNone(self.gate.fingerprint(None, make_chain(), []))
+        self.assertIsNone(chain_hash(pd.DataFrame()))
+        self.assertFalse(self.gate.unchanged('SPY', None))
+
+class TestSignalDeduplicator(unittest.TestCase):
+    def test_window(self):
+        clock = FakeClock()
+        dedup = SignalDeduplicator(window=60, clock=clock)
+        signal = {'ticker': 'SPY', 'strategy_type': 'bull_call_spread',
+                  'strikes': (100.0, 105.0), 'expiration': pd.Timestamp('2026-11-20')}
+        other = dict(signal, strikes=(105.0, 110.0))
+        self.assertEqual(len(dedup.filter([signal, other])), 2)
+        clock.now = 30
+        self.assertEqual(dedup.filter([signal]), [])
+        clock.now = 61
+        self.assertEqual(dedup.filter([signal]), [signal])
+
+    def test_disabled(self):
+        dedup = SignalDeduplicator(window=0)
+        signal = {'ticker': 'SPY', 'strikes': (1, 2)}
+        self.assertEqual(dedup.filter([signal]), [signal])
+        self.assertEqual(dedup.filter([signal]), [signal])
+
+class TestMarketHours(unittest.TestCase):
+    def setUp(self):
+        self.hours = MarketHours(holidays=['2026-12-25'])
+        self.tz = ZoneInfo('America/New_York')
+
+    def test_is_open(self):
+        self.assertTrue(self.hours.is_open(datetime(2026, 10, 16, 10, 0, tzinfo=self.tz)))
+        self.assertFalse(self.hours.is_open(datetime(2026, 10, 16, 16, 0, tzinfo=self.tz)))
+        self.assertFalse(self.hours.is_open(datetime(2026, 10, 17, 12, 0, tzinfo=self.tz)))
+        self.assertFalse(self.hours.is_open(datetime(2026, 12, 25, 12, 0, tzinfo=self.tz)))
+        # 其他时区的时间先换算到交易所时区
+        self.assertTrue(self.hours.is_open(datetime(2026, 10, 16, 14, 0, tzinfo=ZoneInfo('UTC'))))
+
+    def test_next_open(self):
+        friday_close = datetime(2026, 10, 16, 17, 0, tzinfo=self.tz)
+        self.assertEqual(self.hours.next_open(friday_close), datetime(2026, 10, 19, 9, 30, tzinfo=self.tz))
+        self.assertEqual(self.hours.seconds_until_open(datetime(2026, 10, 19, 9, 0, tzinfo=self.tz)), 1800)
+
+if __name__ == '__main__':
+    unittest.main()
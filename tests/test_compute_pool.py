@@ -0,0 +1,86 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.utils.compute_pool import ComputePool, SharedChain, attach_chain
+from src.utils.metrics import metrics
+from src.utils.spreads import score_vertical_spreads
+
+def make_chain():
+    rows = []
+    expiration = pd.Timestamp('2030-01-18')
+    for flag in ('call', 'put'):
+        for strike in np.arange(90, 111, 5.0):
+            rows.append({'type': flag, 'strike': strike, 'bid': 1.0 + (110 - strike) / 20,
+                         'ask': 1.1 + (110 - strike) / 20, 'volume': 100,
+                         'impliedVolatility': 0.3, 'days_to_expire': 30,
+                         'expiration': expiration})
+    return pd.DataFrame(rows)
+
+def column_sum(chain, column):
+    return float(chain[column].sum()), chain['type'].tolist()
+
+def measured_sum(chain, column):
+    with metrics.timer('test.worker'):
+        metrics.incr('test.rows', len(chain))
+        return column_sum(chain, column)
+
+class TestSharedChain(unittest.TestCase):
+    def test_round_trip(self):
+        chain = make_chain()
+        chain.loc[0, 'type'] = None
+        shared = SharedChain(chain)
+        try:
+            restored = attach_chain(shared.handle)
+        finally:
+            shared.close()
+        self.assertEqual(list(restored.columns), list(chain.columns))
+        np.testing.assert_allclose(restored['strike'], chain['strike'])
+        self.assertEqual(restored['type'].tolist(), chain['type'].tolist())
+        self.assertTrue((restored['expiration'] == chain['expiration']).all())
+        
+    def test_closed_memory_is_released(self):
+        shared = SharedChain(make_chain())
+        shared.close()
+        with self.assertRaises(FileNotFoundError):
+            attach_chain(shared.handle)
+
+class TestComputePool(unittest.TestCase):
+    def test_inline_when_disabled_or_small(self):
+        metrics.reset()
+        chain = make_chain()
+        for pool in (ComputePool(enabled=False), ComputePool(min_rows=len(chain) + 1)):
+            self.assertEqual(pool.run(column_sum, 'strike', chain=chain), column_sum(chain, 'strike'))
+            self.assertIsNone(pool._executor)
+        self.assertEqual(metrics.snapshot()['counters']['compute.inline'], 2)
+        
+    def test_process_pool_matches_inline(self):
+        chain = make_chain()
+        pool = ComputePool(max_workers=1, start_method='spawn')
+        try:
+            result = pool.run(score_vertical_spreads, 100.0, chain=chain)
+            expected = score_vertical_spreads(chain, 100.0)
+            pd.testing.assert_frame_equal(result, expected)
+            # 进程池复用
+            executor = pool._executor
+            pool.run(score_vertical_spreads, 100.0, chain=chain)
+            self.assertIs(pool._executor, executor)
+        finally:
+            pool.shutdown()
+            
+    def test_worker_metrics_are_merged(self):
+        chain = make_chain()
+        pool = ComputePool(max_workers=1, start_method='spawn')
+        try:
+            metrics.reset()
+            for _ in range(2):
+                self.assertEqual(pool.run(measured_sum, 'strike', chain=chain), column_sum(chain, 'strike'))
+            snap = metrics.snapshot()
+        finally:
+            pool.shutdown()
+        # 子进程中记录的计时和计数合并到父进程
+        self.assertEqual(snap['timings']['test.worker']['count'], 2)
+        self.assertEqual(snap['counters']['test.rows'], 2 * len(chain))
+        self.assertEqual(snap['counters']['compute.tasks'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
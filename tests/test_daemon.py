@@ -0,0 +1,194 @@
+import threading
+import time
+import unittest
+from datetime import timedelta
+from unittest import mock
+import pandas as pd
+from src.daemon import OptionsScanner
+from src.signal_generator import SignalGenerator
+from benchmarks.synthetic import FakeWatchlistLoader
+
+class FakeScanner(OptionsScanner):
+    def __init__(self, watchlist, delays, max_workers=3, ticker_timeout=5, config=None):
+        self.watchlist = watchlist
+        self.scan_config = config
+        self.delays = delays
+        self.scanner_config = {'max_workers': max_workers, 'ticker_timeout': ticker_timeout}
+        self.sent = []
+        with mock.patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': ''}):
+            super().__init__()
+        
+    def _load_config(self):
+        return self.scan_config or {'watchlist': self.watchlist, 'scanner': self.scanner_config}
+    
+    def _prefetch(self, tickers):
+        pass
+    
+    def _analyze_ticker(self, ticker):
+        time.sleep(self.delays.get(ticker, 0))
+        return f"signal {ticker}"
+    
+    def _notify(self, message):
+        self.sent.append(message)
+
+class TestConcurrentScan(unittest.TestCase):
+    def test_results_in_watchlist_order(self):
+        scanner = FakeScanner(['A', 'B', 'C', 'D'], {'A': 0.3, 'B': 0.1, 'C': 0.2})
+        results = scanner.scan_all()
+        self.assertEqual([t for t, _ in results], ['A', 'B', 'C', 'D'])
+        self.assertEqual(scanner.sent, ['signal A', 'signal B', 'signal C', 'signal D'])
+        
+    def test_ticker_timeout(self):
+        scanner = FakeScanner(['SLOW', 'FAST'], {'SLOW': 1.5}, ticker_timeout=0.5)
+        results = dict(scanner.scan_all())
+        self.assertIsNone(results['SLOW'])
+        self.assertEqual(results['FAST'], 'signal FAST')
+        
+        # 仍在运行的标的下一轮被跳过
+        results = dict(scanner.scan_all())
+        self.assertNotIn('SLOW', results)
+        
+    def test_cycles_do_not_overlap(self):
+        scanner = FakeScanner(['A'], {'A': 0.5})
+        first = threading.Thread(target=scanner.scan_all)
+        first.start()
+        time.sleep(0.1)
+        self.assertEqual(scanner.scan_all(), [])
+        first.join()
+        self.assertEqual(scanner.sent, ['signal A'])
+
+class IncrementalScanner(OptionsScanner):
+    def __init__(self, config):
+        self.scan_config = config
+        self.sent = []
+        with mock.patch.dict('os.environ', {'TELEGRAM_BOT_TOKEN': ''}), \
+                mock.patch('src.daemon.WatchlistLoader',
+                           lambda watchlist, **kwargs: FakeWatchlistLoader(watchlist, config, 20, 2)):
+            super().__init__()
+        
+    def _load_config(self):
+        return self.scan_config
+    
+    def _notify(self, message):
+        self.sent.append(message)
+
+def fake_signals(sg, limit=None):
+    sg.current_spot()
+    return [{'ticker': sg.dl.ticker, 'strategy_type': 'bull_call_spread', 'strikes': (100.0, 105.0),
+             'probability': 65.0, 'expiration': pd.Timestamp('2026-11-20'), 'entry_price': sg.spot_price,
+             'greeks': {'delta': 0.1, 'gamma': 0.01, 'vega': 0.01, 'theta': -0.01}, 'legs': []}]
+
+class TestIncrementalScan(unittest.TestCase):
+    def setUp(self):
+        self.config = {
+            'watchlist': ['SYN'], 'scanner': {'max_workers': 1}, 'strategy': {},
+            'incremental': {'enabled': True, 'dedup_window': 3600},
+            'market_hours': {'closed_interval': 1800},
+        }
+        
+    def test_unchanged_inputs_and_duplicate_signals(self):
+        scanner = IncrementalScanner(self.config)
+        with mock.patch.object(SignalGenerator, 'generate_signals', autospec=True,
+                               side_effect=fake_signals) as generate:
+            self.assertIsNotNone(dict(scanner.scan_all())['SYN'])
+            # 合成行情不变：跳过分析
+            self.assertIsNone(dict(scanner.scan_all())['SYN'])
+            self.assertEqual(generate.call_count, 1)
+            # 跳过分析的标的沿用上次的信号接近度，调度间隔不退回慢速
+            self.assertEqual(scanner._observations['SYN']['proximity'], 1.0)
+            # 强制重新分析后同一信号在去重窗口内不再发送
+            scanner.gate.forget()
+            self.assertIsNone(dict(scanner.scan_all())['SYN'])
+            self.assertEqual(generate.call_count, 2)
+        self.assertEqual(len(scanner.sent), 1)
+        
+class TestMemoryBounded(unittest.TestCase):
+    def test_objects_reused_and_frames_released(self):
+        config = {'watchlist': ['SYN', 'OLD'], 'scanner': {'max_workers': 1}, 'strategy': {},
+                  'memory': {'release_frames': True, 'restart_on_limit': True}}
+        scanner = IncrementalScanner(config)
+        with mock.patch.object(SignalGenerator, 'generate_signals', autospec=True, side_effect=fake_signals):
+            scanner.scan_all()
+            dl = scanner.watchlist_loader.loader('SYN')
+            sg = scanner._generators['SYN']
+            cache = scanner.watchlist_loader.cache
+            self.assertIsNone(cache.get('SYN', 'chain', 'all'))
+            self.assertIsNone(cache.get('SYN', 'bars', '5m'))
+            self.assertFalse(hasattr(dl, '__dict__'))
+            
+            # OLD 移出观察列表
+            scanner._retain(['SYN'])
+            scanner.scan_all(['SYN'])
+            self.assertIs(scanner._generators['SYN'], sg)
+            self.assertIs(sg.dl, dl)
+            self.assertEqual(list(scanner._generators), ['SYN'])
+            self.assertFalse(scanner.over_memory_limit)
+            
+            # 进程 RSS 必然超过 1 MiB 的软上限：周期结束时释放复用的对象后仍超过，标记为需要重启
+            scanner.memory.soft_limit = 1024 * 1024
+            scanner.scan_all(['SYN'])
+            self.assertFalse(scanner.over_memory_limit)
+            self.assertTrue(scanner.tick(scanner._cycle_started + scanner.cycle_interval))
+            self.assertTrue(scanner.over_memory_limit)
+            self.assertEqual(scanner._generators, {})
+        
+class TestScheduledScan(unittest.TestCase):
+    def setUp(self):
+        self.clock = [1000.0]
+        config = {
+            'watchlist': ['A', 'B', 'C'], 'scanner': {'max_workers': 1},
+            'strategy': {'polling_interval': 5},
+            'polling': {'min_interval': 60, 'requests_per_minute': 60, 'requests_per_ticker': 2, 'burst': 4},
+            'market_hours': {'closed_interval': 1800},
+        }
+        self.scanner = FakeScanner(['A', 'B', 'C'], {}, config=config)
+        self.scanner.scheduler._clock = lambda: self.clock[0]
+        self.scanner.scheduler._refilled = self.clock[0]
+        self.opened = pd.Timestamp('2026-10-16 12:00', tz='America/New_York').to_pydatetime()
+        self.closed = pd.Timestamp('2026-10-17 12:00', tz='America/New_York').to_pydatetime()
+        
+    def test_budget_spreads_requests(self):
+        # 令牌桶只够两个标的，第三个等预算恢复
+        self.assertEqual([t for t, _ in self.scanner.scan_due(self.opened)], ['A', 'B'])
+        self.assertEqual(self.scanner.scan_due(self.opened), [])
+        self.clock[0] += 2
+        self.assertEqual([t for t, _ in self.scanner.scan_due(self.opened)], ['C'])
+        # 基准间隔为 polling_interval 分钟
+        self.clock[0] += 299
+        self.assertEqual([t for t, _ in self.scanner.scan_due(self.opened)], ['A', 'B'])
+        
+    def test_cycles_are_timed_not_per_batch(self):
+        started = self.scanner._cycle_started
+        self.scanner.scan_due(self.opened)
+        self.clock[0] += 2
+        self.scanner.scan_due(self.opened)
+        self.assertEqual(self.scanner._cycles, 0)
+        # 周期长度默认为基准轮询间隔
+        self.assertFalse(self.scanner.tick(started + 299))
+        self.assertTrue(self.scanner.tick(started + 300))
+        self.assertEqual(self.scanner._cycles, 1)
+        self.assertFalse(self.scanner.tick(started + 301))
+        
+    def test_history_synced_once_per_day(self):
+        store = mock.Mock()
+        store.sync.return_value = 0
+        started = self.scanner._cycle_started
+        with mock.patch('src.daemon.get_history_store', return_value=store):
+            # 未预热时不联网
+            self.scanner.tick(started + 300)
+            self.assertEqual(store.sync.call_count, 0)
+            self.scanner.warm_up()
+            self.scanner._history_day -= timedelta(days=1)
+            self.scanner.tick(started + 600)
+            self.scanner.tick(started + 900)
+        self.assertEqual(store.sync.call_count, 2)
+        
+    def test_closed_market_throttles_scans(self):
+        self.scanner.scan_due(self.closed)
+        self.clock[0] += 301
+        self.assertEqual(self.scanner.scan_due(self.closed), [('C', 'signal C')])
+        self.clock[0] += 1500
+        self.assertEqual([t for t, _ in self.scanner.scan_due(self.closed)], ['A', 'B'])
+
+if __name__ == '__main__':
+    unittest.main()
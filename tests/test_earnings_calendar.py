@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+import pandas as pd
+from src.utils.earnings_calendar import EarningsCalendar, event_within, fetch_earnings
+from src.risk_manager import RiskManager
+
+class FakeFetch:
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def __call__(self, tickers, quote_types):
+        self.calls.append((tuple(tickers), dict(quote_types)))
+        return {t: self.results[t] for t in tickers if t in self.results}
+
+class FakeYahoo:
+    def __init__(self, symbols):
+        self.symbols = symbols
+        self.requests = []
+
+    @property
+    def quote_type(self):
+        self.requests.append(('quote_type', tuple(self.symbols)))
+        return {s: {'quoteType': 'ETF' if s == 'SPY' else 'EQUITY'} for s in self.symbols}
+
+    @property
+    def calendar_events(self):
+        self.requests.append(('calendar_events', tuple(self.symbols)))
+        return {s: {'earnings': {'earningsDate': ['2099-01-25 10:59:S']}} for s in self.symbols}
+
+class TestEarningsCalendar(unittest.TestCase):
+    def setUp(self):
+        self.now = pd.Timestamp('2030-01-10')
+        self.fetch = FakeFetch({
+            'NVDA': ('EQUITY', [datetime(2030, 1, 20), datetime(2030, 1, 12)]),
+            'TSLA': ('EQUITY', [datetime(2030, 1, 14)]),
+            'SPY': ('ETF', []),
+        })
+
+    def test_refresh_once_per_day(self):
+        calendar = EarningsCalendar(':memory:')
+        self.assertEqual(calendar.refresh(['NVDA', 'SPY'], self.fetch, today=date(2030, 1, 10)), 2)
+        self.assertEqual(calendar.refresh(['NVDA', 'SPY', 'TSLA'], self.fetch, today=date(2030, 1, 10)), 1)
+        self.assertEqual(self.fetch.calls[1][0], ('TSLA',))
+        # 次日刷新时已知品种不再查询 quoteType
+        calendar.refresh(['NVDA', 'SPY'], self.fetch, today=date(2030, 1, 11))
+        self.assertEqual(self.fetch.calls[2][1], {'NVDA': 'EQUITY', 'SPY': 'ETF'})
+        self.assertEqual(calendar.dates('NVDA', self.now), [datetime(2030, 1, 12), datetime(2030, 1, 20)])
+        self.assertFalse(calendar.has_earnings('SPY'))
+        self.assertIsNone(calendar.dates('QQQ', self.now))
+
+    def test_lookups(self):
+        calendar = EarningsCalendar(':memory:')
+        calendar.refresh(['NVDA', 'TSLA', 'SPY'], self.fetch, today=date(2030, 1, 10))
+        self.assertTrue(calendar.has_event_within('NVDA', 5, self.now))
+        self.assertFalse(calendar.has_event_within('NVDA', 5, pd.Timestamp('2030-01-13')))
+        self.assertFalse(calendar.has_event_within('SPY', 5, self.now))
+        self.assertEqual(calendar.upcoming(5, self.now), ['NVDA', 'TSLA'])
+        self.assertEqual(calendar.upcoming(3, self.now), ['NVDA'])
+        self.assertEqual(calendar.dates('NVDA', pd.Timestamp('2030-01-15')), [datetime(2030, 1, 20)])
+
+    def test_persists_and_keeps_stale_on_failure(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = Path(root) / 'earnings.db'
+            EarningsCalendar(path).refresh(['NVDA', 'SPY'], self.fetch, today=date(2030, 1, 10))
+            reloaded = EarningsCalendar(path)
+            self.assertFalse(reloaded.needs_refresh('NVDA', today=date(2030, 1, 10)))
+            self.assertFalse(reloaded.has_earnings('SPY'))
+
+            def failing(tickers, quote_types):
+                raise RuntimeError('rate limited')
+
+            self.assertEqual(reloaded.refresh(['NVDA'], failing, today=date(2030, 1, 11)), 0)
+            self.assertTrue(reloaded.needs_refresh('NVDA', today=date(2030, 1, 11)))
+            self.assertEqual(len(reloaded.dates('NVDA', self.now)), 2)
+
+    def test_fetch_skips_etfs(self):
+        yahoo = FakeYahoo(['SPY', 'NVDA'])
+        results = fetch_earnings(yahoo, ['SPY', 'NVDA'])
+        self.assertEqual(yahoo.requests, [('quote_type', ('SPY', 'NVDA')), ('calendar_events', ('NVDA',))])
+        self.assertEqual(results['SPY'], ('ETF', []))
+        self.assertEqual(len(results['NVDA'][1]), 1)
+        self.assertEqual(yahoo.symbols, ['SPY', 'NVDA'])
+
+class TestEventWithin(unittest.TestCase):
+    def test_window(self):
+        dates = [datetime(2030, 1, 5), datetime(2030, 1, 14), datetime(2030, 2, 1)]
+        self.assertTrue(event_within(dates, 5, datetime(2030, 1, 10)))
+        self.assertFalse(event_within(dates, 3, datetime(2030, 1, 10)))
+        self.assertFalse(event_within([], 5))
+        self.assertTrue(RiskManager({}).check_event_risk(dates, now=pd.Timestamp('2030-01-28')))
+
+    def test_same_day_event_counts(self):
+        # 财报日期为零点时间戳：当天盘中仍在窗口内（盘后发布的财报风险最高）
+        dates = [datetime(2030, 1, 14)]
+        now = pd.Timestamp('2030-01-14 10:30')
+        self.assertTrue(event_within(dates, 5, now))
+        self.assertTrue(RiskManager({}).check_event_risk(dates, now=now))
+        self.assertFalse(event_within(dates, 5, pd.Timestamp('2030-01-15 00:01')))
+        calendar = EarningsCalendar(':memory:')
+        calendar.refresh(['TSLA'], FakeFetch({'TSLA': ('EQUITY', dates)}), today=date(2030, 1, 14))
+        self.assertEqual(calendar.dates('TSLA', now), dates)
+        self.assertEqual(calendar.upcoming(0, now), ['TSLA'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.utils.greeks import calculate_greeks, calculate_greeks_batch, calculate_chain_greeks
+
+class TestBatchGreeks(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        n = 200
+        self.types = rng.choice(['call', 'put'], size=n)
+        self.strikes = rng.uniform(50, 150, size=n)
+        self.days = rng.integers(1, 120, size=n).astype(float)
+        self.ivs = rng.uniform(0.05, 1.0, size=n)
+        self.spot = 100.0
+        
+    def test_matches_scalar(self):
+        batch = calculate_greeks_batch(self.types, self.strikes, self.spot, self.days, self.ivs)
+        for i in range(len(self.strikes)):
+            scalar = calculate_greeks(
+                str(self.types[i]), float(self.strikes[i]), self.spot,
+                float(self.days[i]), float(self.ivs[i])
+            )
+            for name in ('delta', 'gamma', 'theta', 'vega'):
+                self.assertAlmostEqual(batch[name][i], scalar[name], places=8)
+                
+    def test_invalid_inputs_are_zero(self):
+        batch = calculate_greeks_batch(
+            ['call', 'put', 'call', 'call'],
+            [100, -5, 100, np.nan],
+            100,
+            [30, 30, 30, 30],
+            [0.2, 0.2, 0, 0.2]
+        )
+        for name in ('delta', 'gamma', 'theta', 'vega'):
+            self.assertNotEqual(batch[name][0], 0)
+            self.assertTrue(np.all(batch[name][1:] == 0))
+            
+    def test_chain_columns(self):
+        chain = pd.DataFrame({
+            'type': self.types,
+            'strike': self.strikes,
+            'days_to_expire': self.days,
+            'impliedVolatility': self.ivs,
+        })
+        result = calculate_chain_greeks(chain, self.spot)
+        self.assertTrue({'delta', 'gamma', 'theta', 'vega'}.issubset(result.columns))
+        self.assertNotIn('delta', chain.columns)
+
+if __name__ == '__main__':
+    unittest.main()
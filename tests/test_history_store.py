@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from src.utils.history_store import HistoryStore, _download_closes
+from src.utils.volatility import calculate_iv_rank, iv_rank, iv_percentile
+
+class FakeDownload:
+    def __init__(self):
+        self.calls = []
+        
+    def __call__(self, tickers, start):
+        self.calls.append((tuple(tickers), start))
+        index = pd.date_range(start, date.today(), freq='B')
+        prices = 100 * np.exp(np.cumsum(np.full(len(index), 0.01) * (-1) ** np.arange(len(index))))
+        return pd.DataFrame({t: prices for t in tickers}, index=index)
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.store = HistoryStore(':memory:', lookback_days=60, min_iv_observations=3)
+        self.download = FakeDownload()
+        
+    def test_sync_once_per_day(self):
+        written = self.store.sync(['NVDA', 'TSLA'], download=self.download)
+        self.assertGreater(written, 0)
+        self.assertEqual(self.store.sync(['NVDA', 'TSLA'], download=self.download), 0)
+        self.assertEqual(len(self.download.calls), 1)
+        self.assertFalse(self.store.closes('NVDA').empty)
+        
+    def test_incremental_start(self):
+        last = date.today() - timedelta(days=5)
+        self.store.append_closes('NVDA', pd.Series([100.0], index=[pd.Timestamp(last)]))
+        self.store.sync(['NVDA'], download=self.download)
+        self.assertEqual(self.download.calls[0][1], last)
+        
+    def test_iv_rank_from_local_history(self):
+        self.store.mark_synced('NVDA')
+        for days_ago, iv in [(3, 0.2), (2, 0.4), (1, 0.3)]:
+            self.store.record_atm_iv('NVDA', iv, on=date.today() - timedelta(days=days_ago))
+        rank = calculate_iv_rank('NVDA', current_iv=0.35, store=self.store)
+        self.assertAlmostEqual(rank, 75.0)
+        
+    def test_failed_sync_is_not_retried_same_day(self):
+        def failing(tickers, start):
+            raise RuntimeError('rate limited')
+        self.assertEqual(self.store.sync(['NVDA'], download=failing), 0)
+        self.assertFalse(self.store.needs_sync('NVDA'))
+        self.assertTrue(self.store.needs_sync('NVDA', today=date.today() + timedelta(days=1)))
+        # 下载结果中缺少的标的同样不再重复请求
+        self.store.sync(['TSLA'], download=lambda tickers, start: pd.DataFrame())
+        self.assertFalse(self.store.needs_sync('TSLA'))
+        
+    def test_download_falls_back_when_session_rejected(self):
+        closes = pd.DataFrame({'Close': [100.0, 101.0]}, index=pd.date_range('2030-01-01', periods=2))
+        rejected = Exception("Yahoo API requires curl_cffi session not <class 'requests.sessions.Session'>")
+        with mock.patch('yfinance.download', side_effect=[rejected, closes]) as download:
+            result = _download_closes(['NVDA'], date(2030, 1, 1))
+        self.assertIsNotNone(download.call_args_list[0].kwargs['session'])
+        self.assertIsNone(download.call_args_list[1].kwargs['session'])
+        self.assertEqual(result['NVDA'].tolist(), [100.0, 101.0])
+        
+    def test_warm_up_falls_back_to_hv_percentile(self):
+        self.store.record_atm_iv('NVDA', 0.2, on=date.today() - timedelta(days=1))
+        # 收盘价不足一个窗口：不按IV排名过滤
+        self.assertIsNone(calculate_iv_rank('NVDA', current_iv=0.35, store=self.store))
+        self.assertIsNone(calculate_iv_rank('NVDA', store=self.store))
+        
+        self.store.sync(['NVDA'], download=self.download)
+        hv = self.store.closes('NVDA')
+        hv = (np.log(hv / hv.shift(1)).dropna().rolling(20).std().dropna() * np.sqrt(252))
+        low = calculate_iv_rank('NVDA', current_iv=hv.min() / 2, store=self.store)
+        high = calculate_iv_rank('NVDA', current_iv=hv.max() * 2, store=self.store)
+        self.assertEqual((low, high), (0.0, 100.0))
+        
+    def test_rank_and_percentile(self):
+        history = [0.1, 0.2, 0.3, 0.4, 0.5]
+        self.assertAlmostEqual(iv_rank(history, 0.3), 50.0)
+        self.assertAlmostEqual(iv_percentile(history, 0.35), 60.0)
+
+if __name__ == '__main__':
+    unittest.main()
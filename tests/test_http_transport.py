@@ -0,0 +1,177 @@
+import json
+import socket
+import threading
+import time
+import unittest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.utils.http_transport import HttpTransport, CircuitBreaker, RetryBudget, CircuitOpenError
+
+class FakeYahoo(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    statuses = []
+    hits = 0
+    ports = set()
+    active = 0
+    peak = 0
+    delay = 0.0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        cls = FakeYahoo
+        with cls.lock:
+            cls.hits += 1
+            cls.ports.add(self.client_address[1])
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+            status, headers = cls.statuses.pop(0) if cls.statuses else (200, {})
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.active -= 1
+        data = json.dumps({'ok': status == 200}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestHttpTransport(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeYahoo)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/v7/finance/options/SPY'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeYahoo.statuses = []
+        FakeYahoo.hits = 0
+        FakeYahoo.ports = set()
+        FakeYahoo.peak = 0
+        FakeYahoo.delay = 0.0
+        self.sleeps = []
+
+    def make(self, **kwargs):
+        kwargs.setdefault('sleep', self.sleeps.append)
+        kwargs.setdefault('timeout', 5)
+        return HttpTransport(**kwargs)
+
+    def test_keep_alive_pool_is_shared(self):
+        transport = self.make()
+        first, second = transport.session(), transport.session()
+        for session in (first, second, first):
+            self.assertEqual(session.get(self.url).status_code, 200)
+        # 两个会话共用同一主机的长连接
+        self.assertEqual(FakeYahoo.hits, 3)
+        self.assertEqual(len(FakeYahoo.ports), 1)
+
+    def test_server_errors_are_retried_with_jitter(self):
+        FakeYahoo.statuses = [(503, {}), (502, {})]
+        transport = self.make(retries=3, backoff=0.5)
+        response = transport.session().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(FakeYahoo.hits, 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertTrue(0 <= self.sleeps[0] <= 0.5 and 0 <= self.sleeps[1] <= 1.0)
+
+    def test_rate_limit_is_not_retried(self):
+        FakeYahoo.statuses = [(429, {}), (404, {})]
+        session = self.make().session()
+        self.assertEqual(session.get(self.url).status_code, 429)
+        self.assertEqual(session.get(self.url).status_code, 404)
+        self.assertEqual(FakeYahoo.hits, 2)
+
+    def test_circuit_opens_and_fails_fast(self):
+        clock = FakeClock()
+        FakeYahoo.statuses = [(429, {'Retry-After': '60'})] * 3
+        transport = self.make(failure_threshold=3, cooldown=10, clock=clock)
+        session = transport.session()
+        for _ in range(3):
+            self.assertEqual(session.get(self.url).status_code, 429)
+        host = f'127.0.0.1:{self.server.server_port}'
+        self.assertEqual(transport.breaker_states()[host], CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            session.get(self.url)
+        self.assertEqual(FakeYahoo.hits, 3)
+        # Retry-After 比冷却时间长时按服务器要求的时间熔断
+        clock.now = 30
+        with self.assertRaises(CircuitOpenError):
+            session.get(self.url)
+        clock.now = 61
+        self.assertEqual(session.get(self.url).status_code, 200)
+        self.assertEqual(transport.breaker_states()[host], CircuitBreaker.CLOSED)
+
+    def test_retry_budget_limits_retries(self):
+        FakeYahoo.statuses = [(503, {})] * 20
+        transport = self.make(retries=3, budget_ratio=0.1, budget_min_per_second=0,
+                              failure_threshold=100, clock=FakeClock())
+        transport.budget.tokens = 1
+        session = transport.session()
+        self.assertEqual(session.get(self.url).status_code, 503)
+        self.assertEqual(session.get(self.url).status_code, 503)
+        # 预算只够一次重试（另有两次请求各存入 0.1）
+        self.assertEqual(FakeYahoo.hits, 3)
+
+    def test_concurrency_limit(self):
+        FakeYahoo.delay = 0.05
+        transport = self.make(max_concurrency=2)
+        session = transport.session(asynchronous=True, max_workers=6)
+        futures = [session.get(self.url) for _ in range(6)]
+        self.assertTrue(all(f.result().status_code == 200 for f in futures))
+        self.assertLessEqual(FakeYahoo.peak, 2)
+
+    def test_connection_error_is_raised_after_retries(self):
+        transport = self.make(retries=2, failure_threshold=100)
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        with self.assertRaises(requests.ConnectionError):
+            transport.session().get(f'http://127.0.0.1:{port}/')
+        self.assertEqual(len(self.sleeps), 2)
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_half_open_allows_single_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=5, clock=clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.record_failure())
+        self.assertFalse(breaker.allow())
+        clock.now = 5
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        # 探测失败立即重新打开
+        self.assertTrue(breaker.record_failure())
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+class TestRetryBudget(unittest.TestCase):
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        budget = RetryBudget(ratio=0.5, min_per_second=1, capacity=2, clock=clock)
+        self.assertTrue(budget.withdraw())
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        clock.now = 1
+        self.assertTrue(budget.withdraw())
+
+if __name__ == '__main__':
+    unittest.main()
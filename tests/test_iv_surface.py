@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.utils.iv_surface import VolSurface, bs_price, implied_volatility
+
+SPOT = 100.0
+
+def make_chain(days=(10, 40), strikes=np.arange(70, 131, 2.5)):
+    """按已知微笑 σ(K) 生成报价的期权链"""
+    rows = []
+    for d in days:
+        for option_type in ('call', 'put'):
+            for strike in strikes:
+                sigma = 0.25 + 0.3 * np.log(strike / SPOT) ** 2 + 0.0005 * d
+                price = float(bs_price(option_type == 'call', SPOT, strike, d / 365, sigma))
+                rows.append({'type': option_type, 'strike': strike, 'days_to_expire': d,
+                             'bid': max(price - 0.01, 0.0), 'ask': price + 0.01,
+                             'impliedVolatility': sigma, 'true_iv': sigma})
+    return pd.DataFrame(rows)
+
+class TestImpliedVolatility(unittest.TestCase):
+    def test_round_trip(self):
+        strikes = np.array([60, 90, 100, 110, 160.0])
+        sigmas = np.array([0.8, 0.2, 0.35, 0.5, 1.5])
+        types = np.array(['put', 'put', 'call', 'call', 'call'])
+        prices = bs_price(types == 'call', SPOT, strikes, 45 / 365, sigmas)
+        solved = implied_volatility(prices, SPOT, strikes, 45, types)
+        np.testing.assert_allclose(solved, sigmas, atol=1e-4)
+        
+    def test_arbitrage_violations_are_nan(self):
+        # 低于内在价值、高于现价、零价格
+        solved = implied_volatility([5.0, 120.0, 0.0], SPOT, [90, 100, 100], 30, 'call')
+        self.assertTrue(np.isnan(solved).all())
+        self.assertEqual(implied_volatility(1.0, SPOT, 100, 30, 'call').shape, ())
+
+class TestVolSurface(unittest.TestCase):
+    def setUp(self):
+        self.chain = make_chain()
+        self.surface = VolSurface.fit(self.chain, SPOT)
+        
+    def test_recovers_smile(self):
+        near_money = self.chain[(self.chain['strike'] > 80) & (self.chain['strike'] < 120)]
+        fitted = self.surface.iv(near_money['strike'], near_money['days_to_expire'])
+        np.testing.assert_allclose(fitted, near_money['true_iv'], atol=0.01)
+        
+    def test_interpolates_between_expiries(self):
+        near, far = self.surface.iv(SPOT, 10), self.surface.iv(SPOT, 40)
+        middle = float(self.surface.iv(SPOT, 25))
+        self.assertTrue(min(near, far) <= middle <= max(near, far))
+        self.assertAlmostEqual(float(self.surface.iv(SPOT, 90)), float(far))
+        
+    def test_fill_replaces_missing_iv(self):
+        chain = self.chain.copy()
+        chain.loc[[12, 85], 'impliedVolatility'] = 0.0
+        filled = self.surface.fill(chain)
+        self.assertTrue((filled['impliedVolatility'] > 0).all())
+        np.testing.assert_allclose(filled.loc[[12, 85], 'impliedVolatility'],
+                                   chain.loc[[12, 85], 'true_iv'], atol=0.02)
+        self.assertEqual(filled.loc[4, 'impliedVolatility'], chain.loc[4, 'impliedVolatility'])
+        
+    def test_empty_chain(self):
+        surface = VolSurface.fit(pd.DataFrame(), SPOT)
+        self.assertTrue(surface.empty)
+        self.assertTrue(np.isnan(surface.iv(SPOT, 30)))
+
+if __name__ == '__main__':
+    unittest.main()
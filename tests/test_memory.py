@@ -0,0 +1,51 @@
+import unittest
+from src.utils.memory import MemoryMonitor, rss_bytes
+
+MIB = 1024 * 1024
+
+class FakeRss:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def __call__(self):
+        return self.values.pop(0) if len(self.values) > 1 else self.values[0]
+
+class TestMemoryMonitor(unittest.TestCase):
+    def test_rss_is_readable(self):
+        self.assertGreater(rss_bytes(), 0)
+
+    def test_soft_limit_releases_caches(self):
+        released = []
+        monitor = MemoryMonitor(soft_limit_mb=100, rss=FakeRss([150 * MIB, 80 * MIB]))
+        monitor.add_releaser(lambda: released.append(True))
+        self.assertTrue(monitor.check())
+        self.assertEqual(released, [True])
+        # 释放后仍超过上限
+        monitor = MemoryMonitor(soft_limit_mb=100, rss=FakeRss([150 * MIB, 140 * MIB]))
+        self.assertFalse(monitor.on_cycle())
+
+    def test_within_limit_does_nothing(self):
+        released = []
+        monitor = MemoryMonitor(soft_limit_mb=100, rss=FakeRss([50 * MIB]))
+        monitor.add_releaser(lambda: released.append(True))
+        self.assertTrue(monitor.check())
+        self.assertEqual(released, [])
+        self.assertFalse(MemoryMonitor().enabled)
+
+    def test_tracemalloc_report_lists_growth(self):
+        monitor = MemoryMonitor(report_every=2, top=3, trace=True)
+        monitor.start()
+        try:
+            self.assertTrue(monitor.on_cycle())
+            first = monitor.report()
+            retained = [bytearray(1024) for _ in range(1000)]
+            second = monitor.report()
+            self.assertEqual(len(second['top']), 3)
+            self.assertIn('test_memory.py', second['top'][0])
+            self.assertGreater(second['traced_mib'], first['traced_mib'])
+            del retained
+        finally:
+            monitor.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from src.utils.metrics import Metrics, summary_line, write_metrics
+
+class TestMetrics(unittest.TestCase):
+    def test_timers_and_counters(self):
+        m = Metrics()
+        for _ in range(2):
+            with m.timer('fetch.chain'):
+                time.sleep(0.01)
+        m.incr('network_requests', 3)
+        snap = m.snapshot()
+        self.assertEqual(snap['timings']['fetch.chain']['count'], 2)
+        self.assertGreaterEqual(snap['timings']['fetch.chain']['total'], 0.02)
+        self.assertEqual(snap['counters']['network_requests'], 3)
+        self.assertIn('network_requests=3', summary_line(snap))
+        
+    def test_reset_per_cycle(self):
+        m = Metrics()
+        m.incr('cache_hits')
+        self.assertEqual(m.reset()['counters'], {'cache_hits': 1})
+        self.assertEqual(m.snapshot()['counters'], {})
+        
+    def test_merge(self):
+        m, worker = Metrics(), Metrics()
+        m.observe('signal.strategies', 0.1)
+        worker.observe('signal.strategies', 0.3)
+        worker.incr('candidates.scored', 5)
+        m.merge(worker.snapshot())
+        snap = m.snapshot()
+        self.assertEqual(snap['timings']['signal.strategies']['count'], 2)
+        self.assertAlmostEqual(snap['timings']['signal.strategies']['max'], 0.3)
+        self.assertEqual(snap['counters']['candidates.scored'], 5)
+        
+    def test_write_metrics(self):
+        m = Metrics()
+        m.observe('signal.greeks', 0.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'logs', 'metrics.json')
+            write_metrics(m.snapshot(), path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)['timings']['signal.greeks']['max'], 0.5)
+
+if __name__ == '__main__':
+    unittest.main()
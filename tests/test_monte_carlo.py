@@ -0,0 +1,43 @@
+import unittest
+import numpy as np
+from src.utils.monte_carlo import monte_carlo_simulation, calculate_itm_probability, MonteCarloEngine
+from src.utils.spreads import prob_above, expected_call_payoff
+
+class TestMonteCarlo(unittest.TestCase):
+    def test_paths_shape_and_seed(self):
+        paths = monte_carlo_simulation(100, 0.05, 0.2, 30, n_sims=1000, seed=1)
+        self.assertEqual(paths.shape, (1000, 30))
+        self.assertTrue(np.all(paths[:, 0] == 100))
+        np.testing.assert_array_equal(paths, monte_carlo_simulation(100, 0.05, 0.2, 30, n_sims=1000, seed=1))
+        self.assertEqual(calculate_itm_probability(paths, 100), calculate_itm_probability(paths[:, -1], 100))
+        
+    def test_antithetic_paths_are_symmetric(self):
+        paths = monte_carlo_simulation(100, 0.0, 0.2, 10, n_sims=4, seed=3, antithetic=True)
+        log_moves = np.log(paths[:, -1] / 100) + 0.5 * 0.2 ** 2 * 9 / 252
+        np.testing.assert_allclose(log_moves[:2], -log_moves[2:])
+        
+    def test_chunking_does_not_change_results(self):
+        small = MonteCarloEngine(100, 0.05, 0.3, 31, seed=5, antithetic=False, chunk_size=1000)
+        large = MonteCarloEngine(100, 0.05, 0.3, 31, seed=5, antithetic=False, chunk_size=50000)
+        np.testing.assert_allclose(small.prob_above([95, 100, 105], 20000),
+                                   large.prob_above([95, 100, 105], 20000))
+        
+    def test_matches_closed_form(self):
+        engine = MonteCarloEngine(100, 0.05, 0.3, 31, seed=11, chunk_size=50000)
+        t = 30 / 252
+        strikes = np.array([90.0, 100.0, 110.0])
+        np.testing.assert_allclose(engine.prob_above(strikes, 400000),
+                                   prob_above(100, strikes, 0.3, t, 0.05), atol=0.005)
+        
+        spread = engine.vertical_spread(100, 110, n_sims=400000)
+        exact = expected_call_payoff(100, 100, 0.3, t, 0.05) - expected_call_payoff(100, 110, 0.3, t, 0.05)
+        self.assertAlmostEqual(spread['expected_payoff'], exact, delta=4 * spread['stderr'] + 1e-3)
+        
+    def test_control_variate_reduces_error(self):
+        engine = MonteCarloEngine(100, 0.05, 0.3, 31, seed=2, antithetic=False)
+        _, plain = engine.expectations(lambda s: np.maximum(s - 90, 0), 50000)
+        _, controlled = engine.expectations(lambda s: np.maximum(s - 90, 0), 50000, control_variate=True)
+        self.assertLess(controlled, plain)
+
+if __name__ == '__main__':
+    unittest.main()
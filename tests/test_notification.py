@@ -0,0 +1,95 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs
+from src.notification import NotificationManager, TokenBucket, MAX_MESSAGE_LENGTH
+
+class StubTelegram(BaseHTTPRequestHandler):
+    responses = []
+    received = []
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        StubTelegram.received.append((self.path, parse_qs(body)))
+        status, payload = StubTelegram.responses.pop(0) if StubTelegram.responses else (200, {'ok': True})
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        
+    def log_message(self, *args):
+        pass
+
+class TestNotificationManager(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), StubTelegram)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        
+    def setUp(self):
+        StubTelegram.responses = []
+        StubTelegram.received = []
+        self.manager = NotificationManager(
+            token='TOKEN', chat_id='42',
+            config={'base_url': f'http://127.0.0.1:{self.server.server_port}',
+                    'rate_per_second': 100, 'burst': 10, 'backoff': 0.01}
+        )
+        
+    def tearDown(self):
+        self.manager.close(timeout=5)
+        
+    def test_batch_is_coalesced(self):
+        self.manager.notify_batch(['signal A', 'signal B'])
+        self.manager.flush()
+        self.assertEqual(len(StubTelegram.received), 1)
+        path, data = StubTelegram.received[0]
+        self.assertEqual(path, '/botTOKEN/sendMessage')
+        self.assertEqual(data['chat_id'], ['42'])
+        self.assertEqual(data['text'], ['signal A\n\nsignal B'])
+        
+    def test_long_batch_is_split(self):
+        self.manager.notify_batch(['x' * 3000, 'y' * 3000])
+        self.manager.flush()
+        self.assertEqual(len(StubTelegram.received), 2)
+        self.assertTrue(all(len(d['text'][0]) <= MAX_MESSAGE_LENGTH for _, d in StubTelegram.received))
+        
+    def test_retries_after_rate_limit_and_server_error(self):
+        StubTelegram.responses = [
+            (429, {'ok': False, 'parameters': {'retry_after': 0.05}}),
+            (502, {'ok': False}),
+        ]
+        self.manager.notify('hello')
+        self.manager.flush()
+        self.assertEqual(len(StubTelegram.received), 3)
+        
+    def test_client_error_is_not_retried(self):
+        StubTelegram.responses = [(400, {'ok': False})]
+        self.manager.notify_signal({'ticker': 'QQQ', 'strategy_type': 'bull_call_spread', 'probability': 65})
+        self.manager.flush()
+        self.assertEqual(len(StubTelegram.received), 1)
+        self.assertEqual(StubTelegram.received[0][1]['parse_mode'], ['Markdown'])
+
+class TestTokenBucket(unittest.TestCase):
+    def test_waits_for_tokens(self):
+        now = [0.0]
+        waits = []
+        
+        def sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+            
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            bucket.acquire()
+        self.assertEqual(waits, [0.5, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_loader import DataLoader
+from src.utils.cache import SnapshotCache
+from src.utils.option_chain import OptionChain
+
+class FakeYahoo:
+    def __init__(self, days_out):
+        self.days_out = days_out
+        self.requests = 0
+        
+    @property
+    def option_chain(self):
+        self.requests += 1
+        today = pd.Timestamp.now().normalize()
+        rows = []
+        for days in self.days_out:
+            for option_type in ('calls', 'puts'):
+                for strike in (90.0, 100.0, 110.0):
+                    rows.append({'symbol': 'NVDA', 'expiration': today + pd.Timedelta(days=days),
+                                 'optionType': option_type, 'strike': strike, 'lastPrice': 1.0,
+                                 'bid': 0.9, 'ask': 1.1, 'volume': 10, 'impliedVolatility': '0.3'})
+        df = pd.DataFrame(rows).set_index(['symbol', 'expiration', 'optionType'])
+        return df.sort_index()
+
+class TestOptionChain(unittest.TestCase):
+    def setUp(self):
+        self.dl = DataLoader('NVDA', cache=SnapshotCache())
+        self.fake = FakeYahoo([3, 10, 30, 90])
+        self.dl.yahoo = self.fake
+        
+    def test_nearest_expiration(self):
+        chain = self.dl.fetch_option_chain()
+        self.assertEqual(len(chain), 6)
+        self.assertEqual(chain['type'].tolist(), ['call'] * 3 + ['put'] * 3)
+        self.assertEqual(chain['impliedVolatility'].dtype, float)
+        self.assertEqual(list(chain.index), list(range(6)))
+        self.assertTrue({'mid', 'lastPrice', 'openInterest'} <= set(chain.columns))
+        self.assertTrue(np.allclose(chain['mid'], 1.0))
+        
+    def test_unknown_expiration(self):
+        self.assertTrue(self.dl.fetch_option_chain('2001-01-01').empty)
+        
+    def test_dte_window_single_fetch(self):
+        chains = self.dl.fetch_option_chains(min_dte=7, max_dte=60)
+        self.assertEqual(chains.index.names, ['expiration', 'type', 'strike'])
+        self.assertEqual(len(chains.index.get_level_values('expiration').unique()), 2)
+        self.assertTrue(chains['days_to_expire'].between(7, 60).all())
+        
+        self.dl.fetch_option_chain()
+        self.assertEqual(self.fake.requests, 1)
+
+class TestColumnarChain(unittest.TestCase):
+    def setUp(self):
+        raw = FakeYahoo([30, 3, 10]).option_chain
+        # 打乱原始顺序，构建时按 (到期日, 类型, 行权价) 重新排序
+        self.chain = OptionChain.from_yahoo(raw.iloc[::-1])
+        
+    def test_sorted_codes(self):
+        chain = self.chain
+        self.assertEqual(len(chain), 18)
+        self.assertEqual(chain.type_code.dtype, np.int8)
+        self.assertEqual(chain['volume'].dtype, np.float32)
+        self.assertTrue((np.diff(chain.expiry_code) >= 0).all())
+        self.assertEqual(chain['days_to_expire'][[0, -1]].tolist(), [2, 29])
+        self.assertTrue(np.allclose(chain['impliedVolatility'], 0.3))
+        self.assertEqual(chain.group('put'), (3, 6))
+        
+    def test_binary_search_lookup(self):
+        expiration = self.chain.expiration_dates[1]
+        i = self.chain.find(110.0, 'put', expiration)
+        self.assertEqual(self.chain['strike'][i], 110.0)
+        self.assertEqual(self.chain.row(i)['type'], 'put')
+        self.assertEqual(self.chain.row(i)['expiration'], expiration)
+        self.assertEqual(self.chain.find(105.0, 'call'), -1)
+        self.assertIsNone(self.chain.contract(100.0, 'call', '2001-01-01'))
+        
+    def test_slices_share_memory(self):
+        nearest = self.chain.select_expiration()
+        self.assertEqual(len(nearest), 6)
+        self.assertTrue(np.shares_memory(nearest['bid'], self.chain['bid']))
+        window = self.chain.between_days(7, 60)
+        self.assertEqual(len(window.expiration_dates), 2)
+        self.assertTrue(self.chain.between_days(100, None).empty)
+        
+    def test_frame_round_trip(self):
+        frame = self.chain.to_frame()
+        self.assertEqual(frame['type'].tolist()[:6], ['call'] * 3 + ['put'] * 3)
+        restored = OptionChain.from_frame(frame)
+        self.assertTrue(np.array_equal(restored['strike'], self.chain['strike']))
+        self.assertTrue(np.array_equal(restored['days_to_expire'], self.chain['days_to_expire']))
+        
+    def test_filtered_chain_keeps_groups(self):
+        keep = self.chain['strike'] != 100.0
+        filtered = self.chain[keep]
+        self.assertEqual(len(filtered), 12)
+        self.assertEqual(filtered.group('call'), (0, 2))
+        self.assertGreaterEqual(filtered.find(110.0, 'call'), 0)
+
+if __name__ == '__main__':
+    unittest.main()
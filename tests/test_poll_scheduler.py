@@ -0,0 +1,62 @@
+import unittest
+from src.utils.poll_scheduler import PollScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestPollScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = PollScheduler(
+            base_interval=600, min_interval=60, max_interval=3600,
+            requests_per_minute=60, requests_per_ticker=2, burst=4, clock=self.clock
+        )
+
+    def test_budget_paces_due_tickers(self):
+        self.scheduler.set_tickers(['A', 'B', 'C', 'D'])
+        self.assertEqual(self.scheduler.pop_due(), ['A', 'B'])
+        self.assertEqual(self.scheduler.pop_due(), [])
+        self.assertAlmostEqual(self.scheduler.seconds_until_next(), 2.0)
+        self.clock.now = 2
+        self.assertEqual(self.scheduler.pop_due(), ['C'])
+        self.clock.now = 60
+        self.assertEqual(self.scheduler.pop_due(), ['D'])
+        self.assertIsNone(self.scheduler.seconds_until_next())
+
+    def test_earliest_due_first(self):
+        self.scheduler.set_tickers(['A', 'B'])
+        self.scheduler.pop_due()
+        self.scheduler.reschedule('A', latency=0)
+        self.scheduler.reschedule('B', proximity=1.0)
+        self.clock.now = 300
+        self.assertEqual(self.scheduler.pop_due(), ['B'])
+        self.clock.now = 600
+        self.assertEqual(self.scheduler.pop_due(), ['A'])
+
+    def test_adaptive_interval(self):
+        self.scheduler.set_tickers(['CALM', 'WILD', 'SLOW'])
+        self.scheduler.pop_due()
+        self.assertEqual(self.scheduler.reschedule('CALM', volatility=0.2), 600)
+        self.assertEqual(self.scheduler.reschedule('SLOW', volatility=0.2), 600)
+        # 波动率是中位数的两倍以上时间隔减半
+        self.assertEqual(self.scheduler.reschedule('WILD', volatility=1.0), 300)
+        self.assertEqual(self.scheduler.reschedule('CALM', volatility=0.2, proximity=1.0), 300)
+        self.assertEqual(self.scheduler.reschedule('SLOW', latency=50), 3600)
+        self.assertEqual(self.scheduler.reschedule('SLOW', latency=1, min_interval=1800), 1800)
+
+    def test_watchlist_changes(self):
+        self.scheduler.set_tickers(['A', 'B'])
+        self.assertEqual(self.scheduler.pop_due(limit=1), ['A'])
+        self.scheduler.set_tickers(['B', 'C'])
+        # 已移除的标的不再重新调度
+        self.assertIsNone(self.scheduler.reschedule('A'))
+        self.clock.now = 2
+        self.assertEqual(self.scheduler.pop_due(), ['B', 'C'])
+        self.assertEqual(len(self.scheduler), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.risk_manager import RiskManager
+from src.utils.greeks import calculate_greeks
+from src.utils.iv_surface import bs_price
+from src.utils.risk_book import RiskBook, GREEK_NAMES
+
+NOW = pd.Timestamp('2030-01-02 10:00')
+EXPIRATION = pd.Timestamp('2030-02-01 10:00')
+
+def spread_legs(long_strike, short_strike, option_type='call', iv=0.3):
+    return [
+        {'type': option_type, 'strike': long_strike, 'quantity': 1, 'expiration': EXPIRATION, 'iv': iv},
+        {'type': option_type, 'strike': short_strike, 'quantity': -1, 'expiration': EXPIRATION, 'iv': iv},
+    ]
+
+def expected_greeks(legs, spot, quantity=1):
+    total = dict.fromkeys(GREEK_NAMES, 0.0)
+    for leg in legs:
+        greeks = calculate_greeks(leg['type'], leg['strike'], spot, 30, leg['iv'])
+        for name in GREEK_NAMES:
+            total[name] += greeks[name] * leg['quantity'] * quantity
+    return total
+
+class TestRiskBook(unittest.TestCase):
+    def setUp(self):
+        self.book = RiskBook(capacity=2, clock=lambda: NOW)
+        
+    def assertGreeksEqual(self, actual, expected):
+        for name in GREEK_NAMES:
+            self.assertAlmostEqual(actual[name], expected[name], places=10)
+        
+    def test_incremental_aggregation(self):
+        a = spread_legs(100, 105)
+        b = spread_legs(95, 90, 'put')
+        self.book.add('a', 'NVDA', a, 100.0, quantity=2)
+        self.book.add('b', 'NVDA', b, 100.0)
+        self.book.add('c', 'TSLA', spread_legs(200, 210), 200.0)
+        nvda = {n: expected_greeks(a, 100, 2)[n] + expected_greeks(b, 100)[n] for n in GREEK_NAMES}
+        self.assertGreeksEqual(self.book.exposure('NVDA'), nvda)
+        total = {n: nvda[n] + expected_greeks(spread_legs(200, 210), 200)[n] for n in GREEK_NAMES}
+        self.assertGreeksEqual(self.book.exposure(), total)
+        
+        # 相同标识替换而不是叠加
+        self.book.add('a', 'NVDA', a, 100.0, quantity=2)
+        self.assertGreeksEqual(self.book.exposure('NVDA'), nvda)
+        self.assertEqual(len(self.book), 3)
+        
+        self.book.remove('a')
+        self.book.remove('b')
+        self.assertGreeksEqual(self.book.exposure('NVDA'), dict.fromkeys(GREEK_NAMES, 0.0))
+        
+    def test_update_spot_reprices_only_that_underlying(self):
+        legs = spread_legs(100, 105)
+        self.book.add('a', 'NVDA', legs, 100.0)
+        self.book.add('b', 'TSLA', spread_legs(200, 210), 200.0)
+        tsla = self.book.exposure('TSLA')
+        self.book.update_spot('NVDA', 104.0)
+        self.assertGreeksEqual(self.book.exposure('NVDA'), expected_greeks(legs, 104.0))
+        self.assertGreeksEqual(self.book.exposure('TSLA'), tsla)
+        
+    def test_limits(self):
+        book = RiskBook(limits={'per_underlying': {'delta': 0.25}, 'total': {'delta': 0.5}},
+                        clock=lambda: NOW)
+        legs = spread_legs(100, 105)
+        greeks = expected_greeks(legs, 100.0)
+        self.assertTrue(book.try_add('a', 'NVDA', greeks, legs, 100.0)[0])
+        # 替换同一持仓不重复计入
+        self.assertTrue(book.check('NVDA', greeks, key='a')[0])
+        ok, breaches = book.check('NVDA', greeks)
+        self.assertFalse(ok)
+        self.assertIn('per_underlying.delta', breaches[0])
+        self.assertTrue(book.try_add('b', 'TSLA', greeks, legs, 100.0)[0])
+        ok, _ = book.try_add('c', 'AMD', greeks, legs, 100.0)
+        self.assertFalse(ok)
+        self.assertEqual(len(book), 2)
+        
+    def test_scenario_grid(self):
+        legs = spread_legs(100, 105)
+        self.book.add('a', 'NVDA', legs, 100.0, quantity=3)
+        grid = self.book.scenario_grid([-0.1, 0, 0.1], [-0.05, 0, 0.05])
+        self.assertAlmostEqual(grid.loc[0.0, 0.0], 0.0)
+        
+        def value(spot, shift):
+            return sum(float(bs_price(True, spot, leg['strike'], 30 / 365, leg['iv'] + shift)) *
+                       leg['quantity'] * 3 for leg in legs)
+        self.assertAlmostEqual(grid.loc[0.1, 0.05], value(110.0, 0.05) - value(100.0, 0))
+        self.assertTrue(grid.loc[0.1, 0.0] > 0 > grid.loc[-0.1, 0.0])
+        
+    def test_expire(self):
+        self.book.add('a', 'NVDA', spread_legs(100, 105), 100.0)
+        self.assertEqual(self.book.expire(EXPIRATION - pd.Timedelta(days=1)), 0)
+        self.assertEqual(self.book.expire(EXPIRATION + pd.Timedelta(days=1)), 1)
+        self.assertEqual(len(self.book), 0)
+
+class TestCheckPortfolio(unittest.TestCase):
+    def test_signal_recorded_in_book(self):
+        book = RiskBook(limits={'total': {'delta': 0.3}}, clock=lambda: NOW)
+        rm = RiskManager({}, book=book)
+        legs = spread_legs(100, 105)
+        signal = {'ticker': 'NVDA', 'strategy_type': 'bull_call_spread', 'strikes': (100, 105),
+                  'expiration': EXPIRATION, 'entry_price': 100.0, 'legs': legs,
+                  'greeks': expected_greeks(legs, 100.0)}
+        self.assertTrue(rm.check_portfolio(signal))
+        self.assertTrue(rm.check_portfolio(signal))
+        self.assertEqual(len(book), 1)
+        self.assertFalse(rm.check_portfolio(dict(signal, ticker='TSLA')))
+        self.assertTrue(RiskManager({}).check_portfolio(signal))
+
+    def test_drifting_strikes_replace_stale_proposals(self):
+        now = [NOW]
+        book = RiskBook(limits={'per_underlying': {'delta': 0.3}}, clock=lambda: now[0], ttl=3600)
+        rm = RiskManager({}, book=book)
+
+        def signal(step):
+            legs = spread_legs(100 + step, 105 + step)
+            return {'ticker': 'NVDA', 'strategy_type': 'bull_call_spread', 'strikes': (100 + step, 105 + step),
+                    'expiration': EXPIRATION, 'entry_price': 100.0, 'legs': legs,
+                    'greeks': expected_greeks(legs, 100.0)}
+
+        self.assertTrue(rm.check_portfolio(signal(0)))
+        # 有效期内行权价漂移的信号与原拟建仓位叠加后超限
+        now[0] += pd.Timedelta(minutes=10)
+        self.assertFalse(rm.check_portfolio(signal(1)))
+        for step in range(1, 6):
+            now[0] += pd.Timedelta(minutes=61)
+            self.assertTrue(rm.check_portfolio(signal(step)))
+            self.assertEqual(len(book), 1)
+        now[0] += pd.Timedelta(minutes=61)
+        self.assertEqual(book.expire(), 1)
+        self.assertEqual(len(book), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import sys
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+from src.settings import Settings, StrategySettings, as_settings, get_settings, load_config
+from src.risk_manager import RiskManager
+
+CONFIG = """
+strategy:
+  iv_percentile_threshold: 50
+  min_volume: 10
+scanner:
+  max_workers: 8
+cache:
+  ttl:
+    chain: 15
+watchlist: ["SPY", "QQQ"]
+"""
+
+class TestSettings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'config.yaml')
+        with open(self.path, 'w') as f:
+            f.write(CONFIG)
+            
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def test_parsed_once_and_typed(self):
+        settings = get_settings(self.path)
+        self.assertIs(get_settings(self.path), settings)
+        self.assertEqual(settings.strategy.iv_percentile_threshold, 50.0)
+        self.assertEqual(settings.strategy.min_volume, 10)
+        # 未配置的字段使用默认值，环境变量覆盖的字段写回字典
+        self.assertEqual(settings.strategy.max_vega, 0.5)
+        self.assertEqual(settings['strategy']['max_spread_ratio'], 0.1)
+        self.assertEqual(settings.scanner.max_workers, 8)
+        self.assertEqual(settings.watchlist, ('SPY', 'QQQ'))
+        self.assertEqual(settings.get('cache')['ttl']['chain'], 15)
+        
+    def test_env_override_reparses(self):
+        settings = get_settings(self.path)
+        with mock.patch.dict('os.environ', {'STRATEGY_MAX_VEGA': '0.2'}):
+            overridden = get_settings(self.path)
+        self.assertIsNot(overridden, settings)
+        self.assertEqual(overridden.strategy.max_vega, 0.2)
+        
+    def test_load_config_returns_copy(self):
+        config = load_config(self.path)
+        config['strategy']['min_volume'] = 999
+        self.assertEqual(get_settings(self.path)['strategy']['min_volume'], 10)
+        
+    def test_as_settings_and_risk_manager(self):
+        settings = as_settings({'scanner': {'max_workers': 3}})
+        self.assertIsInstance(settings, Settings)
+        self.assertEqual(settings.scanner.max_workers, 3)
+        self.assertIs(as_settings(settings), settings)
+        
+        rm = RiskManager({'min_volume': 100, 'max_spread_ratio': 0.1})
+        self.assertEqual(rm.settings, StrategySettings(min_volume=100, max_spread_ratio=0.1))
+        self.assertIs(RiskManager(rm.settings).settings, rm.settings)
+
+class TestLazyImports(unittest.TestCase):
+    def imported(self, module, heavy):
+        code = (f"import sys, {module}; "
+                f"print(','.join(m for m in {heavy!r} if m in sys.modules))")
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        return [m for m in result.stdout.strip().split(',') if m]
+        
+    def test_cli_startup_is_light(self):
+        self.assertEqual(self.imported('src.cli', ['pandas', 'scipy', 'yahooquery', 'yfinance', 'py_vollib']), [])
+        
+    def test_loaders_defer_network_clients(self):
+        heavy = ['yahooquery', 'yfinance', 'py_vollib', 'scipy.stats', 'requests']
+        self.assertEqual(self.imported('src.daemon', heavy), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from src.utils.spreads import score_vertical_spreads, prob_above
+
+def bs_price(flag, spot, strike, t, r, sigma):
+    d1 = (np.log(spot / strike) + (r + 0.5 * sigma ** 2) * t) / (sigma * np.sqrt(t))
+    d2 = d1 - sigma * np.sqrt(t)
+    if flag == 'call':
+        return spot * norm.cdf(d1) - strike * np.exp(-r * t) * norm.cdf(d2)
+    return strike * np.exp(-r * t) * norm.cdf(-d2) - spot * norm.cdf(-d1)
+
+def fair_chain(spot=100.0, days=30, sigma=0.25, r=0.01):
+    rows = []
+    for flag in ('call', 'put'):
+        for strike in np.arange(80, 121, 5.0):
+            price = bs_price(flag, spot, strike, days / 365, r, sigma)
+            rows.append({'type': flag, 'strike': strike, 'bid': price, 'ask': price,
+                         'impliedVolatility': sigma, 'days_to_expire': days,
+                         'expiration': pd.Timestamp('2030-01-18')})
+    return pd.DataFrame(rows)
+
+class TestSpreadScoring(unittest.TestCase):
+    def setUp(self):
+        self.chain = fair_chain()
+        self.spreads = score_vertical_spreads(self.chain, 100.0)
+        
+    def test_all_pairs_scored(self):
+        # 9个行权价，每种类型 C(9,2)=36 个组合
+        counts = self.spreads['strategy_type'].value_counts()
+        self.assertEqual(counts['bull_call_spread'], 36)
+        self.assertEqual(counts['bear_put_spread'], 36)
+        
+    def test_fair_prices_have_zero_expected_value(self):
+        np.testing.assert_allclose(self.spreads['expected_value'], 0, atol=1e-8)
+        
+    def test_spread_economics(self):
+        calls = self.spreads[self.spreads['type'] == 'call']
+        self.assertTrue((calls['long_strike'] < calls['short_strike']).all())
+        np.testing.assert_allclose(calls['max_profit'] + calls['max_loss'], calls['width'])
+        expected = prob_above(100.0, calls['breakeven'].to_numpy(), 0.25, 30 / 365) * 100
+        np.testing.assert_allclose(calls['probability'], expected)
+        
+        puts = self.spreads[self.spreads['type'] == 'put']
+        self.assertTrue((puts['long_strike'] > puts['short_strike']).all())
+        self.assertTrue((puts['delta'] < 0).all())
+        
+    def test_ranked_by_expected_value(self):
+        chain = self.chain.copy()
+        chain.loc[(chain['type'] == 'call') & (chain['strike'] == 95), 'ask'] -= 0.5
+        spreads = score_vertical_spreads(chain, 100.0)
+        self.assertTrue(spreads['expected_value'].is_monotonic_decreasing)
+        self.assertEqual(spreads.iloc[0]['long_strike'], 95)
+
+if __name__ == '__main__':
+    unittest.main()
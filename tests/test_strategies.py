@@ -0,0 +1,100 @@
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.utils import strategies
+from src.utils.iv_surface import bs_price
+from src.utils.strategies import LegTable, StrategyEngine, STRATEGIES
+
+ALL = ['bull_call_spread', 'bear_put_spread', 'bull_put_spread', 'bear_call_spread', 'iron_condor']
+
+def fair_chain(spot=100.0, sigma=0.25, r=0.01):
+    rows = []
+    for days in (20, 45):
+        expiration = pd.Timestamp('2030-01-01') + pd.Timedelta(days=days)
+        for flag in ('call', 'put'):
+            for strike in np.arange(80, 121, 5.0):
+                price = bs_price(flag == 'call', spot, strike, days / 365, sigma, r)
+                rows.append({'type': flag, 'strike': strike, 'bid': price, 'ask': price, 'mid': price,
+                             'impliedVolatility': sigma, 'days_to_expire': days,
+                             'expiration': expiration})
+    return pd.DataFrame(rows).sample(frac=1, random_state=0)
+
+class TestStrategyEngine(unittest.TestCase):
+    def setUp(self):
+        self.table = LegTable(fair_chain(), 100.0, sigma=0.25)
+        self.engine = StrategyEngine.from_config({'enabled': ALL})
+        self.results = {c.strategy_type: c for c in self.engine.evaluate(self.table)}
+        
+    def test_registry(self):
+        self.assertTrue(set(ALL) <= set(STRATEGIES))
+        engine = StrategyEngine.from_config({'enabled': ['bull_call_spread', 'straddle']})
+        self.assertEqual([s.name for s in engine.strategies], ['bull_call_spread'])
+        
+    def test_fair_prices_have_zero_expected_value(self):
+        self.assertEqual(set(self.results), set(ALL))
+        for candidates in self.results.values():
+            np.testing.assert_allclose(candidates.values['expected_value'], 0, atol=1e-8)
+            
+    def test_vertical_economics(self):
+        table = self.table
+        for name, credit in (('bull_call_spread', False), ('bear_put_spread', False),
+                             ('bull_put_spread', True), ('bear_call_spread', True)):
+            c = self.results[name]
+            long, short = c.legs[:, 0], c.legs[:, 1]
+            width = np.abs(table.strike[long] - table.strike[short])
+            np.testing.assert_allclose(c.values['max_profit'] + c.values['max_loss'], width)
+            self.assertEqual((c.values['debit'] < 0).all(), credit)
+            self.assertTrue((table.exp_code[long] == table.exp_code[short]).all())
+        # 9个行权价、2个到期日：每个买方价差 2 * C(9,2) 个组合
+        self.assertEqual(len(self.results['bull_call_spread']), 72)
+        calls = self.results['bull_call_spread']
+        self.assertTrue((self.table.strike[calls.legs[:, 0]] < self.table.strike[calls.legs[:, 1]]).all())
+        
+    def test_iron_condor_structure(self):
+        c = self.results['iron_condor']
+        strikes = self.table.strike[c.legs]
+        self.assertTrue((np.diff(strikes, axis=1) > 0).all())
+        np.testing.assert_array_equal(c.quantity, [1, -1, -1, 1])
+        credit = -c.values['debit']
+        np.testing.assert_allclose(c.values['lower_breakeven'], strikes[:, 1] - credit)
+        np.testing.assert_allclose(c.values['upper_breakeven'], strikes[:, 2] + credit)
+        self.assertTrue((c.values['probability'] < 100).all())
+        
+    def test_greeks_computed_once_for_all_strategies(self):
+        with mock.patch.object(strategies, 'calculate_greeks_batch',
+                               wraps=strategies.calculate_greeks_batch) as batch:
+            table = LegTable(fair_chain(), 100.0)
+            self.engine.signals(table, 'SPY')
+        self.assertEqual(batch.call_count, 1)
+        
+    def test_iv_rank_selects_debit_or_credit(self):
+        low = {c.strategy_type for c in self.engine.evaluate(self.table, iv_rank=10, iv_threshold=60)}
+        high = {c.strategy_type for c in self.engine.evaluate(self.table, iv_rank=90, iv_threshold=60)}
+        self.assertEqual(low, {'bull_call_spread', 'bear_put_spread'})
+        self.assertEqual(high, {'bull_put_spread', 'bear_call_spread', 'iron_condor'})
+        
+    def test_ranked_signals(self):
+        # 预测波动率低于隐含波动率时卖方策略期望收益为正
+        table = LegTable(fair_chain(), 100.0, sigma=0.15)
+        engine = StrategyEngine.from_config({'enabled': ALL, 'min_expected_value': 0,
+                                             'params': {'iron_condor': {'short_delta': [0.1, 0.4]}}})
+        signals = engine.signals(table, 'SPY', limit=5)
+        self.assertEqual(len(signals), 5)
+        values = [s['expected_value'] for s in signals]
+        self.assertEqual(values, sorted(values, reverse=True))
+        for signal in signals:
+            self.assertEqual(signal['strikes'], tuple(sorted(leg['strike'] for leg in signal['legs'])))
+            self.assertEqual(sum(leg['quantity'] for leg in signal['legs']), 0)
+            self.assertEqual(set(signal['greeks']), {'delta', 'gamma', 'theta', 'vega'})
+        self.assertIn('iron_condor', {s['strategy_type'] for s in signals})
+        
+    def test_min_probability_override(self):
+        engine = StrategyEngine.from_config(
+            {'enabled': ['bull_call_spread'], 'params': {'bull_call_spread': {'min_probability': 40}}},
+            min_probability='0'
+        )
+        self.assertEqual(engine.strategies[0].min_probability, 0)
+
+if __name__ == '__main__':
+    unittest.main()
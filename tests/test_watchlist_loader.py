@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.data_loader import WatchlistLoader
+from src.utils.cache import SnapshotCache
+from src.utils.bar_buffer import BarBuffers
+from src.utils.earnings_calendar import EarningsCalendar
+
+class FakeYahoo:
+    def __init__(self):
+        self.symbols = []
+        self.requests = []
+        self.session = None
+        
+    def history(self, period='ytd', interval='1d', start=None, adj_timezone=True):
+        self.requests.append(('history', tuple(self.symbols)))
+        self.history_start = start
+        dates = pd.date_range('2030-01-02 09:30', periods=10, freq='5min')
+        index = pd.MultiIndex.from_product([self.symbols, dates], names=['symbol', 'date'])
+        close = np.arange(len(index), dtype=float) + 100
+        return pd.DataFrame({'open': close, 'high': close, 'low': close,
+                             'close': close, 'volume': 1000}, index=index)
+    
+    @property
+    def option_chain(self):
+        self.requests.append(('option_chain', tuple(self.symbols)))
+        index = pd.MultiIndex.from_product(
+            [self.symbols, pd.to_datetime(['2030-01-18']), ['calls', 'puts'], [1, 2, 3]],
+            names=['symbol', 'expiration', 'optionType', 'row']
+        )
+        df = pd.DataFrame({'strike': 100.0, 'bid': 1.0, 'ask': 1.2, 'volume': 10,
+                           'impliedVolatility': 0.3}, index=index)
+        return df.reset_index('row', drop=True)
+    
+    @property
+    def quote_type(self):
+        self.requests.append(('quote_type', tuple(self.symbols)))
+        return {s: {'quoteType': 'ETF' if s == 'QQQ' else 'EQUITY'} for s in self.symbols}
+    
+    @property
+    def calendar_events(self):
+        self.requests.append(('calendar_events', tuple(self.symbols)))
+        return {s: {'earnings': {'earningsDate': ['2099-01-25 10:59:S']}} for s in self.symbols}
+
+class TestWatchlistLoader(unittest.TestCase):
+    def setUp(self):
+        self.loader = WatchlistLoader(['QQQ', 'NVDA', 'TSLA'], cache=SnapshotCache(), config={},
+                                      buffers=BarBuffers(), calendar=EarningsCalendar(':memory:'))
+        self.fake = FakeYahoo()
+        self.loader.yahoo = self.fake
+        
+    def test_bulk_refresh_splits_per_ticker(self):
+        self.loader.refresh()
+        self.assertEqual(self.fake.requests, [
+            ('history', ('QQQ', 'NVDA', 'TSLA')),
+            ('option_chain', ('QQQ', 'NVDA', 'TSLA')),
+            ('quote_type', ('QQQ', 'NVDA', 'TSLA')),
+            ('calendar_events', ('NVDA', 'TSLA')),
+        ])
+        
+        dl = self.loader.loader('NVDA')
+        bars = dl.get_real_time_data()
+        self.assertEqual(len(bars), 10)
+        self.assertEqual(set(bars.index.get_level_values('symbol')), {'NVDA'})
+        chain = dl.fetch_option_chain()
+        self.assertEqual(len(chain), 6)
+        self.assertEqual(len(dl.get_earnings_dates()), 1)
+        self.assertEqual(self.loader.loader('QQQ').get_earnings_dates(), [])
+        
+    def test_second_refresh_hits_cache(self):
+        self.loader.refresh()
+        self.fake.requests.clear()
+        self.assertEqual(self.loader.refresh(), {'bars': 0, 'chain': 0, 'earnings': 0})
+        self.assertEqual(self.fake.requests, [])
+        
+    def test_calendar_refreshes_once_per_day(self):
+        self.loader.refresh()
+        self.fake.requests.clear()
+        # 快照缓存过期后由本地财报日历回答，不再联网
+        self.loader.cache.invalidate(kind='earnings')
+        self.assertEqual(self.loader.refresh()['earnings'], 3)
+        self.assertNotIn('calendar_events', [name for name, _ in self.fake.requests])
+        self.assertFalse(self.loader.calendar.has_earnings('QQQ'))
+
+    def test_loaders_are_reused_and_released(self):
+        self.loader.refresh()
+        dl = self.loader.loader('NVDA')
+        self.assertIs(self.loader.loader('NVDA'), dl)
+        dl.fetch_chain()
+        self.assertIsNone(self.loader.cache.get('NVDA', 'chain', 'raw'))
+        self.loader.release('NVDA')
+        self.assertIsNone(self.loader.cache.get('NVDA', 'chain', 'all'))
+        self.assertIsNotNone(self.loader.cache.get('NVDA', 'earnings'))
+        self.assertEqual(self.loader.retain(['QQQ', 'TSLA']), ['NVDA'])
+        self.assertIsNot(self.loader.loader('NVDA'), dl)
+        
+    def test_bars_refresh_requests_only_new_bars(self):
+        self.loader.refresh()
+        self.assertIsNone(self.fake.history_start)
+        self.loader.cache.invalidate(kind='bars')
+        self.loader.refresh()
+        self.assertEqual(self.fake.history_start, pd.Timestamp('2030-01-02 10:15').to_pydatetime())
+        bars = self.loader.loader('TSLA').get_real_time_data()
+        self.assertEqual(len(bars), 10)
+
+if __name__ == '__main__':
+    unittest.main()